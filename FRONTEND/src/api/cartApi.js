@@ -15,9 +15,11 @@ const getCartHeaders = () => {
   return headers;
 };
 
-export const fetchCartAPI = async () => {
+// reconcile = true: cada item trae precio_actual, stock_disponible, disponible y precio_cambio
+export const fetchCartAPI = async (reconcile = false) => {
   try {
-    const response = await axiosClient.get('/cart/', { headers: getCartHeaders() });
+    const params = reconcile ? { reconcile: true } : {};
+    const response = await axiosClient.get('/cart/', { headers: getCartHeaders(), params });
     return response.data;
   } catch (error) {
     console.error('Error fetching cart:', error.response?.data?.detail || error.message);
@@ -46,6 +48,28 @@ export const removeItemFromCartAPI = async (varianteId) => {
   }
 };
 
+export const setCartItemQuantityAPI = async (varianteId, quantity) => {
+  // quantity = 0 saca el item del carrito
+  try {
+    const response = await axiosClient.put(`/cart/items/${varianteId}`, { quantity }, { headers: getCartHeaders() });
+    return response.data;
+  } catch (error) {
+    console.error('Error updating cart item:', error.response?.data?.detail || error.message);
+    throw error.response?.data || error;
+  }
+};
+
+export const bulkUpdateCartAPI = async (operations) => {
+  // operations = [{ variante_id, quantity }, { variante_id, op: 'increment', quantity: -1 }, { variante_id, op: 'remove' }]
+  try {
+    const response = await axiosClient.patch('/cart/items', operations, { headers: getCartHeaders() });
+    return response.data;
+  } catch (error) {
+    console.error('Error updating cart:', error.response?.data?.detail || error.message);
+    throw error.response?.data || error;
+  }
+};
+
 export const getGuestSessionAPI = async () => {
   try {
     const response = await axiosClient.get('/cart/session/guest');
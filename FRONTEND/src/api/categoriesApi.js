@@ -1,9 +1,11 @@
 import axiosClient from "../hooks/axiosClient";
 
-export const getCategories = async () => {
+// Con includeStats=true cada categoría trae total_productos, productos_en_stock, precio_min y precio_max
+export const getCategories = async (includeStats = false) => {
     try {
         // Le sacamos el "/api" porque axiosClient ya lo tiene.
-        const response = await axiosClient.get("/categories/"); // ✅ BIEN
+        const params = includeStats ? { include_stats: true } : undefined;
+        const response = await axiosClient.get("/categories/", { params }); // ✅ BIEN
         return response.data;
     } catch (error) {
         console.error("Error fetching categories:", error);
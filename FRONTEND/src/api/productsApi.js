@@ -36,6 +36,85 @@ export const getProductById = async (id) => {
   }
 };
 
+/**
+ * Sugerencias para el buscador mientras se escribe (no va a la base, responde al toque).
+ * @param {string} prefix - Lo que lleva escrito el usuario.
+ * @returns {Promise<{productos: any[], categorias: any[], colores: string[]}>}
+ */
+export const getSuggestions = async (prefix, limit = 8) => {
+  if (!prefix || !prefix.trim()) return { productos: [], categorias: [], colores: [] };
+  try {
+    const { data } = await axiosClient.get('/products/suggest', { params: { prefix, limit } });
+    return data;
+  } catch (error) {
+    console.error('Error fetching suggestions:', error);
+    throw error;
+  }
+};
+
+/**
+ * Grilla de talle × color de un producto: ejes, stock e id de variante por celda (null = no existe).
+ * @param {number} id - El ID del producto.
+ * @returns {Promise<{talles: string[], colores: string[], stock: (number|null)[][], ids: (number|null)[][]}>}
+ */
+export const getProductAvailability = async (id) => {
+  try {
+    const { data } = await axiosClient.get(`/products/${id}/availability`);
+    return data;
+  } catch (error) {
+    console.error(`Error fetching availability for product ${id}:`, error);
+    throw error;
+  }
+};
+
+/**
+ * Distribución de precios para el slider, con los mismos filtros que el listado.
+ * @param {object} params - Filtros del catálogo más buckets y modo ('fijo' o 'adaptativo').
+ * @returns {Promise<{total: number, precio_min: number, precio_max: number, buckets: any[]}>}
+ */
+export const getPriceHistogram = async (params = {}) => {
+  try {
+    const { data } = await axiosClient.get('/products/price-histogram', { params });
+    return data;
+  } catch (error) {
+    console.error('Error fetching price histogram:', error);
+    throw error;
+  }
+};
+
+/**
+ * Busca varios productos (con sus variantes) en un solo pedido.
+ * @param {Array<number>} ids - Los IDs de los productos.
+ * @returns {Promise<any[]>}
+ */
+export const getProductsBatch = async (ids) => {
+  if (!ids || ids.length === 0) return [];
+  try {
+    const { data } = await axiosClient.get('/products/batch', { params: { ids: ids.join(',') } });
+    return data;
+  } catch (error) {
+    console.error('Error fetching products batch:', error);
+    throw error;
+  }
+};
+
+/**
+ * Busca varias variantes (cada una con su producto) en un solo pedido.
+ * Sirve para el carrito (variante_id) y el detalle de órdenes (variante_producto_id).
+ * @param {Array<number>} ids - Los IDs de las variantes.
+ * @returns {Promise<any[]>}
+ */
+export const getVariantsBatch = async (ids) => {
+  if (!ids || ids.length === 0) return [];
+  try {
+    const { data } = await axiosClient.get('/products/variants/batch', { params: { ids: ids.join(',') } });
+    return data;
+  } catch (error) {
+    console.error('Error fetching variants batch:', error);
+    throw error;
+  }
+};
+
 /**
  * Crea un nuevo producto (función para admins).
  * OJO: Como subís imágenes, se usa FormData.
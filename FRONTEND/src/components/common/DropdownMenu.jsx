@@ -16,7 +16,8 @@ const DropdownMenu = ({ isOpen, onClose, logoPosition }) => {
   useEffect(() => {
     const fetchAndOrganizeCategories = async () => {
       try {
-        const allCategories = await getCategories();
+        // Con las estadísticas cada categoría ya trae cuántos productos tiene (un solo pedido, cacheado)
+        const allCategories = await getCategories(true);
 
         // =======================================================================
         // ACÁ ESTÁ LA CLAVE DE TODO, JUANI. ¡PRESTÁ ATENCIÓN A ESTA LÍNEA!
@@ -35,9 +36,14 @@ const DropdownMenu = ({ isOpen, onClose, logoPosition }) => {
         const menswear = allCategories.filter(c => MENSWEAR_CATEGORIES.includes(c.nombre.toLowerCase()));
         const womenswear = allCategories.filter(c => !MENSWEAR_CATEGORIES.includes(c.nombre.toLowerCase()));
 
+        const toMenuItem = (c) => ({
+          name: c.nombre.toUpperCase(),
+          path: `/catalog/${c.nombre.toLowerCase()}`,
+          inStock: c.productos_en_stock ?? null,
+        });
         const formattedCategories = {
-          womenswear: womenswear.map(c => ({ name: c.nombre.toUpperCase(), path: `/catalog/${c.nombre.toLowerCase()}` })),
-          menswear: menswear.map(c => ({ name: c.nombre.toUpperCase(), path: `/catalog/${c.nombre.toLowerCase()}` }))
+          womenswear: womenswear.map(toMenuItem),
+          menswear: menswear.map(toMenuItem)
         };
 
         setCategories(formattedCategories);
@@ -157,6 +163,9 @@ const DropdownMenu = ({ isOpen, onClose, logoPosition }) => {
                         className={currentSubCategory === subcategory.path.split('/')[2] ? 'active-link' : ''}
                       >
                         {subcategory.name}
+                        {subcategory.inStock !== null && (
+                          <span className="submenu-count"> ({subcategory.inStock})</span>
+                        )}
                       </Link>
                     </li>
                   ))}
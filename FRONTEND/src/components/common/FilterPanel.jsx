@@ -2,15 +2,18 @@ import React, { useState, useEffect } from 'react';
 import Slider from 'rc-slider';
 import 'rc-slider/assets/index.css';
 
-const FilterPanel = ({ isOpen, onClose, onFilterChange, initialFilters, categories = [] }) => {
+const FilterPanel = ({ isOpen, onClose, onFilterChange, initialFilters, categories = [], priceHistogram = null }) => {
   const [priceRange, setPriceRange] = useState([initialFilters.precio_min, initialFilters.precio_max]);
   const [selectedSizes, setSelectedSizes] = useState(initialFilters.talle || []);
   const [selectedColors, setSelectedColors] = useState(initialFilters.color || []);
   const [selectedCategory, setSelectedCategory] = useState(initialFilters.categoria_id || '');
   
   const availableColors = ['Black', 'White', 'Grey', 'Brown', 'Beige', 'Blue'];
+  // Los límites del slider salen del histograma de precios (con los filtros actuales) si ya llegó
   const minPrice = 0;
-  const maxPrice = 200000;
+  const maxPrice = Math.max(Math.ceil((priceHistogram?.precio_max ?? 200000) / 1000) * 1000, 1000);
+  const buckets = priceHistogram?.buckets || [];
+  const maxBucketTotal = Math.max(1, ...buckets.map(b => b.total));
 
   useEffect(() => {
     setPriceRange([initialFilters.precio_min, initialFilters.precio_max]);
@@ -154,6 +157,21 @@ const FilterPanel = ({ isOpen, onClose, onFilterChange, initialFilters, categori
               <span className="price-separator">-</span>
               <span className="price-value">{formatPrice(priceRange[1])} ARS</span>
             </div>
+            {buckets.length > 0 && (
+              <div className="price-histogram" aria-hidden="true">
+                {buckets.map((bucket, i) => {
+                  const inRange = bucket.desde <= priceRange[1] && (bucket.hasta ?? bucket.desde) >= priceRange[0];
+                  return (
+                    <span
+                      key={i}
+                      className={`price-histogram-bar ${inRange ? 'in-range' : ''}`}
+                      style={{ height: `${(bucket.total / maxBucketTotal) * 100}%` }}
+                      title={`${formatPrice(bucket.desde)} - ${formatPrice(bucket.hasta ?? bucket.desde)}: ${bucket.total}`}
+                    />
+                  );
+                })}
+              </div>
+            )}
             <Slider
               range
               min={minPrice}
@@ -3,7 +3,7 @@ import { Link, useNavigate } from 'react-router-dom';
 import { useAuthStore } from '../../stores/useAuthStore';
 import { CartContext } from '../../context/CartContext';
 import { useQuery } from '@tanstack/react-query';
-import { getProducts } from '../../api/productsApi';
+import { getSuggestions } from '../../api/productsApi';
 
 const Navbar = React.forwardRef(({ isMenuOpen, onToggleMenu }, ref) => {
     const { isAuthenticated, user, isAuthLoading } = useAuthStore();
@@ -14,12 +14,17 @@ const Navbar = React.forwardRef(({ isMenuOpen, onToggleMenu }, ref) => {
     const [query, setQuery] = useState('');
     const searchInputRef = useRef(null);
 
-    const { data: searchResults, isLoading: isSearchLoading } = useQuery({
-      queryKey: ['search', query],
-      queryFn: () => getProducts({ q: query, limit: 5 }),
-      enabled: query.length > 2,
+    // Sugerencias mientras se escribe: salen del índice en memoria del backend, no del listado
+    const hasQuery = query.trim().length > 0;
+    const { data: suggestions, isLoading: isSearchLoading } = useQuery({
+      queryKey: ['suggest', query.trim().toLowerCase()],
+      queryFn: () => getSuggestions(query.trim(), 5),
+      enabled: hasQuery,
       staleTime: 1000 * 60 * 5,
     });
+    const hasSuggestions = suggestions && (
+      suggestions.productos.length > 0 || suggestions.categorias.length > 0 || suggestions.colores.length > 0
+    );
 
     useEffect(() => {
         if (isSearching) {
@@ -83,21 +88,42 @@ const Navbar = React.forwardRef(({ isMenuOpen, onToggleMenu }, ref) => {
                 </div>
               )}
               
-              {isSearching && query.length > 2 && (
+              {isSearching && hasQuery && (
                 <div className="search-results-dropdown">
                   {isSearchLoading && <div className="search-result-item">Searching...</div>}
-                  {searchResults && searchResults.length > 0 && searchResults.map(product => (
+                  {suggestions?.productos.map(product => (
                     <Link 
-                      key={product.id} 
+                      key={`producto-${product.id}`} 
                       to={`/product/${product.id}`} 
                       className="search-result-item"
                       onClick={handleResultClick}
                     >
-                      <img src={product.urls_imagenes?.[0] || '/img/placeholder.jpg'} alt={product.nombre} />
                       <span>{product.nombre}</span>
                     </Link>
                   ))}
-                  {searchResults && searchResults.length === 0 && !isSearchLoading && (
+                  {suggestions?.categorias.map(category => (
+                    <Link
+                      key={`categoria-${category.id}`}
+                      to={`/catalog/${encodeURIComponent(category.nombre.toLowerCase())}`}
+                      className="search-result-item"
+                      onClick={handleResultClick}
+                    >
+                      <span>{category.nombre}</span>
+                      <span className="search-result-kind">Category</span>
+                    </Link>
+                  ))}
+                  {suggestions?.colores.map(color => (
+                    <Link
+                      key={`color-${color}`}
+                      to={`/search?q=${encodeURIComponent(color)}`}
+                      className="search-result-item"
+                      onClick={handleResultClick}
+                    >
+                      <span>{color}</span>
+                      <span className="search-result-kind">Color</span>
+                    </Link>
+                  ))}
+                  {suggestions && !hasSuggestions && !isSearchLoading && (
                     <div className="search-result-item">No results found.</div>
                   )}
                 </div>
@@ -18,9 +18,10 @@ const ProductCard = ({ product }) => {
   }
 
   // El resto del código como lo tenías...
-  const imageUrl = product.urls_imagenes && product.urls_imagenes.length > 0
-    ? product.urls_imagenes[0]
-    : 'https://via.placeholder.com/300x400';
+  // La grilla usa la miniatura WebP; los productos viejos sin derivados traen el original
+  const imageUrl = product.miniatura
+    || (product.urls_imagenes && product.urls_imagenes.length > 0 ? product.urls_imagenes[0] : null)
+    || 'https://via.placeholder.com/300x400';
 
   const formatPrice = (price) => {
     if (typeof price !== 'number') {
@@ -1,6 +1,6 @@
 import React, { useState, useEffect, useCallback } from 'react';
 import { useParams, Link } from 'react-router-dom';
-import { getProducts } from '../api/productsApi';
+import { getProducts, getPriceHistogram } from '../api/productsApi';
 import { getCategories } from '../api/categoriesApi';
 import FilterPanel from '@/components/common/FilterPanel.jsx';
 import Spinner from '@/components/common/Spinner.jsx';
@@ -9,6 +9,20 @@ import ProductCard from '@/components/products/ProductCard.jsx';
 // 1. DEFINIMOS LAS CATEGORÍAS DE HOMBRE, IGUAL QUE EN EL MENÚ.
 const MENSWEAR_CATEGORIES = ['hoodies', 'jackets', 'shirts', 'pants'];
 
+// Filtros en el formato de la API (listas separadas por comas, sin los vacíos)
+const toApiParams = (filters) => {
+    const params = { ...filters };
+
+    if (params.talle.length > 0) params.talle = params.talle.join(',');
+    else delete params.talle;
+
+    if (params.color.length > 0) params.color = params.color.join(',');
+    else delete params.color;
+
+    if (!params.categoria_id) delete params.categoria_id;
+    return params;
+};
+
 const ProductCardSkeleton = () => (
     <div className="catalog-product-card">
         <div className="catalog-product-image-container bg-gray-200 animate-pulse" style={{ backgroundColor: '#f0f0f0' }} />
@@ -24,6 +38,7 @@ const CatalogPage = () => {
     const [isFilterPanelOpen, setIsFilterPanelOpen] = useState(false);
     const [products, setProducts] = useState([]);
     const [categories, setCategories] = useState([]);
+    const [priceHistogram, setPriceHistogram] = useState(null);
     const [isLoading, setIsLoading] = useState(true);
     const [error, setError] = useState(null);
 
@@ -78,16 +93,7 @@ const CatalogPage = () => {
         setIsLoading(true);
         setError(null);
         try {
-            const params = { ...filters };
-            
-            if (params.talle.length > 0) params.talle = params.talle.join(',');
-            else delete params.talle;
-            
-            if (params.color.length > 0) params.color = params.color.join(',');
-            else delete params.color;
-
-            if (!params.categoria_id) delete params.categoria_id;
-
+            const params = toApiParams(filters);
             const data = await getProducts(params);
             setProducts(Array.isArray(data) ? data : []);
         } catch (err) {
@@ -105,6 +111,15 @@ const CatalogPage = () => {
         window.scrollTo(0, 0);
     }, [fetchProducts, categories]);
 
+    // Distribución de precios para el slider: los mismos filtros menos el propio rango de precio
+    const { talle, color, categoria_id } = filters;
+    useEffect(() => {
+        if (categories.length === 0) return;
+        getPriceHistogram({ ...toApiParams({ talle, color, categoria_id }), buckets: 20 })
+            .then(setPriceHistogram)
+            .catch(() => setPriceHistogram(null));
+    }, [talle, color, categoria_id, categories]);
+
     useEffect(() => {
         document.body.style.overflow = isFilterPanelOpen ? 'hidden' : 'auto';
     }, [isFilterPanelOpen]);
@@ -155,6 +170,7 @@ const CatalogPage = () => {
                 onFilterChange={handleFilterChange}
                 initialFilters={filters}
                 categories={categories}
+                priceHistogram={priceHistogram}
             />
         </>
     );
@@ -2,7 +2,7 @@ import React, { useState, useEffect, useContext, useMemo } from 'react';
 import { useParams } from 'react-router-dom';
 import { CartContext } from '../context/CartContext';
 import { NotificationContext } from '../context/NotificationContext';
-import { getProductById } from '../api/productsApi';
+import { getProductById, getProductAvailability } from '../api/productsApi';
 import Spinner from '../components/common/Spinner';
 
 const transformCloudinaryUrl = (url, width) => {
@@ -11,6 +11,21 @@ const transformCloudinaryUrl = (url, width) => {
   return `${parts[0]}/upload/f_auto,q_auto:best,w_${width}/${parts[1]}`;
 };
 
+// Celdas de la grilla de disponibilidad ([talle][color]) con stock, en el orden de los ejes
+const cellsWithStock = (grid) => {
+    const cells = [];
+    if (!grid) return cells;
+    grid.talles.forEach((talle, i) => {
+        grid.colores.forEach((color, j) => {
+            const stock = grid.stock[i][j];
+            if (stock !== null && stock > 0) {
+                cells.push({ talle, color, stock, id: grid.ids[i][j] });
+            }
+        });
+    });
+    return cells;
+};
+
 const getSafeImageUrls = (urls) => {
     if (Array.isArray(urls) && urls.length > 0) {
         return urls;
@@ -24,6 +39,8 @@ const ProductPage = ({ onOpenCartModal, onSetAddedItem }) => {
     const { notify } = useContext(NotificationContext);
 
     const [product, setProduct] = useState(null);
+    // Talles, colores y stock salen de la grilla compacta, no de la lista de variantes
+    const [availability, setAvailability] = useState(null);
     const [loading, setLoading] = useState(true);
     const [error, setError] = useState(null);
     
@@ -39,33 +56,25 @@ const ProductPage = ({ onOpenCartModal, onSetAddedItem }) => {
             setLoading(true);
             setError(null);
             try {
-                const data = await getProductById(productId);
+                const [data, grid] = await Promise.all([
+                    getProductById(productId),
+                    getProductAvailability(productId),
+                ]);
                 if (!data) {
                     throw new Error('Producto no encontrado.');
                 }
                 setProduct(data);
+                setAvailability(grid);
 
-                const imageUrls = getSafeImageUrls(data.urls_imagenes);
+                // En la página del producto va el tamaño 'grande' (WebP) si existe
+                const imageUrls = getSafeImageUrls(data.imagenes?.length ? data.imagenes.map(img => img.grande) : data.urls_imagenes);
                 setAllImageUrls(imageUrls);
                 setMainImage(imageUrls[0]);
 
-                if (data.variantes && data.variantes.length > 0) {
-                    const firstAvailableVariant = data.variantes.find(v => v.cantidad_en_stock > 0);
-                    if (firstAvailableVariant) {
-                        const firstColor = firstAvailableVariant.color;
-                        setSelectedColor(firstColor);
-                        
-                        const firstSizeForColor = data.variantes.find(v => v.color === firstColor && v.cantidad_en_stock > 0);
-                        if (firstSizeForColor) {
-                            setSelectedSize(firstSizeForColor.tamanio);
-                        } else {
-                            setSelectedSize(null);
-                        }
-                    } else {
-                        setSelectedColor(null);
-                        setSelectedSize(null);
-                    }
-                }
+                // Arrancamos con el primer color con stock y su primer talle
+                const firstAvailable = cellsWithStock(grid)[0];
+                setSelectedColor(firstAvailable ? firstAvailable.color : null);
+                setSelectedSize(firstAvailable ? firstAvailable.talle : null);
             } catch (err) {
                 const errorMessage = err?.response?.data?.detail || err.message || 'No se pudo encontrar el producto.';
                 setError(errorMessage);
@@ -79,26 +88,24 @@ const ProductPage = ({ onOpenCartModal, onSetAddedItem }) => {
     }, [productId, notify]);
 
     // --- LÓGICA PARA FILTRAR VARIANTES ---
+    const available = useMemo(() => cellsWithStock(availability), [availability]);
+
     // Obtenemos los colores únicos que tienen stock
     const availableColors = useMemo(() => {
-        if (!product?.variantes) return [];
-        const colorsWithStock = product.variantes
-            .filter(v => v.cantidad_en_stock > 0)
-            .map(v => v.color);
-        return [...new Set(colorsWithStock)];
-    }, [product]);
+        return [...new Set(available.map(cell => cell.color))];
+    }, [available]);
 
     // Obtenemos los talles disponibles PARA EL COLOR SELECCIONADO
     const availableSizesForSelectedColor = useMemo(() => {
-        if (!product?.variantes || !selectedColor) return [];
-        return product.variantes.filter(v => v.color === selectedColor && v.cantidad_en_stock > 0);
-    }, [product, selectedColor]);
+        if (!selectedColor) return [];
+        return available.filter(cell => cell.color === selectedColor);
+    }, [available, selectedColor]);
 
     const handleColorSelect = (color) => {
         setSelectedColor(color);
         // Al cambiar de color, reseteamos el talle o seleccionamos el primero disponible
-        const firstAvailableSize = product.variantes.find(v => v.color === color && v.cantidad_en_stock > 0);
-        setSelectedSize(firstAvailableSize ? firstAvailableSize.tamanio : null);
+        const firstAvailableSize = available.find(cell => cell.color === color);
+        setSelectedSize(firstAvailableSize ? firstAvailableSize.talle : null);
     };
 
     const handleAddToCart = () => {
@@ -107,11 +114,11 @@ const ProductPage = ({ onOpenCartModal, onSetAddedItem }) => {
             return;
         }
 
-        const selectedVariant = product.variantes.find(
-            v => v.tamanio === selectedSize && v.color === selectedColor
+        const selectedVariant = available.find(
+            cell => cell.talle === selectedSize && cell.color === selectedColor
         );
 
-        if (!selectedVariant || selectedVariant.cantidad_en_stock <= 0) {
+        if (!selectedVariant) {
             notify("This option is out of stock.", "error");
             return;
         }
@@ -122,7 +129,7 @@ const ProductPage = ({ onOpenCartModal, onSetAddedItem }) => {
             price: product.precio,
             name: product.nombre,
             image_url: allImageUrls[0] || null,
-            size: selectedVariant.tamanio,
+            size: selectedVariant.talle,
             color: selectedVariant.color,
         };
         
@@ -206,14 +213,14 @@ const ProductPage = ({ onOpenCartModal, onSetAddedItem }) => {
                     <div className="product-selector">
                         <p className="selector-label">SIZE: <span>{selectedSize || 'N/A'}</span></p>
                         <div className="selector-buttons">
-                            {availableSizesForSelectedColor.map(variant => (
+                            {availableSizesForSelectedColor.map(cell => (
                                 <button
-                                    key={variant.tamanio}
-                                    className={`size-button ${selectedSize === variant.tamanio ? 'active' : ''}`}
-                                    onClick={() => setSelectedSize(variant.tamanio)}
-                                    disabled={variant.cantidad_en_stock <= 0}
+                                    key={cell.talle}
+                                    className={`size-button ${selectedSize === cell.talle ? 'active' : ''}`}
+                                    onClick={() => setSelectedSize(cell.talle)}
+                                    disabled={cell.stock <= 0}
                                 >
-                                    {variant.tamanio}
+                                    {cell.talle}
                                 </button>
                             ))}
                         </div>
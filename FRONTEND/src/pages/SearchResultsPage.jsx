@@ -59,7 +59,7 @@ const SearchResultsPage = () => {
                         <Link to={`/product/${product.id}`} className="catalog-product-card" key={product.id}>
                             <div className="catalog-product-image-container">
                                 <img 
-                                    src={product.urls_imagenes?.[0] || '/img/placeholder.jpg'} 
+                                    src={product.miniatura || product.urls_imagenes?.[0] || '/img/placeholder.jpg'} 
                                     alt={product.nombre} 
                                     className="catalog-product-image"
                                 />
@@ -0,0 +1,114 @@
+# En BACKEND/benchmarks/bench_serialization.py
+#
+# Compara el camino normal de FastAPI (response_model -> validación ->
+# serialización a tipos JSON -> json de la stdlib) contra el camino rápido de
+# utils/fast_json (un TypeAdapter compilado que valida y escribe bytes).
+#
+# Uso (desde la carpeta server/):
+#     python benchmarks/bench_serialization.py [filas] [repeticiones]
+
+import asyncio
+import json
+import os
+import sys
+import timeit
+from datetime import datetime
+from decimal import Decimal
+from types import SimpleNamespace
+from typing import List
+
+from bson import ObjectId
+
+# --- Agrego la carpeta del backend al path para importar módulos ---
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+from pydantic import TypeAdapter
+
+from schemas import admin_schemas, product_schemas, user_schemas
+from utils import fast_json
+
+
+# --- Datos de prueba con la misma forma que devuelven SQLAlchemy y Motor ---
+def fake_products(n: int):
+    return [
+        SimpleNamespace(
+            id=i, nombre=f"Remera {i}", descripcion="Remera de algodón peinado", precio=Decimal("19999.90"),
+            sku=f"SKU-{i}", urls_imagenes=["https://res.cloudinary.com/demo/image/upload/a.jpg"],
+            material="Algodón", stock=12, categoria_id=1 + i % 7,
+            variantes=[
+                SimpleNamespace(id=i * 10 + j, producto_id=i, tamanio=t, color="Negro", cantidad_en_stock=3)
+                for j, t in enumerate(("S", "M", "L", "XL"))
+            ],
+        )
+        for i in range(n)
+    ]
+
+
+def fake_orders(n: int):
+    return [
+        SimpleNamespace(
+            id=i, usuario_id=str(ObjectId()), monto_total=Decimal("45999.00"), estado="Completado",
+            estado_pago="Aprobado", creado_en=datetime(2025, 1, 1, 12, 0),
+            detalles=[
+                SimpleNamespace(variante_producto_id=j, cantidad=1, precio_en_momento_compra=Decimal("15333.00"))
+                for j in range(3)
+            ],
+        )
+        for i in range(n)
+    ]
+
+
+def fake_users(n: int):
+    return [
+        {"_id": ObjectId(), "email": f"user{i}@example.com", "name": "Nombre", "last_name": "Apellido",
+         "role": "user", "hashed_password": "x" * 60}
+        for i in range(n)
+    ]
+
+
+# --- Los dos caminos ---
+def fastapi_path(field, data) -> bytes:
+    content = asyncio.run(serialize_response(field=field, response_content=data))
+    return JSONResponse(content).body
+
+
+def old_get_users_path(field, data) -> bytes:
+    # Lo que hacía admin_router.get_users: un TypeAdapter nuevo por request,
+    # una validación a mano y después la validación de 'response_model'.
+    validated = TypeAdapter(List[user_schemas.UserOut]).validate_python(data)
+    return fastapi_path(field, validated)
+
+
+def fast_path(adapter, data) -> bytes:
+    return fast_json.dump_json(adapter, data)
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    cases = [
+        ("get_products", List[product_schemas.Product], fast_json.ProductListAdapter, fake_products(rows), fastapi_path),
+        ("get_sales", List[admin_schemas.Orden], fast_json.OrderListAdapter, fake_orders(rows), fastapi_path),
+        ("get_users", List[user_schemas.UserOut], fast_json.UserListAdapter, fake_users(rows), old_get_users_path),
+    ]
+
+    print(f"{rows} filas, mejor de {repeat} corridas (ms por respuesta)")
+    print(f"{'endpoint':<14}{'fastapi':>10}{'rápido':>10}{'ahorro':>10}")
+    for name, annotation, adapter, data, slow_path in cases:
+        field = create_model_field(name="Response_" + name, type_=annotation, mode="serialization")
+        # Antes de medir, chequeamos que los dos caminos devuelven lo mismo
+        assert json.loads(slow_path(field, data)) == json.loads(fast_path(adapter, data))
+
+        slow = min(timeit.repeat(lambda: slow_path(field, data), number=1, repeat=repeat)) * 1000
+        fast = min(timeit.repeat(lambda: fast_path(adapter, data), number=1, repeat=repeat)) * 1000
+        print(f"{name:<14}{slow:>10.2f}{fast:>10.2f}{(1 - fast / slow) * 100:>9.0f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,18 @@
 # En BACKEND/database/database.py
 
+import logging
+
+from pymongo import ASCENDING
+from pymongo.errors import PyMongoError
 from settings import settings
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy import text
 from motor.motor_asyncio import AsyncIOMotorClient
 
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
 
 # --- 1. CONFIGURACIÓN DE LA BASE DE DATOS SQL (MySQL) ---
 DATABASE_URL = settings.DB_SQL_URI
@@ -51,4 +58,58 @@ async def check_nosql_connection():
         await client.admin.command('ping')
         return {"database": "MongoDB", "status": "ok", "message": "Conexión exitosa."}
     except Exception as e:
-        return {"database": "MongoDB", "status": "error", "message": str(e)}
\ No newline at end of file
+        return {"database": "MongoDB", "status": "error", "message": str(e)}
+
+# --- 3. ÍNDICES DE MongoDB ---
+# Se crean al arrancar (lifespan en main.py). create_index no hace nada si el
+# índice ya existe igual, así que correrlo en cada arranque es barato.
+#   - users.email: se busca en cada pedido autenticado y no puede repetirse.
+#   - carts.user_id / carts.guest_session_id: cada carrito tiene uno de los dos
+#     (sparse), y únicos para que dos upserts simultáneos no creen dos carritos.
+#   - TTL sobre last_updated, solo para carritos de invitado: MongoDB borra los
+#     abandonados y la colección no crece para siempre.
+GUEST_CART_TTL_SECONDS = settings.GUEST_CART_TTL_DAYS * 24 * 60 * 60
+GUEST_CART_TTL_INDEX = "ttl_carts_invitado"
+
+NOSQL_INDEXES = [
+    ("users", [("email", ASCENDING)], {"name": "ux_users_email", "unique": True}),
+    ("users", [("reset_password_token", ASCENDING)], {"name": "ix_users_reset_token", "sparse": True}),
+    ("carts", [("user_id", ASCENDING)], {"name": "ux_carts_usuario", "unique": True, "sparse": True}),
+    ("carts", [("guest_session_id", ASCENDING)], {"name": "ux_carts_invitado", "unique": True, "sparse": True}),
+    ("carts", [("last_updated", ASCENDING)], {
+        "name": GUEST_CART_TTL_INDEX,
+        "expireAfterSeconds": GUEST_CART_TTL_SECONDS,
+        "partialFilterExpression": {"guest_session_id": {"$exists": True}},
+    }),
+]
+
+
+async def _update_ttl_if_changed(database, collection_name: str, name: str, seconds: int) -> bool:
+    """Si el TTL ya existe con otro vencimiento, se cambia con collMod (create_index fallaría)."""
+    existing = (await database[collection_name].index_information()).get(name)
+    if existing is None or existing.get("expireAfterSeconds") == seconds:
+        return False
+    await database.command("collMod", collection_name, index={"name": name, "expireAfterSeconds": seconds})
+    return True
+
+
+async def ensure_nosql_indexes(database=None) -> dict:
+    """
+    Crea los índices que falten. Un error (ej: emails repetidos que impiden el
+    índice único) se registra y no frena el arranque de la app.
+    """
+    database = database if database is not None else db_nosql
+    report = {"ok": [], "errores": []}
+    for collection_name, keys, options in NOSQL_INDEXES:
+        try:
+            if "expireAfterSeconds" in options and await _update_ttl_if_changed(
+                database, collection_name, options["name"], options["expireAfterSeconds"]
+            ):
+                report["ok"].append(options["name"])
+                continue
+            await database[collection_name].create_index(keys, **options)
+            report["ok"].append(options["name"])
+        except PyMongoError as e:
+            logger.error(f"No se pudo crear el índice {collection_name}.{options['name']}: {e}")
+            report["errores"].append({"indice": options["name"], "error": str(e)})
+    return report
@@ -0,0 +1,353 @@
+# En BACKEND/database/migrations.py
+#
+# Migraciones versionadas del esquema SQL.
+#
+# Antes, cada worker corría 'Base.metadata.create_all' y el seed de categorías
+# en cada arranque. Ahora la base guarda su versión en la tabla 'schema_version'
+# y el arranque solo hace un SELECT para compararla con la última migración.
+# Si falta alguna, se aplica bajo un lock (GET_LOCK en MySQL) para que varios
+# workers que arrancan a la vez no la corran en paralelo.
+#
+# Cada migración es una función sync que recibe una Connection (se ejecuta con
+# run_sync) y tiene que ser idempotente: las bases creadas antes de este sistema
+# arrancan en versión 0 y ya tienen parte del esquema.
+#
+# Uso manual (desde la carpeta server/):
+#     python -m database.migrations
+
+import asyncio
+import logging
+
+from sqlalchemy import (
+    DECIMAL, JSON, Column, Date, ForeignKey, Index, Integer, MetaData, String, TIMESTAMP, Table, Text, case, delete,
+    func, insert, inspect, select, text, update
+)
+from sqlalchemy.exc import OperationalError, ProgrammingError
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Tabla de control en su propia MetaData: no es un modelo de la app
+version_metadata = MetaData()
+schema_version = Table(
+    "schema_version", version_metadata,
+    Column("version", Integer, primary_key=True),
+    Column("descripcion", String(255), nullable=False),
+    Column("aplicada_en", TIMESTAMP, server_default=func.now()),
+)
+
+LOCK_NAME = "void_schema_migrations"
+LOCK_TIMEOUT_SECONDS = 60
+
+DEFAULT_CATEGORIES = [
+    "Hoodies",
+    "Jackets",
+    "Shirts",
+    "Pants",
+    "Dresses",
+    "Tops",
+    "Accessories"
+]
+
+
+# --- Esquema congelado de las migraciones ---
+# Las migraciones no usan los modelos de database/models.py: esos cambian con la
+# app, y una migración ya publicada tiene que crear siempre lo mismo. Acá queda
+# una copia de cada tabla tal como la dejó la migración que la creó. Si un
+# modelo cambia, el cambio va en una migración nueva (como m005), no acá.
+frozen_metadata = MetaData()
+
+# m001: el esquema que creaba el lifespan antes de las migraciones
+categorias_v1 = Table(
+    "categorias", frozen_metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("nombre", String(100), unique=True, nullable=False, index=True),
+)
+productos_v1 = Table(
+    "productos", frozen_metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("nombre", String(255), nullable=False),
+    Column("descripcion", Text, nullable=True),
+    Column("precio", DECIMAL(10, 2), nullable=False),
+    Column("sku", String(100), unique=True, nullable=False),
+    Column("urls_imagenes", JSON, nullable=True),
+    Column("material", String(100), nullable=True),
+    Column("talle", String(50), nullable=True),
+    Column("color", String(50), nullable=True),
+    Column("stock", Integer, nullable=False, default=0),
+    Column("categoria_id", Integer, ForeignKey("categorias.id"), nullable=False),
+    Column("creado_en", TIMESTAMP, server_default=func.now()),
+    Column("actualizado_en", TIMESTAMP, server_default=func.now()),
+)
+variantes_v1 = Table(
+    "variantes_productos", frozen_metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("producto_id", Integer, ForeignKey("productos.id", ondelete="CASCADE"), nullable=False),
+    Column("tamanio", String(10), nullable=False),
+    Column("color", String(50), nullable=False),
+    Column("cantidad_en_stock", Integer, nullable=False),
+)
+ordenes_v1 = Table(
+    "ordenes", frozen_metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("usuario_id", String(255), nullable=False),
+    Column("monto_total", DECIMAL(10, 2), nullable=False),
+    Column("estado", String(50), nullable=True),
+    Column("direccion_envio", JSON, nullable=True),
+    Column("metodo_pago", String(50), nullable=True),
+    Column("estado_pago", String(50), nullable=True),
+    Column("creado_en", TIMESTAMP, server_default=func.now()),
+    Column("payment_id_mercadopago", String(255), unique=True, nullable=True, index=True),
+)
+detalles_orden_v1 = Table(
+    "detalles_orden", frozen_metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("orden_id", Integer, ForeignKey("ordenes.id"), nullable=False),
+    Column("variante_producto_id", Integer, ForeignKey("variantes_productos.id"), nullable=False),
+    Column("cantidad", Integer, nullable=False),
+    Column("precio_en_momento_compra", DECIMAL(10, 2), nullable=False),
+)
+gastos_v1 = Table(
+    "gastos", frozen_metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("descripcion", String(255), nullable=False),
+    Column("monto", DECIMAL(15, 2), nullable=False),
+    Column("categoria", String(100), nullable=True),
+    Column("fecha", Date, nullable=False),
+    Column("creado_en", TIMESTAMP, server_default=func.now()),
+)
+conversaciones_ia_v1 = Table(
+    "conversaciones_ia", frozen_metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("sesion_id", String(255), nullable=False, index=True),
+    Column("prompt", Text, nullable=False),
+    Column("respuesta", Text, nullable=False),
+    Column("creado_en", TIMESTAMP, server_default=func.now()),
+)
+M001_TABLES = [
+    categorias_v1, productos_v1, variantes_v1, ordenes_v1, detalles_orden_v1, gastos_v1, conversaciones_ia_v1
+]
+
+# m003: recomendaciones
+coocurrencias_v3 = Table(
+    "coocurrencias_productos", frozen_metadata,
+    Column("producto_id", Integer, ForeignKey("productos.id", ondelete="CASCADE"), primary_key=True),
+    Column("relacionado_id", Integer, ForeignKey("productos.id", ondelete="CASCADE"), primary_key=True),
+    Column("veces", Integer, nullable=False, default=0),
+)
+relacionados_v3 = Table(
+    "productos_relacionados", frozen_metadata,
+    Column("producto_id", Integer, ForeignKey("productos.id", ondelete="CASCADE"), primary_key=True),
+    Column("posicion", Integer, primary_key=True),
+    Column("relacionado_id", Integer, ForeignKey("productos.id", ondelete="CASCADE"), nullable=False),
+    Column("veces", Integer, nullable=False),
+)
+estado_trabajos_v3 = Table(
+    "estado_trabajos", frozen_metadata,
+    Column("nombre", String(100), primary_key=True),
+    Column("ultimo_id", Integer, nullable=False, default=0),
+    Column("actualizado_en", TIMESTAMP, server_default=func.now()),
+)
+
+# m004: disponibilidad por producto
+disponibilidad_v4 = Table(
+    "disponibilidad_productos", frozen_metadata,
+    Column("producto_id", Integer, ForeignKey("productos.id", ondelete="CASCADE"), primary_key=True),
+    Column("stock_total", Integer, nullable=False, default=0),
+    Column("talles", JSON, nullable=True),
+    Column("colores", JSON, nullable=True),
+    Column("actualizado_en", TIMESTAMP, server_default=func.now()),
+    Index("ix_disponibilidad_stock_producto", "stock_total", "producto_id"),
+)
+
+# m002: índices compuestos (sueltos, se crean sobre tablas que ya existen)
+M002_INDEXES = [
+    Index("ix_productos_categoria_precio", productos_v1.c.categoria_id, productos_v1.c.precio),
+    Index("ix_variantes_producto_talle_color", variantes_v1.c.producto_id, variantes_v1.c.tamanio, variantes_v1.c.color),
+    Index("ix_ordenes_usuario_creado", ordenes_v1.c.usuario_id, ordenes_v1.c.creado_en),
+    Index("ix_ordenes_estado_pago_creado", ordenes_v1.c.estado_pago, ordenes_v1.c.creado_en),
+    Index("ix_conversaciones_sesion_creado", conversaciones_ia_v1.c.sesion_id, conversaciones_ia_v1.c.creado_en),
+]
+M002_MYSQL_INDEXES = [
+    Index(
+        "ix_productos_busqueda", productos_v1.c.nombre, productos_v1.c.descripcion, productos_v1.c.material,
+        productos_v1.c.color, mysql_prefix="FULLTEXT"
+    ),
+]
+
+BACKFILL_CHUNK_SIZE = 500
+
+
+# --- Helpers para escribir migraciones idempotentes ---
+def _create_index_if_missing(conn, index):
+    existing = {ix["name"] for ix in inspect(conn).get_indexes(index.table.name)}
+    if index.name not in existing:
+        index.create(conn)
+
+
+# --- Migraciones ---
+def m001_initial_schema(conn):
+    """Tablas iniciales y categorías por defecto (lo que antes hacía el lifespan)."""
+    frozen_metadata.create_all(conn, tables=M001_TABLES, checkfirst=True)
+
+    if conn.execute(select(categorias_v1.c.id).limit(1)).first() is None:
+        logger.info("Base de datos de categorías vacía. Cargando datos iniciales...")
+        conn.execute(insert(categorias_v1), [{"nombre": nombre} for nombre in DEFAULT_CATEGORIES])
+
+
+def m002_catalog_and_order_indexes(conn):
+    """Índices compuestos de las consultas más usadas y el FULLTEXT de la búsqueda."""
+    for index in M002_INDEXES:
+        _create_index_if_missing(conn, index)
+    if conn.dialect.name == "mysql":
+        for index in M002_MYSQL_INDEXES:
+            _create_index_if_missing(conn, index)
+
+
+def m003_recommendation_tables(conn):
+    """Matriz de co-compras, top-K de relacionados y estado de los jobs incrementales."""
+    tables = [coocurrencias_v3, relacionados_v3, estado_trabajos_v3]
+    frozen_metadata.create_all(conn, tables=tables, checkfirst=True)
+
+
+def m004_product_availability(conn):
+    """
+    Agregado de disponibilidad por producto, cargado a partir de las variantes
+    actuales. El cálculo está copiado acá a propósito (no llama a
+    availability_service): la migración no puede cambiar si cambia el servicio.
+    """
+    frozen_metadata.create_all(conn, tables=[disponibilidad_v4], checkfirst=True)
+    # Idempotente: si una corrida anterior quedó a medias, se recalcula todo
+    conn.execute(delete(disponibilidad_v4))
+
+    ids = list(conn.execute(select(productos_v1.c.id).order_by(productos_v1.c.id)).scalars())
+    for start in range(0, len(ids), BACKFILL_CHUNK_SIZE):
+        chunk = ids[start:start + BACKFILL_CHUNK_SIZE]
+        product_stock = dict(conn.execute(
+            select(productos_v1.c.id, productos_v1.c.stock).where(productos_v1.c.id.in_(chunk))
+        ).all())
+        variant_rows = conn.execute(
+            select(variantes_v1.c.producto_id, variantes_v1.c.tamanio, variantes_v1.c.color, variantes_v1.c.cantidad_en_stock)
+            .where(variantes_v1.c.producto_id.in_(chunk))
+            .order_by(variantes_v1.c.id)
+        ).all()
+
+        # Stock total de las variantes; talles y colores solo los que tienen stock
+        aggregates = {}
+        for producto_id, tamanio, color, cantidad in variant_rows:
+            agg = aggregates.setdefault(producto_id, {"stock_total": 0, "talles": [], "colores": []})
+            agg["stock_total"] += cantidad
+            if cantidad > 0:
+                if tamanio not in agg["talles"]:
+                    agg["talles"].append(tamanio)
+                if color not in agg["colores"]:
+                    agg["colores"].append(color)
+
+        # Los productos sin variantes conservan su 'stock' como total
+        rows, stock_updates = [], {}
+        for producto_id, stock in product_stock.items():
+            agg = aggregates.get(producto_id)
+            if agg is None:
+                rows.append({"producto_id": producto_id, "stock_total": stock or 0, "talles": [], "colores": []})
+                continue
+            rows.append({"producto_id": producto_id, **agg})
+            if stock != agg["stock_total"]:
+                stock_updates[producto_id] = agg["stock_total"]
+
+        if rows:
+            conn.execute(insert(disponibilidad_v4), rows)
+        if stock_updates:
+            conn.execute(
+                update(productos_v1)
+                .where(productos_v1.c.id.in_(list(stock_updates)))
+                .values(stock=case(stock_updates, value=productos_v1.c.id))
+            )
+
+
+def m005_product_image_derivatives(conn):
+    """Columna con las URLs de los derivados (miniaturas WebP) de las imágenes."""
+    columns = {c["name"] for c in inspect(conn).get_columns("productos")}
+    if "imagenes_derivadas" not in columns:
+        conn.execute(text("ALTER TABLE productos ADD COLUMN imagenes_derivadas JSON NULL"))
+
+
+def m006_job_recent_ids(conn):
+    """Ids procesados dentro de la ventana de atraso de los jobs incrementales."""
+    columns = {c["name"] for c in inspect(conn).get_columns("estado_trabajos")}
+    if "ids_recientes" not in columns:
+        conn.execute(text("ALTER TABLE estado_trabajos ADD COLUMN ids_recientes JSON NULL"))
+
+
+# (versión, descripción, función). Nunca se edita una migración ya publicada:
+# los cambios nuevos van en una migración nueva al final de la lista.
+MIGRATIONS = [
+    (1, "Esquema inicial y categorías por defecto", m001_initial_schema),
+    (2, "Índices compuestos del catálogo, órdenes y chatbot", m002_catalog_and_order_indexes),
+    (3, "Tablas de productos relacionados (co-compras)", m003_recommendation_tables),
+    (4, "Disponibilidad precalculada por producto", m004_product_availability),
+    (5, "Derivados de las imágenes de productos", m005_product_image_derivatives),
+    (6, "Ids recientes de los jobs incrementales", m006_job_recent_ids),
+]
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+# --- Runner ---
+async def get_current_version(engine: AsyncEngine) -> int:
+    """Un solo SELECT. Si la tabla de control todavía no existe, la base está en versión 0."""
+    try:
+        async with engine.connect() as conn:
+            result = await conn.execute(select(func.max(schema_version.c.version)))
+            return result.scalar() or 0
+    except (OperationalError, ProgrammingError):
+        return 0
+
+
+def _apply_pending(conn) -> int:
+    version_metadata.create_all(conn, checkfirst=True)
+    current = conn.execute(select(func.max(schema_version.c.version))).scalar() or 0
+    applied = 0
+    for version, description, migration in MIGRATIONS:
+        if version <= current:
+            continue
+        logger.info(f"Aplicando migración {version}: {description}")
+        migration(conn)
+        conn.execute(insert(schema_version).values(version=version, descripcion=description))
+        applied += 1
+    return applied
+
+
+async def run_migrations(engine: AsyncEngine) -> int:
+    """Lleva la base a la última versión. Devuelve cuántas migraciones se aplicaron."""
+    if await get_current_version(engine) >= LATEST_VERSION:
+        return 0
+
+    async with engine.connect() as conn:
+        is_mysql = conn.dialect.name == "mysql"
+        if is_mysql:
+            got_lock = (await conn.execute(
+                text("SELECT GET_LOCK(:name, :timeout)"), {"name": LOCK_NAME, "timeout": LOCK_TIMEOUT_SECONDS}
+            )).scalar()
+            if got_lock != 1:
+                raise RuntimeError("No se pudo obtener el lock de migraciones (¿otro worker migrando hace demasiado?).")
+        try:
+            # Con el lock tomado volvemos a leer la versión: otro worker pudo haber migrado
+            applied = await conn.run_sync(_apply_pending)
+            await conn.commit()
+        finally:
+            if is_mysql:
+                await conn.execute(text("SELECT RELEASE_LOCK(:name)"), {"name": LOCK_NAME})
+
+    if applied:
+        logger.info(f"Migraciones aplicadas: {applied}. Versión actual: {LATEST_VERSION}.")
+    return applied
+
+
+if __name__ == "__main__":
+    from database.database import engine
+
+    async def _main():
+        await run_migrations(engine)
+        await engine.dispose()
+
+    asyncio.run(_main())
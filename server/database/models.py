@@ -1,7 +1,7 @@
 # En BACKEND/database/models.py
 
 from sqlalchemy import (
-    Column, Integer, String, Text, DECIMAL, TIMESTAMP, ForeignKey, Date, JSON
+    Column, Integer, String, Text, DECIMAL, TIMESTAMP, ForeignKey, Date, JSON, Index
 )
 from sqlalchemy.orm import relationship, declarative_base
 from sqlalchemy.sql import func
@@ -30,6 +30,8 @@ class Producto(Base):
     # de forma nativa en la base de datos.
     urls_imagenes = Column(JSON, nullable=True)
     # --- FIN DEL CAMBIO ---
+    # Derivados WebP de cada imagen: {url_original: {"miniatura": url, "mediana": url, "grande": url}}
+    imagenes_derivadas = Column(JSON, nullable=True)
 
     material = Column(String(100), nullable=True)
     talle = Column(String(50), nullable=True)
@@ -41,6 +43,17 @@ class Producto(Base):
     categoria = relationship("Categoria", back_populates="productos")
     variantes = relationship("VarianteProducto", back_populates="producto", cascade="all, delete-orphan")
 
+    # Índice FULLTEXT para la búsqueda del catálogo (solo existe en MySQL;
+    # en SQLite la búsqueda usa el índice en memoria de search_service).
+    __table_args__ = (
+        Index(
+            "ix_productos_busqueda", "nombre", "descripcion", "material", "color",
+            mysql_prefix="FULLTEXT"
+        ).ddl_if(dialect="mysql"),
+        # Listado filtrado por categoría y ordenado/filtrado por precio
+        Index("ix_productos_categoria_precio", "categoria_id", "precio"),
+    )
+
 
 class VarianteProducto(Base):
     __tablename__ = "variantes_productos"
@@ -52,6 +65,29 @@ class VarianteProducto(Base):
     producto = relationship("Producto", back_populates="variantes")
     detalles_orden = relationship("DetalleOrden", back_populates="variante_producto")
 
+    # Variantes de un producto y filtros EXISTS por talle/color
+    __table_args__ = (
+        Index("ix_variantes_producto_talle_color", "producto_id", "tamanio", "color"),
+    )
+
+
+class DisponibilidadProducto(Base):
+    """
+    Agregado de stock por producto, mantenido por services/availability_service.py
+    en la misma transacción que cada cambio de variantes (checkout, admin, importación).
+    """
+    __tablename__ = "disponibilidad_productos"
+    producto_id = Column(Integer, ForeignKey("productos.id", ondelete="CASCADE"), primary_key=True)
+    stock_total = Column(Integer, nullable=False, default=0)
+    talles = Column(JSON, nullable=True)  # talles con stock > 0
+    colores = Column(JSON, nullable=True)  # colores con stock > 0
+    actualizado_en = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now())
+
+    # Filtro 'in_stock_only' del catálogo: rango sobre stock_total que ya trae el id
+    __table_args__ = (
+        Index("ix_disponibilidad_stock_producto", "stock_total", "producto_id"),
+    )
+
 
 class Orden(Base):
     __tablename__ = "ordenes"
@@ -66,6 +102,13 @@ class Orden(Base):
     detalles = relationship("DetalleOrden", back_populates="orden")
     payment_id_mercadopago = Column(String(255), unique=True, nullable=True, index=True)
 
+    __table_args__ = (
+        # Historial de órdenes de un usuario ("/api/orders/me")
+        Index("ix_ordenes_usuario_creado", "usuario_id", "creado_en"),
+        # Métricas y gráficos del admin (órdenes aprobadas por fecha)
+        Index("ix_ordenes_estado_pago_creado", "estado_pago", "creado_en"),
+    )
+
 
 class DetalleOrden(Base):
     __tablename__ = "detalles_orden"
@@ -94,4 +137,37 @@ class ConversacionIA(Base):
     sesion_id = Column(String(255), nullable=False, index=True)
     prompt = Column(Text, nullable=False)
     respuesta = Column(Text, nullable=False)
-    creado_en = Column(TIMESTAMP, server_default=func.now())
\ No newline at end of file
+    creado_en = Column(TIMESTAMP, server_default=func.now())
+
+    # Historial de una conversación del chatbot, en orden
+    __table_args__ = (
+        Index("ix_conversaciones_sesion_creado", "sesion_id", "creado_en"),
+    )
+
+# --- Recomendaciones "los que compraron esto también compraron" ---
+# Las arma services/recommendation_service.py en un job por lotes (workers/).
+class CoocurrenciaProducto(Base):
+    """Matriz dispersa producto × producto: en cuántas órdenes aparecieron juntos."""
+    __tablename__ = "coocurrencias_productos"
+    producto_id = Column(Integer, ForeignKey("productos.id", ondelete="CASCADE"), primary_key=True)
+    relacionado_id = Column(Integer, ForeignKey("productos.id", ondelete="CASCADE"), primary_key=True)
+    veces = Column(Integer, nullable=False, default=0)
+
+
+class ProductoRelacionado(Base):
+    """Top-K de cada producto ya ordenado, listo para servir."""
+    __tablename__ = "productos_relacionados"
+    producto_id = Column(Integer, ForeignKey("productos.id", ondelete="CASCADE"), primary_key=True)
+    posicion = Column(Integer, primary_key=True)
+    relacionado_id = Column(Integer, ForeignKey("productos.id", ondelete="CASCADE"), nullable=False)
+    veces = Column(Integer, nullable=False)
+
+
+class EstadoTrabajo(Base):
+    """Hasta qué registro procesó cada job incremental (ej: última orden leída)."""
+    __tablename__ = "estado_trabajos"
+    nombre = Column(String(100), primary_key=True)
+    ultimo_id = Column(Integer, nullable=False, default=0)
+    # Ids ya procesados por encima de 'ultimo_id' (los que todavía pueden tener huecos abajo)
+    ids_recientes = Column(JSON, nullable=True)
+    actualizado_en = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now())
@@ -1,15 +1,17 @@
 # En BACKEND/main.py
 
+import os
+
 from fastapi import FastAPI
+from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
-from sqlalchemy import select
-from sqlalchemy.ext.asyncio import AsyncSession
 
-# --- IMPORTACIONES NUEVAS ---
-from database.database import engine, AsyncSessionLocal
-from database.models import Base, Categoria
-# --- FIN IMPORTACIONES NUEVAS ---
+from database.database import AsyncSessionLocal, engine, ensure_nosql_indexes
+from database.migrations import run_migrations
+from services import image_service, suggest_service
+from settings import settings
+from utils.request_limits import MultipartSizeLimitMiddleware
 
 from routers import (
     health_router, auth_router, products_router, cart_router,
@@ -17,43 +19,24 @@ from routers import (
     user_router, categories_router
 )
 
-# --- ACÁ ESTÁ LA MAGIA CORREGIDA ---
-async def seed_initial_data():
-    """Función para cargar datos iniciales si no existen."""
-    async with AsyncSessionLocal() as db:
-        result = await db.execute(select(Categoria))
-        if result.scalars().first() is None:
-            print("Base de datos de categorías vacía. Cargando datos iniciales...")
-            
-            # --- ¡LA LISTA BUENA, LA QUE VOS QUERÉS! ---
-            DEFAULT_CATEGORIES = [
-                "Hoodies",
-                "Jackets",
-                "Shirts",
-                "Pants",
-                "Dresses",
-                "Tops",
-                "Accessories"
-            ]
-            # -----------------------------------------
-
-            for cat_name in DEFAULT_CATEGORIES:
-                db.add(Categoria(nombre=cat_name))
-            await db.commit()
-            print("Categorías iniciales cargadas con éxito.")
-        else:
-            print("La base de datos de categorías ya tiene datos.")
-
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
-    
-    await seed_initial_data()
+    # El esquema y los datos iniciales los manejan las migraciones versionadas
+    # (database/migrations.py). Si la base ya está al día, esto es un SELECT.
+    await run_migrations(engine)
+
+    # Índices de MongoDB (usuarios por email, carritos por dueño y TTL de invitados)
+    await ensure_nosql_indexes()
+
+    # El índice del autocompletado se arma una vez acá y después se mantiene
+    # actualizado con las escrituras: las sugerencias no van a la base
+    async with AsyncSessionLocal() as db:
+        await suggest_service.ensure_index(db)
     
     yield
+    image_service.shutdown()
+    suggest_service.shutdown()
     await engine.dispose()
-# --- FIN DE LA MAGIA ---
 
 app = FastAPI(
     title="VOID Backend - Finalizado",
@@ -67,14 +50,32 @@ origins = [
     "http://localhost:5173",
 ]
 
+# Corta los formularios de productos con imágenes demasiado grandes antes de leerlos
+# (la importación de catálogo sube CSVs grandes a propósito y queda afuera).
+# Va antes que CORS: el último que se agrega queda más afuera, y así el 413
+# también sale con los headers de CORS y el front puede leer el mensaje.
+app.add_middleware(
+    MultipartSizeLimitMiddleware,
+    max_bytes=settings.UPLOAD_MAX_REQUEST_BYTES,
+    path_prefix="/api/products",
+    exclude_paths=["/api/products/import"],
+)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # El cursor de paginación y el ETag del catálogo viajan en headers
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
+# Con el almacenamiento local de imágenes (desarrollo/tests) el backend sirve la carpeta
+if settings.IMAGE_STORAGE_BACKEND == "local":
+    os.makedirs(settings.MEDIA_ROOT, exist_ok=True)
+    app.mount(settings.MEDIA_URL, StaticFiles(directory=settings.MEDIA_ROOT), name="media")
+
 @app.get("/")
 def home():
     return {"mensaje": "Backend de VOID funcionando (Sprint 6)."}
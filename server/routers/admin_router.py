@@ -4,13 +4,12 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
 from typing import List
-# --- ¡IMPORT NUEVO Y CLAVE! ---
-from pydantic import TypeAdapter 
-# --- FIN DEL IMPORT ---
 from schemas import admin_schemas, metrics_schemas, user_schemas
 from database.database import get_db, get_db_nosql
 from database.models import Gasto, Orden, DetalleOrden, VarianteProducto, Producto, Categoria
 from services.auth_services import get_current_admin_user
+from services.catalog_cache import catalog_cache
+from utils import fast_json
 from pymongo.database import Database
 from bson import ObjectId
 from sqlalchemy.orm import joinedload
@@ -23,11 +22,11 @@ router = APIRouter(
 
 
 # --- Endpoints de Gastos (SIN CAMBIOS) ---
-@router.get("/expenses", response_model=List[admin_schemas.Gasto])
+@router.get("/expenses", response_model=List[admin_schemas.Gasto], response_class=fast_json.FastJSONResponse)
 async def get_expenses(db: AsyncSession = Depends(get_db)):
     result = await db.execute(select(Gasto))
     expenses = result.scalars().all()
-    return expenses
+    return fast_json.fast_response(fast_json.ExpenseListAdapter, expenses)
 
 @router.post("/expenses", response_model=admin_schemas.Gasto, status_code=201)
 async def create_expense(gasto: admin_schemas.GastoCreate, db: AsyncSession = Depends(get_db)):
@@ -39,13 +38,13 @@ async def create_expense(gasto: admin_schemas.GastoCreate, db: AsyncSession = De
 
 
 # --- Endpoints de Ventas (SIN CAMBIOS) ---
-@router.get("/sales", response_model=List[admin_schemas.Orden])
+@router.get("/sales", response_model=List[admin_schemas.Orden], response_class=fast_json.FastJSONResponse)
 async def get_sales(db: AsyncSession = Depends(get_db)):
     result = await db.execute(
         select(Orden).options(joinedload(Orden.detalles))
     )
     sales = result.scalars().unique().all()
-    return sales
+    return fast_json.fast_response(fast_json.OrderListAdapter, sales)
 
 @router.post("/sales", status_code=201)
 async def create_manual_sale(sale_data: admin_schemas.ManualSaleCreate, db: AsyncSession = Depends(get_db)):
@@ -94,20 +93,15 @@ async def create_manual_sale(sale_data: admin_schemas.ManualSaleCreate, db: Asyn
 
 # --- Endpoints de Usuarios (ACÁ ESTÁ LA SOLUCIÓN DEFINITIVA) ---
 
-@router.get("/users", response_model=List[user_schemas.UserOut])
+@router.get("/users", response_model=List[user_schemas.UserOut], response_class=fast_json.FastJSONResponse)
 async def get_users(db: Database = Depends(get_db_nosql)):
     users_cursor = db.users.find({})
     users_list_from_db = await users_cursor.to_list(length=None)
     
-    # 1. Creamos un "adaptador" que entiende cómo validar una LISTA de UserOut
-    UserListAdapter = TypeAdapter(List[user_schemas.UserOut])
-    
-    # 2. Usamos el adaptador para validar y transformar la lista entera.
-    #    Esto FORZARÁ a Pydantic a aplicar el alias "_id" -> "id" a cada usuario.
-    validated_users = UserListAdapter.validate_python(users_list_from_db)
-    
-    # 3. Devolvemos la lista ya validada y transformada.
-    return validated_users
+    # El adaptador de LISTA de UserOut se compila una sola vez (en utils/fast_json).
+    # Valida la lista entera (aplicando el alias "_id" -> "id") y la serializa
+    # directo a bytes, sin la segunda validación de 'response_model'.
+    return fast_json.fast_response(fast_json.UserListAdapter, users_list_from_db)
 
 
 @router.put("/users/{user_id}/role", response_model=user_schemas.UserOut, summary="Actualizar rol de un usuario")
@@ -192,6 +186,11 @@ async def get_product_metrics(db: AsyncSession = Depends(get_db)):
         category_with_most_products=category_with_most_products_name
     )
 
+@router.get("/metrics/cache", response_model=metrics_schemas.CacheStats, summary="Contadores del cache del catálogo")
+async def get_cache_stats():
+    # Los contadores son de este proceso/worker
+    return catalog_cache.stats()
+
 @router.get("/charts/sales-over-time", response_model=metrics_schemas.SalesOverTimeChart)
 async def get_sales_over_time(db: AsyncSession = Depends(get_db)):
     # ... (código sin cambios)
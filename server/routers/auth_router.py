@@ -11,6 +11,7 @@ from schemas import user_schemas
 from utils import security
 from database.database import get_db_nosql
 from services import auth_services as auth_service
+from services import cart_service
 from services import email_service
 
 router = APIRouter(
@@ -151,50 +152,11 @@ async def merge_guest_cart(
     db: Database = Depends(get_db_nosql),
     current_user: user_schemas.UserOut = Depends(auth_service.get_current_user)
 ):
-    guest_session_id = request.guest_session_id
-    user_id = ObjectId(current_user.id)
-
-    # Find the guest cart
-    guest_cart = await db.carts.find_one({"guest_session_id": guest_session_id})
-    if not guest_cart or not guest_cart.get("items"):
-        # No guest cart to merge, so we're done.
+    # Se mezcla en Mongo en dos operaciones y es idempotente (ver cart_service.merge_guest_cart)
+    merged = await cart_service.merge_guest_cart(
+        db.carts, request.guest_session_id, ObjectId(current_user.id)
+    )
+    if merged is None:
+        # No guest cart to merge (or it was already merged by a previous retry).
         return {"message": "No guest cart to merge."}
-
-    # Find the user's cart
-    user_cart = await db.carts.find_one({"user_id": user_id})
-
-    if not user_cart:
-        # User has no cart, so we can just assign the guest cart to them.
-        await db.carts.update_one(
-            {"_id": guest_cart["_id"]},
-            {
-                "$set": {"user_id": user_id},
-                "$unset": {"guest_session_id": ""}
-            }
-        )
-        return {"message": "Guest cart assigned to user."}
-    else:
-        # Both user and guest have carts, merge them.
-        guest_items = guest_cart.get("items", [])
-        user_items = user_cart.get("items", [])
-        
-        user_items_map = {str(item["variante_id"]): item for item in user_items}
-
-        for guest_item in guest_items:
-            guest_variant_id = str(guest_item["variante_id"])
-            if guest_variant_id in user_items_map:
-                # Item exists, update quantity
-                user_items_map[guest_variant_id]["quantity"] += guest_item["quantity"]
-            else:
-                # New item, add it to the user's cart
-                user_items.append(guest_item)
-        
-        await db.carts.update_one(
-            {"_id": user_cart["_id"]},
-            {"$set": {"items": user_items}}
-        )
-        
-        # Delete the guest cart
-        await db.carts.delete_one({"_id": guest_cart["_id"]})
-        
-        return {"message": "Carts merged successfully."}
+    return {"message": "Carts merged successfully."}
@@ -1,12 +1,14 @@
 # En backend/routers/cart_router.py
-from fastapi import APIRouter, Depends, HTTPException, Header
+from fastapi import APIRouter, Depends, HTTPException, Header, Query
 from pymongo.database import Database
-from typing import Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional, Union
 from datetime import datetime
 import uuid
 
 from schemas import cart_schemas
-from database.database import get_db_nosql
+from services import cart_service
+from database.database import get_db, get_db_nosql
 from utils.security import get_current_user_optional
 
 router = APIRouter(
@@ -42,10 +44,12 @@ def get_guest_session():
 
 # --- Endpoints del Carrito ---
 
-@router.get("/", response_model=cart_schemas.Cart, summary="Obtener el carrito actual")
+@router.get("/", response_model=Union[cart_schemas.CartConciliado, cart_schemas.Cart], summary="Obtener el carrito actual")
 async def get_cart(
+    reconcile: bool = Query(False, description="Si es true, cada item viene con precio, stock y disponibilidad actuales"),
     guest_session_id: Optional[str] = Header(None, alias="X-Guest-Session-ID"),
     db: Database = Depends(get_db_nosql),
+    sql_db: AsyncSession = Depends(get_db),
     current_user: Optional[dict] = Depends(get_current_user_optional)
 ):
     identifier = get_session_identifier(current_user, guest_session_id)
@@ -57,7 +61,14 @@ async def get_cart(
         if "user_id" in new_cart_data:
             new_cart_data["user_id"] = str(new_cart_data["user_id"])
         new_cart_data.update({"items": [], "last_updated": datetime.now()})
+        if reconcile:
+            return cart_schemas.CartConciliado(**new_cart_data)
         return cart_schemas.Cart(**new_cart_data)
+
+    if reconcile:
+        # Todas las variantes en una consulta (o desde el cache del catálogo)
+        reconciled = await cart_service.reconcile_cart(sql_db, serialize_cart(cart))
+        return cart_schemas.CartConciliado(**reconciled)
         
     return cart_schemas.Cart(**serialize_cart(cart))
 
@@ -69,27 +80,33 @@ async def add_item_to_cart(
     current_user: Optional[dict] = Depends(get_current_user_optional)
 ):
     identifier = get_session_identifier(current_user, guest_session_id)
-    
-    result = await db.carts.update_one(
-        {**identifier, "items.variante_id": item.variante_id},
-        {"$inc": {"items.$.quantity": item.quantity}}
-    )
 
-    if result.modified_count == 0:
-        await db.carts.update_one(
-            identifier,
-            {
-                "$push": {"items": item.model_dump()},
-                "$set": {"last_updated": datetime.now()}
-            },
-            upsert=True
-        )
-        
-    updated_cart = await db.carts.find_one(identifier)
+    # Sumar o agregar la línea y devolver el carrito: un solo viaje a Mongo
+    updated_cart = await cart_service.apply_cart_mutation(
+        db.carts, identifier, cart_service.add_item(item.model_dump())
+    )
     if not updated_cart:
          raise HTTPException(status_code=404, detail="No se pudo encontrar o crear el carrito.")
     return cart_schemas.Cart(**serialize_cart(updated_cart))
 
+@router.patch("/items", response_model=cart_schemas.Cart, summary="Actualizar varios items del carrito de una vez")
+async def bulk_update_cart_items(
+    operations: cart_schemas.CartBulkOperations,
+    guest_session_id: Optional[str] = Header(None, alias="X-Guest-Session-ID"),
+    db: Database = Depends(get_db_nosql),
+    current_user: Optional[dict] = Depends(get_current_user_optional)
+):
+    identifier = get_session_identifier(current_user, guest_session_id)
+
+    # Todas las operaciones van en el mismo pipeline: se aplican juntas y en orden, o ninguna
+    updated_cart = await cart_service.apply_cart_mutation(
+        db.carts, identifier, cart_service.bulk_stages(operations), upsert=False
+    )
+    if not updated_cart:
+        raise HTTPException(status_code=404, detail="Carrito no encontrado.")
+
+    return cart_schemas.Cart(**serialize_cart(updated_cart))
+
 @router.delete("/items/{variante_id}", response_model=cart_schemas.Cart, summary="Eliminar un item del carrito")
 async def remove_item_from_cart(
     variante_id: int, 
@@ -98,23 +115,30 @@ async def remove_item_from_cart(
     current_user: Optional[dict] = Depends(get_current_user_optional)
 ):
     identifier = get_session_identifier(current_user, guest_session_id)
-    
-    result = await db.carts.update_one(
-        identifier,
-        {"$pull": {"items": {"variante_id": variante_id}}}
+
+    # Sin upsert: borrar de un carrito que no existe no lo crea
+    updated_cart = await cart_service.apply_cart_mutation(
+        db.carts, identifier, cart_service.remove_item(variante_id), upsert=False
     )
-    
-    if result.matched_count == 0:
-        cart = await db.carts.find_one(identifier)
-        if not cart:
-            raise HTTPException(status_code=404, detail="Carrito no encontrado.")
-    
-    updated_cart = await db.carts.find_one(identifier)
     if not updated_cart:
-        new_cart_data = identifier.copy()
-        if "user_id" in new_cart_data:
-            new_cart_data["user_id"] = str(new_cart_data["user_id"])
-        new_cart_data.update({"items": [], "last_updated": datetime.now()})
-        return cart_schemas.Cart(**new_cart_data)
+        raise HTTPException(status_code=404, detail="Carrito no encontrado.")
+
+    return cart_schemas.Cart(**serialize_cart(updated_cart))
+
+@router.put("/items/{variante_id}", response_model=cart_schemas.Cart, summary="Cambiar la cantidad de un item del carrito")
+async def set_item_quantity(
+    variante_id: int,
+    body: cart_schemas.CartItemQuantity,
+    guest_session_id: Optional[str] = Header(None, alias="X-Guest-Session-ID"),
+    db: Database = Depends(get_db_nosql),
+    current_user: Optional[dict] = Depends(get_current_user_optional)
+):
+    identifier = get_session_identifier(current_user, guest_session_id)
+
+    updated_cart = await cart_service.apply_cart_mutation(
+        db.carts, identifier, cart_service.set_item_quantity(variante_id, body.quantity), upsert=False
+    )
+    if not updated_cart:
+        raise HTTPException(status_code=404, detail="Carrito no encontrado.")
 
     return cart_schemas.Cart(**serialize_cart(updated_cart))
@@ -1,23 +1,75 @@
 # En server/routers/categories_router.py
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query, Request
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import case, func, select
 from typing import List
 
-from database.models import Categoria
+from database.models import Categoria, DisponibilidadProducto, Producto
 from schemas import product_schemas # Usamos el schema que acabamos de crear
 from database.database import get_db
+from services import catalog_cache
+from utils import fast_json, http_cache
 
 router = APIRouter(
     prefix="/api/categories",
     tags=["Categories"]
 )
 
-@router.get("/", response_model=List[product_schemas.Categoria], summary="Obtener todas las categorías")
-async def get_all_categories(db: AsyncSession = Depends(get_db)):
+
+async def _fetch_categories_with_stats(db: AsyncSession) -> list:
+    """Una sola consulta agrupada: cantidad de productos, con stock y rango de precios por categoría."""
+    query = (
+        select(
+            Categoria.id,
+            Categoria.nombre,
+            func.count(Producto.id).label("total_productos"),
+            func.count(case((DisponibilidadProducto.stock_total > 0, Producto.id))).label("productos_en_stock"),
+            func.min(Producto.precio).label("precio_min"),
+            func.max(Producto.precio).label("precio_max"),
+        )
+        .outerjoin(Producto, Producto.categoria_id == Categoria.id)
+        .outerjoin(DisponibilidadProducto, DisponibilidadProducto.producto_id == Producto.id)
+        .group_by(Categoria.id, Categoria.nombre)
+        .order_by(Categoria.nombre)
+    )
+    result = await db.execute(query)
+    return [row._asdict() for row in result.all()]
+
+
+@router.get("/", response_model=List[product_schemas.CategoriaConEstadisticas], summary="Obtener todas las categorías")
+async def get_all_categories(
+    request: Request,
+    include_stats: bool = Query(False, description="Sumar cantidad de productos, productos con stock y precio mínimo/máximo"),
+    db: AsyncSession = Depends(get_db)
+):
     """
     Devuelve una lista de todas las categorías de productos disponibles en la base de datos.
+    Con 'include_stats' la barra de navegación tiene todo lo que necesita en un solo pedido.
     """
-    result = await db.execute(select(Categoria).order_by(Categoria.nombre))
-    categories = result.scalars().all()
-    return categories
\ No newline at end of file
+    if include_stats:
+        cached = catalog_cache.catalog_cache.get(("categories", "stats"))
+        if cached is None:
+            categories = await _fetch_categories_with_stats(db)
+            body = fast_json.dump_json(fast_json.CategoryStatsListAdapter, categories)
+            cached = (http_cache.make_etag(body), body)
+            # Depende de los productos (altas, bajas, precios, stock), no solo de las categorías
+            tags = [catalog_cache.CATEGORIES, catalog_cache.PRODUCT_LISTS]
+            catalog_cache.catalog_cache.set(("categories", "stats"), cached, tags=tags)
+
+        etag, body = cached
+        return http_cache.json_response(request, body, etag)
+
+    cached = catalog_cache.catalog_cache.get(("categories",))
+    if cached is None:
+        result = await db.execute(select(Categoria).order_by(Categoria.nombre))
+        categories = result.scalars().all()
+        etag = http_cache.make_etag(*[(c.id, c.nombre) for c in categories])
+        if http_cache.etag_matches(request, etag):
+            return http_cache.not_modified(etag)
+
+        body = fast_json.dump_json(fast_json.CategoryListAdapter, categories)
+        cached = (etag, body)
+        catalog_cache.catalog_cache.set(("categories",), cached, tags=[catalog_cache.CATEGORIES])
+
+    etag, body = cached
+    return http_cache.json_response(request, body, etag)
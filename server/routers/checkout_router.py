@@ -8,6 +8,7 @@ from settings import settings
 from database.database import get_db
 from database.models import Orden, DetalleOrden, VarianteProducto, Producto
 from schemas import checkout_schemas
+from services import availability_service, catalog_cache, suggest_service
 
 router = APIRouter(prefix="/api/checkout", tags=["Checkout"])
 logging.basicConfig(level=logging.INFO)
@@ -27,6 +28,8 @@ async def save_order_and_update_stock(
     metodo_pago: str,
     shipping_address: dict = None # Parámetro opcional para la dirección
 ):
+    productos_afectados = set()
+    unidades_por_producto = {}
     try:
         new_order = Orden(
             usuario_id=usuario_id, 
@@ -61,10 +64,21 @@ async def save_order_and_update_stock(
                 raise Exception(f"Stock insuficiente para la variante ID {variante_id}")
             
             variante_producto.cantidad_en_stock -= cantidad_comprada
+            productos_afectados.add(variante_producto.producto_id)
+            unidades_por_producto[variante_producto.producto_id] = (
+                unidades_por_producto.get(variante_producto.producto_id, 0) + cantidad_comprada
+            )
         
+        # El agregado de disponibilidad se actualiza en la misma transacción que el stock
+        disponibilidad_cambiada = await availability_service.refresh_availability(db, productos_afectados)
+        order_id = new_order.id
         await db.commit()
-        logger.info(f"Orden {new_order.id} guardada y stock actualizado exitosamente.")
-        return new_order.id
+        # El stock cambió: sacamos del cache las respuestas que muestran esos productos
+        catalog_cache.invalidate_stock(productos_afectados, availability_changed=bool(disponibilidad_cambiada))
+        # Las ventas ordenan las sugerencias del buscador
+        await suggest_service.record_sales(db, unidades_por_producto)
+        logger.info(f"Orden {order_id} guardada y stock actualizado exitosamente.")
+        return order_id
 
     except Exception as e:
         logger.error(f"Error CRÍTICO al guardar la orden: {e}")
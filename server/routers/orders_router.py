@@ -9,6 +9,7 @@ from database.database import get_db
 from database.models import Orden
 from services.auth_services import get_current_user # Usamos el servicio de usuario normal
 from schemas.user_schemas import UserOut # Para el tipado de get_current_user
+from utils import fast_json
 
 router = APIRouter(
     prefix="/api/orders",
@@ -16,7 +17,7 @@ router = APIRouter(
     dependencies=[Depends(get_current_user)] # Protegemos todo el router
 )
 
-@router.get("/me", response_model=List[admin_schemas.Orden], summary="Obtener el historial de órdenes del usuario actual")
+@router.get("/me", response_model=List[admin_schemas.Orden], response_class=fast_json.FastJSONResponse, summary="Obtener el historial de órdenes del usuario actual")
 async def get_my_orders(db: AsyncSession = Depends(get_db), current_user: UserOut = Depends(get_current_user)):
     """
     Devuelve una lista de todas las órdenes realizadas por el usuario que ha iniciado sesión.
@@ -28,4 +29,4 @@ async def get_my_orders(db: AsyncSession = Depends(get_db), current_user: UserOu
         .order_by(Orden.creado_en.desc())
     )
     orders = result.scalars().unique().all()
-    return orders
+    return fast_json.fast_response(fast_json.OrderListAdapter, orders)
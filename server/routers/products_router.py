@@ -5,7 +5,7 @@ from typing import List, Optional
 
 # Terceros (FastAPI, SQLAlchemy, etc.)
 from fastapi import (
-    APIRouter, Depends, HTTPException, Query, status, 
+    APIRouter, Depends, HTTPException, Query, Request, status, 
     File, UploadFile, Form
 )
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -16,7 +16,11 @@ from sqlalchemy.orm import joinedload
 from database.database import get_db
 from database.models import VarianteProducto, Producto
 from schemas import product_schemas, user_schemas
-from services import auth_services, cloudinary_service
+from services import (
+    auth_services, availability_service, catalog_cache, catalog_import, catalog_service, image_service,
+    recommendation_service, search_service, suggest_service, variant_service
+)
+from utils import fast_json, http_cache
 
 
 router = APIRouter(
@@ -24,58 +28,132 @@ router = APIRouter(
     tags=["Products"]
 )
 
+cache = catalog_cache.catalog_cache
+
 # =======================================================================
 # VERSIÓN ÚNICA Y FUNCIONAL DE GET_PRODUCTS (SIN DUPLICADOS)
 # =======================================================================
-@router.get("/", response_model=List[product_schemas.Product], summary="Obtener una lista filtrada de productos")
+@router.get("/", response_model=List[product_schemas.Product], response_class=fast_json.FastJSONResponse, summary="Obtener una lista filtrada de productos")
 async def get_products(
+    request: Request,
     db: AsyncSession = Depends(get_db), 
-    q: Optional[str] = Query(None, description="Término de búsqueda para nombre"),
-    precio_min: Optional[float] = Query(None, ge=0),
-    precio_max: Optional[float] = Query(None, ge=0),
-    categoria_id: Optional[str] = Query(None, description="IDs de categoría separados por comas (ej: 1,3,5)"), 
-    talle: Optional[str] = Query(None, description="Talles separados por comas (ej: S,M,L)"), 
-    color: Optional[str] = Query(None, description="Colores separados por comas (ej: Rojo,Azul)"), 
+    filters: catalog_service.CatalogFilters = Depends(catalog_service.get_catalog_filters),
     skip: int = Query(0, ge=0), 
     limit: int = Query(12, ge=1, le=100),
-    sort_by: Optional[str] = Query(None, description="Opciones: precio_asc, precio_desc, nombre_asc, nombre_desc")
+    sort_by: Optional[str] = Query(None, description="Opciones: precio_asc, precio_desc, nombre_asc, nombre_desc"),
+    cursor: Optional[str] = Query(None, description="Cursor opaco del header 'X-Next-Cursor'. Si viene, se ignora 'skip'.")
 ):
-    query = select(Producto).options(joinedload(Producto.variantes))
+    cache_key = ("list", filters.signature(), sort_by, skip, limit, cursor)
+    cached = cache.get(cache_key)
+    if cached is None:
+        # Dos fases: primero la página de productos (el LIMIT cuenta productos, no
+        # filas producto×variante) y después las variantes de esa página en un batch.
+        # Con 'q' y sin 'sort_by', los resultados vienen ordenados por relevancia.
+        products, next_cursor = await catalog_service.fetch_product_page(
+            db, filters, sort_by=sort_by, skip=skip, limit=limit, cursor=cursor
+        )
+        etag = http_cache.make_etag(next_cursor, *[catalog_service.product_version(p) for p in products])
+        # Si el cliente ya tiene esta página, ni siquiera la serializamos
+        if http_cache.etag_matches(request, etag):
+            return http_cache.not_modified(etag)
 
-    if q: query = query.filter(Producto.nombre.ilike(f"%{q}%"))
-    if precio_min is not None: query = query.where(Producto.precio >= precio_min)
-    if precio_max is not None: query = query.where(Producto.precio <= precio_max)
-    
-    if categoria_id:
-        try:
-            id_list = [int(i.strip()) for i in categoria_id.split(',')]
-            query = query.where(Producto.categoria_id.in_(id_list))
-        except ValueError:
-            raise HTTPException(status_code=400, detail="El formato de 'categoria_id' es inválido. Deben ser números separados por comas.")
-
-    # Lógica mejorada para evitar joins duplicados
-    needs_variant_join = False
-    if talle:
-        talles = [t.strip() for t in talle.split(',')]
-        query = query.join(Producto.variantes).filter(VarianteProducto.tamanio.in_(talles))
-        needs_variant_join = True # Marcamos que ya hicimos el join
-    
-    if color:
-        colors = [c.strip() for c in color.split(',')]
-        if not needs_variant_join:
-            query = query.join(Producto.variantes)
-        query = query.filter(VarianteProducto.color.in_(colors))
-
-    if sort_by:
-        if sort_by == "precio_asc": query = query.order_by(Producto.precio.asc())
-        elif sort_by == "precio_desc": query = query.order_by(Producto.precio.desc())
-        elif sort_by == "nombre_asc": query = query.order_by(Producto.nombre.asc())
-        elif sort_by == "nombre_desc": query = query.order_by(Producto.nombre.desc())
-        
-    query = query.offset(skip).limit(limit)
-    result = await db.execute(query)
-    products = result.scalars().unique().all()
-    return products
+        body = fast_json.dump_json(fast_json.ProductListAdapter, products)
+        cached = (etag, body, next_cursor)
+        tags = [catalog_cache.PRODUCT_LISTS] + [catalog_cache.product_tag(p.id) for p in products]
+        cache.set(cache_key, cached, tags=tags)
+
+    etag, body, next_cursor = cached
+    # Le pasamos al cliente el cursor de la página siguiente
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
+    return http_cache.json_response(request, body, etag, headers)
+
+@router.get("/facets", response_model=product_schemas.ProductFacets, summary="Conteos por talle, color, categoría y precio")
+async def get_product_facets(
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    filters: catalog_service.CatalogFilters = Depends(catalog_service.get_catalog_filters),
+    price_edges: Optional[str] = Query(None, description="Cortes de los rangos de precio separados por comas (ej: 0,20000,50000)")
+):
+    """
+    Devuelve los conteos de productos por faceta para los mismos filtros que acepta
+    el listado, calculados en una sola consulta agregada.
+    """
+    edges = catalog_service.parse_price_edges(price_edges)
+
+    cache_key = ("facets", filters.signature(), tuple(edges))
+    cached = cache.get(cache_key)
+    if cached is None:
+        facets = await catalog_service.compute_facets(db, filters, edges)
+        body = product_schemas.ProductFacets(**facets).model_dump_json().encode("utf-8")
+        cached = (http_cache.make_etag(body), body)
+        cache.set(cache_key, cached, tags=[catalog_cache.PRODUCT_LISTS])
+
+    etag, body = cached
+    return http_cache.json_response(request, body, etag)
+
+@router.get("/suggest", response_model=product_schemas.SuggestResponse, summary="Sugerencias para el buscador (autocompletado)")
+async def suggest_products(
+    prefix: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(suggest_service.DEFAULT_LIMIT, ge=1, le=suggest_service.MAX_LIMIT),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Productos cuyo nombre, categoría o color empieza con lo tipeado (los más
+    vendidos primero), más las categorías y colores que coinciden. Sale del índice
+    en memoria: la base solo se consulta si el índice todavía no se construyó.
+    """
+    await suggest_service.ensure_index(db)
+    return suggest_service.prefix_index.suggest(prefix, limit)
+
+@router.get("/price-histogram", response_model=product_schemas.PriceHistogram, summary="Distribución de precios para el slider del catálogo")
+async def get_price_histogram(
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    filters: catalog_service.CatalogFilters = Depends(catalog_service.get_catalog_filters),
+    buckets: int = Query(10, ge=1, le=50),
+    modo: str = Query("fijo", description="fijo (rangos del mismo ancho) o adaptativo (misma cantidad de productos por rango)")
+):
+    """Mismos filtros que el listado; el resultado se cachea por combinación de filtros."""
+    if modo not in catalog_service.HISTOGRAM_MODES:
+        raise HTTPException(status_code=400, detail=f"Modo inválido. Opciones: {', '.join(catalog_service.HISTOGRAM_MODES)}")
+
+    cache_key = ("histogram", filters.signature(), buckets, modo)
+    cached = cache.get(cache_key)
+    if cached is None:
+        histogram = await catalog_service.compute_price_histogram(db, filters, buckets, modo)
+        body = product_schemas.PriceHistogram(**histogram).model_dump_json().encode("utf-8")
+        cached = (http_cache.make_etag(body), body)
+        cache.set(cache_key, cached, tags=[catalog_cache.PRODUCT_LISTS])
+
+    etag, body = cached
+    return http_cache.json_response(request, body, etag)
+
+# =======================================================================
+# LOOKUPS EN LOTE (CARRITO Y DETALLE DE ÓRDENES)
+# =======================================================================
+@router.get("/batch", response_model=List[product_schemas.Product], response_class=fast_json.FastJSONResponse, summary="Obtener varios productos por ID en un pedido")
+async def get_products_batch(
+    ids: str = Query(..., description=f"IDs de producto separados por comas (máximo {catalog_service.MAX_BATCH_IDS})"),
+    db: AsyncSession = Depends(get_db)
+):
+    """Resuelve muchos productos (con sus variantes) en una sola consulta. Los IDs inexistentes se omiten."""
+    product_ids = catalog_service.parse_id_list(ids)
+    products = await catalog_service.fetch_products_by_ids(db, product_ids)
+    return fast_json.fast_response(fast_json.ProductListAdapter, products)
+
+
+@router.get("/variants/batch", response_model=List[product_schemas.VarianteConProducto], response_class=fast_json.FastJSONResponse, summary="Obtener varias variantes por ID con su producto")
+async def get_variants_batch(
+    ids: str = Query(..., description=f"IDs de variante separados por comas (máximo {catalog_service.MAX_BATCH_IDS})"),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Resuelve los 'variante_id' de un carrito o los 'variante_producto_id' de una
+    orden, cada uno con su producto, en una sola consulta.
+    """
+    variant_ids = catalog_service.parse_id_list(ids)
+    variants = await catalog_service.fetch_variants_by_ids(db, variant_ids)
+    return fast_json.fast_response(fast_json.VariantListAdapter, variants)
 
 # =======================================================================
 # ENDPOINT QUE FALTABA PARA OBTENER UN SOLO PRODUCTO
@@ -83,21 +161,93 @@ async def get_products(
 @router.get("/{product_id}", response_model=product_schemas.Product, summary="Obtener un producto por su ID")
 async def get_product_by_id(
     product_id: int, 
+    request: Request,
     db: AsyncSession = Depends(get_db)
 ):
-    query = select(Producto).options(
-        joinedload(Producto.variantes)
-    ).where(Producto.id == product_id)
-    
-    result = await db.execute(query)
-    product = result.scalars().unique().first()
-    
-    if not product:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, 
-            detail=f"Producto con ID {product_id} no encontrado"
-        )
-    return product
+    cache_key = ("detail", product_id)
+    cached = cache.get(cache_key)
+    if cached is None:
+        query = select(Producto).options(
+            joinedload(Producto.variantes)
+        ).where(Producto.id == product_id)
+        
+        result = await db.execute(query)
+        product = result.scalars().unique().first()
+        
+        if not product:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, 
+                detail=f"Producto con ID {product_id} no encontrado"
+            )
+        etag = http_cache.make_etag(catalog_service.product_version(product))
+        if http_cache.etag_matches(request, etag):
+            return http_cache.not_modified(etag)
+
+        body = product_schemas.Product.model_validate(product).model_dump_json().encode("utf-8")
+        cached = (etag, body)
+        cache.set(cache_key, cached, tags=[catalog_cache.product_tag(product_id)])
+
+    etag, body = cached
+    return http_cache.json_response(request, body, etag)
+
+@router.get("/{product_id}/availability", response_model=product_schemas.VariantGrid, summary="Grilla compacta de talle × color con stock")
+async def get_product_availability(
+    product_id: int,
+    request: Request,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Lo que necesita la página de producto para armar los selectores de talle y
+    color: los ejes y las matrices de stock e ids, sin los objetos de variante.
+    """
+    cache_key = ("grid", product_id)
+    cached = cache.get(cache_key)
+    if cached is None:
+        grid = await variant_service.get_availability_grid(db, product_id)
+        if not grid["talles"] and not await db.get(Producto, product_id):
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Producto con ID {product_id} no encontrado")
+
+        etag = http_cache.make_etag("grid", grid["talles"], grid["colores"], grid["stock"], grid["ids"])
+        if http_cache.etag_matches(request, etag):
+            return http_cache.not_modified(etag)
+
+        body = product_schemas.VariantGrid(**grid).model_dump_json().encode("utf-8")
+        cached = (etag, body)
+        cache.set(cache_key, cached, tags=[catalog_cache.product_tag(product_id)])
+
+    etag, body = cached
+    return http_cache.json_response(request, body, etag)
+
+
+@router.get("/{product_id}/related", response_model=List[product_schemas.Product], response_class=fast_json.FastJSONResponse, summary="Productos que se suelen comprar junto a este")
+async def get_related_products(
+    product_id: int,
+    request: Request,
+    limit: int = Query(6, ge=1, le=recommendation_service.TOP_K),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Sale de la tabla precalculada por el job de recomendaciones
+    (workers/update_recommendations.py). Sin co-compras todavía, devuelve [].
+    """
+    cache_key = ("related", product_id, limit)
+    cached = cache.get(cache_key)
+    if cached is None:
+        products = await recommendation_service.get_related_products(db, product_id, limit)
+        if not products and not await db.get(Producto, product_id):
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Producto con ID {product_id} no encontrado")
+
+        etag = http_cache.make_etag(*[catalog_service.product_version(p) for p in products])
+        if http_cache.etag_matches(request, etag):
+            return http_cache.not_modified(etag)
+
+        body = fast_json.dump_json(fast_json.ProductListAdapter, products)
+        cached = (etag, body)
+        tags = [catalog_cache.product_tag(product_id)] + [catalog_cache.product_tag(p.id) for p in products]
+        cache.set(cache_key, cached, tags=tags)
+
+    etag, body = cached
+    return http_cache.json_response(request, body, etag)
 
 # =======================================================================
 # ENDPOINTS DE ADMIN (YA ESTABAN BIEN, SOLO SE AGREGAN SUMMARIES)
@@ -124,9 +274,11 @@ async def create_product(
     if len(images) > 3:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Se pueden subir como máximo 3 imágenes.")
 
-    image_urls = []
+    image_urls, image_derivatives = [], {}
     if images and images[0].filename:
-        image_urls = await cloudinary_service.upload_images(images)
+        # Original + miniaturas WebP de cada imagen, todas en paralelo
+        image_sets = await image_service.process_uploads(images)
+        image_urls, image_derivatives = image_service.split_image_sets(image_sets)
 
     product_data = product_schemas.ProductCreate(
         nombre=nombre, descripcion=descripcion, precio=precio, sku=sku,
@@ -134,10 +286,9 @@ async def create_product(
         talle=talle, color=color, urls_imagenes=image_urls
     )
 
-    new_product = Producto(**product_data.model_dump())
+    new_product = Producto(**product_data.model_dump(), imagenes_derivadas=image_derivatives)
     db.add(new_product)
-    await db.commit()
-    await db.refresh(new_product)
+    await db.flush()
 
     if talle and stock > 0:
         default_variant = VarianteProducto(
@@ -145,14 +296,37 @@ async def create_product(
             color=color or "default", cantidad_en_stock=stock
         )
         db.add(default_variant)
-        await db.commit()
+        await db.flush()
+
+    # Producto, variante y disponibilidad en la misma transacción
+    await availability_service.refresh_availability(db, [new_product.id])
+    await db.commit()
+    await db.refresh(new_product)
 
     query = select(Producto).options(joinedload(Producto.variantes)).filter(Producto.id == new_product.id)
     result = await db.execute(query)
     created_product = result.scalars().unique().first()
+    search_service.index_product(created_product)
+    await suggest_service.index_product(db, created_product, [v.color for v in created_product.variantes])
+    catalog_cache.invalidate_product(created_product.id)
     return created_product
 
 
+@router.post("/import", response_model=product_schemas.ImportReport, summary="Importar productos en masa desde CSV o JSONL (Solo Admins)")
+async def import_products(
+    file: UploadFile = File(..., description="Archivo .csv o .jsonl; los productos se crean o actualizan por SKU"),
+    formato: Optional[str] = Query(None, description="csv o jsonl. Si no viene, se deduce de la extensión del archivo"),
+    db: AsyncSession = Depends(get_db),
+    current_admin: user_schemas.UserOut = Depends(auth_services.get_current_admin_user)
+):
+    file_format = formato or catalog_import.detect_format(file.filename)
+    if file_format not in ("csv", "jsonl"):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Formato no soportado. Usá un archivo .csv o .jsonl.")
+
+    # UploadFile ya está en un archivo temporal: se lee de a una fila, sin cargarlo entero
+    return await catalog_import.import_catalog(db, file.file, file_format)
+
+
 @router.put("/{product_id}", response_model=product_schemas.Product, summary="Actualizar un producto (Solo Admins)")
 async def update_product(
     product_id: int, 
@@ -193,28 +367,39 @@ async def update_product(
             setattr(product_db, key, value)
 
     # 2. Gestionar imágenes
-    current_image_urls = product_db.urls_imagenes or []
+    current_image_urls = list(product_db.urls_imagenes or [])
+    # Copia nueva: si se modifica el dict en el lugar, SQLAlchemy no detecta el cambio en la columna JSON
+    current_derivatives = dict(product_db.imagenes_derivadas or {})
 
-    # 2a. Eliminar imágenes marcadas
+    # 2a. Eliminar imágenes marcadas (con sus derivados)
     if images_to_delete:
         urls_to_delete = [url.strip() for url in images_to_delete.split(',')]
-        await cloudinary_service.delete_images(urls_to_delete)
+        await image_service.delete_product_images(urls_to_delete, current_derivatives)
         current_image_urls = [url for url in current_image_urls if url not in urls_to_delete]
+        for url in urls_to_delete:
+            current_derivatives.pop(url, None)
 
     # 2b. Subir nuevas imágenes
     if new_images and new_images[0].filename:
         if len(current_image_urls) + len(new_images) > 3:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Un producto no puede tener más de 3 imágenes en total.")
         
-        new_image_urls = await cloudinary_service.upload_images(new_images)
+        new_image_urls, new_derivatives = image_service.split_image_sets(await image_service.process_uploads(new_images))
         current_image_urls.extend(new_image_urls)
+        current_derivatives.update(new_derivatives)
 
     product_db.urls_imagenes = current_image_urls
+    product_db.imagenes_derivadas = current_derivatives
 
     # 3. Guardar en la base de datos
     db.add(product_db)
+    await db.flush()
+    await availability_service.refresh_availability(db, [product_id])
     await db.commit()
     await db.refresh(product_db)
+    search_service.index_product(product_db)
+    await suggest_service.index_product(db, product_db)
+    catalog_cache.invalidate_product(product_id)
     
     return product_db
 
@@ -232,6 +417,9 @@ async def delete_product(
     # SQLAlchemy se encarga de borrar en cascada si está bien configurado en el modelo
     await db.delete(product_db)
     await db.commit()
+    search_service.remove_product(product_id)
+    await suggest_service.remove_product(db, product_id)
+    catalog_cache.invalidate_product(product_id)
     
     return {"message": "Producto eliminado exitosamente"}
 
@@ -251,7 +439,53 @@ async def create_variant_for_product(
     new_variant = VarianteProducto(producto_id=product_id, **variant_data)
     
     db.add(new_variant)
+    await db.flush()
+    await availability_service.refresh_availability(db, [product_id])
     await db.commit()
     await db.refresh(new_variant)
+    # Una variante nueva cambia el detalle y puede cambiar los filtros por talle/color
+    catalog_cache.invalidate_product(product_id)
+    await suggest_service.add_variant_colors(db, product_id, [new_variant.color])
     
-    return new_variant
\ No newline at end of file
+    return new_variant
+
+@router.put("/{product_id}/variants/bulk", response_model=product_schemas.VariantMatrix, summary="Crear o actualizar variantes en lote (Solo Admins)")
+async def bulk_update_variants(
+    product_id: int,
+    bulk_in: product_schemas.VariantBulkUpdate,
+    db: AsyncSession = Depends(get_db),
+    current_admin: user_schemas.UserOut = Depends(auth_services.get_current_admin_user)
+):
+    """
+    Aplica una matriz talle × color (crea las combinaciones nuevas y deja el stock
+    de las existentes en el valor pedido) y/o ajustes por ID de variante, todo en
+    una sola transacción. Devuelve la matriz resultante.
+    """
+    product = await db.get(Producto, product_id)
+    if not product:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Producto no encontrado")
+
+    try:
+        created = False
+        if bulk_in.matriz:
+            created = await variant_service.apply_variant_matrix(db, product_id, bulk_in.matriz)
+        if bulk_in.ajustes:
+            await variant_service.apply_stock_adjustments(db, product_id, bulk_in.ajustes)
+        disponibilidad_cambiada = await availability_service.refresh_availability(db, [product_id])
+        await db.commit()
+    except HTTPException:
+        await db.rollback()
+        raise
+
+    # Variantes nuevas cambian los filtros por talle/color de los listados; si solo
+    # cambió stock alcanza con las entradas que muestran este producto (salvo que
+    # se haya agotado o repuesto, por el filtro 'in_stock_only')
+    if created:
+        catalog_cache.invalidate_product(product_id)
+    else:
+        catalog_cache.invalidate_stock([product_id], availability_changed=bool(disponibilidad_cambiada))
+
+    matrix = await variant_service.get_variant_matrix(db, product_id)
+    if created:
+        await suggest_service.add_variant_colors(db, product_id, matrix["colores"])
+    return matrix
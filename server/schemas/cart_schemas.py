@@ -1,7 +1,7 @@
 # En backend/schemas/cart_schemas.py
 
-from pydantic import BaseModel, Field, BeforeValidator, ConfigDict
-from typing import List, Optional
+from pydantic import BaseModel, Field, BeforeValidator, ConfigDict, model_validator
+from typing import List, Literal, Optional
 from datetime import datetime
 from typing_extensions import Annotated
 
@@ -16,6 +16,28 @@ class CartItem(BaseModel):
     image_url: Optional[str] = None
     size: Optional[str] = None # <-- ¡AGREGAMOS ESTA LÍNEA!
 
+# Para cambiar la cantidad de una línea (0 la elimina)
+class CartItemQuantity(BaseModel):
+    quantity: int = Field(..., ge=0)
+
+# Una operación del PATCH en lote: 'set' deja la cantidad (0 la saca),
+# 'increment' suma o resta, 'remove' saca la línea
+class CartItemOperation(BaseModel):
+    variante_id: int
+    op: Literal["set", "increment", "remove"] = "set"
+    quantity: Optional[int] = None
+
+    @model_validator(mode="after")
+    def check_quantity(self):
+        if self.op == "set" and (self.quantity is None or self.quantity < 0):
+            raise ValueError("'set' necesita una 'quantity' mayor o igual a 0.")
+        if self.op == "increment" and not self.quantity:
+            raise ValueError("'increment' necesita una 'quantity' distinta de 0.")
+        return self
+
+MAX_BULK_OPERATIONS = 100
+CartBulkOperations = Annotated[List[CartItemOperation], Field(min_length=1, max_length=MAX_BULK_OPERATIONS)]
+
 # Molde para el objeto principal del carrito
 # En backend/schemas/cart_schemas.py
 
@@ -32,4 +54,19 @@ class Cart(BaseModel):
     model_config = ConfigDict(
         populate_by_name = True,
         arbitrary_types_allowed = True
-    )
\ No newline at end of file
+    )
+
+# --- Vista conciliada ('GET /api/cart?reconcile=true') ---
+class CartItemConciliado(CartItem):
+    existe: bool
+    disponible: bool # hay stock para la cantidad pedida
+    precio_cambio: bool # 'price' (el guardado) ya no es el precio actual
+    precio_actual: Optional[float] = None
+    nombre_actual: Optional[str] = None
+    stock_disponible: Optional[int] = None
+    miniatura: Optional[str] = None
+
+class CartConciliado(Cart):
+    items: List[CartItemConciliado] = []
+    total: float = 0 # con los precios actuales
+    requiere_revision: bool = False # alguna línea cambió de precio, no tiene stock o ya no existe
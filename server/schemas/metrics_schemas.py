@@ -28,4 +28,15 @@ class ExpensesByCategoryDataPoint(BaseModel):
     monto: float
 
 class ExpensesByCategoryChart(BaseModel):
-    data: List[ExpensesByCategoryDataPoint]
\ No newline at end of file
+    data: List[ExpensesByCategoryDataPoint]
+
+class CacheStats(BaseModel):
+    entries: int
+    maxsize: int
+    ttl_seconds: float
+    hits: int
+    misses: int
+    hit_ratio: float
+    evictions: int
+    expirations: int
+    invalidations: int
\ No newline at end of file
@@ -1,8 +1,8 @@
 # En backend/schemas/product_schemas.py
 # ESTE ARCHIVO ES PARA TU BASE DE DATOS SQL (POSTGRESQL, MYSQL, ETC.)
 
-from pydantic import BaseModel, Field, ConfigDict
-from typing import List, Optional
+from pydantic import BaseModel, Field, ConfigDict, computed_field, model_validator
+from typing import Dict, List, Optional
 
 # --- Esquemas para Variantes de Producto (SQL) ---
 class VarianteProductoBase(BaseModel):
@@ -18,6 +18,78 @@ class VarianteProducto(VarianteProductoBase):
     producto_id: int
     model_config = ConfigDict(from_attributes=True)
 
+# --- Esquemas para crear/actualizar variantes en lote ---
+class VariantStockAdjustment(BaseModel):
+    variant_id: int
+    cantidad_en_stock: Optional[int] = Field(None, ge=0) # valor absoluto (ej: recuento de depósito)
+    delta: Optional[int] = None # o un ajuste relativo (ej: +10 por reposición, -2 por fallas)
+
+    @model_validator(mode="after")
+    def exactly_one_value(self):
+        if (self.cantidad_en_stock is None) == (self.delta is None):
+            raise ValueError("Cada ajuste lleva 'cantidad_en_stock' o 'delta' (uno solo de los dos).")
+        return self
+
+class VariantBulkUpdate(BaseModel):
+    # {"M": {"Negro": 5, "Blanco": 3}, "L": {"Negro": 2}} -> crea o deja el stock en ese valor
+    matriz: Dict[str, Dict[str, int]] = {}
+    ajustes: List[VariantStockAdjustment] = []
+
+    @model_validator(mode="after")
+    def not_empty(self):
+        if not self.matriz and not self.ajustes:
+            raise ValueError("Mandá una 'matriz' talle × color, una lista de 'ajustes' o ambas.")
+        if any(cantidad < 0 for colores in self.matriz.values() for cantidad in colores.values()):
+            raise ValueError("El stock de la matriz no puede ser negativo.")
+        return self
+
+class VariantMatrix(BaseModel):
+    producto_id: int
+    talles: List[str]
+    colores: List[str]
+    matriz: Dict[str, Dict[str, int]]
+    variantes: List[VarianteProducto]
+
+class VariantGrid(BaseModel):
+    producto_id: int
+    talles: List[str]
+    colores: List[str]
+    stock: List[List[Optional[int]]] # [talle][color], null = la combinación no existe
+    ids: List[List[Optional[int]]] # id de variante de cada celda
+
+# --- Imágenes en cada tamaño ---
+class ImagenProducto(BaseModel):
+    original: str
+    grande: str # página del producto
+    mediana: str # tarjetas y vista rápida
+    miniatura: str # grillas del catálogo, buscador y carrito
+
+class ConImagenes(BaseModel):
+    # Solo se usa para armar 'imagenes' y 'miniatura', no sale en la respuesta
+    imagenes_derivadas: Optional[Dict[str, Dict[str, str]]] = Field(None, exclude=True)
+
+    @computed_field
+    @property
+    def imagenes(self) -> List[ImagenProducto]:
+        # Las imágenes subidas antes del pipeline no tienen derivados: se usa el original
+        derivadas = self.imagenes_derivadas or {}
+        result = []
+        for url in self.urls_imagenes or []:
+            sizes = derivadas.get(url) or {}
+            result.append(ImagenProducto(
+                original=url,
+                grande=sizes.get("grande", url),
+                mediana=sizes.get("mediana", url),
+                miniatura=sizes.get("miniatura", url),
+            ))
+        return result
+
+    @computed_field
+    @property
+    def miniatura(self) -> Optional[str]:
+        imagenes = self.imagenes
+        return imagenes[0].miniatura if imagenes else None
+
 # --- Esquemas para Productos (SQL) ---
 class ProductBase(BaseModel):
     nombre: str
@@ -36,13 +108,103 @@ class ProductUpdate(BaseModel):
     nombre: Optional[str] = None
     # ... otros campos opcionales ...
 
-class Product(ProductBase):
+class Product(ConImagenes, ProductBase):
     id: int
     variantes: List[VarianteProducto] = []
     model_config = ConfigDict(from_attributes=True)
 
+# --- Esquemas para resolver variantes en lote (carrito / detalle de orden) ---
+class ProductoResumen(ConImagenes):
+    id: int
+    nombre: str
+    precio: float
+    sku: str
+    urls_imagenes: Optional[List[str]] = []
+    categoria_id: int
+    model_config = ConfigDict(from_attributes=True)
+
+class VarianteConProducto(VarianteProducto):
+    producto: ProductoResumen
+
 # --- Esquema para Categorías (SQL) ---
 class Categoria(BaseModel):
     id: int
     nombre: str
-    model_config = ConfigDict(from_attributes=True)
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True)
+
+class CategoriaConEstadisticas(Categoria):
+    # Solo vienen con '?include_stats=true'
+    total_productos: Optional[int] = None
+    productos_en_stock: Optional[int] = None
+    precio_min: Optional[float] = None
+    precio_max: Optional[float] = None
+
+# --- Esquemas para las facetas del catálogo ---
+class FacetValue(BaseModel):
+    valor: str
+    total: int
+
+class CategoriaFacet(BaseModel):
+    id: int
+    nombre: str
+    total: int
+
+class PriceBucket(BaseModel):
+    desde: float
+    hasta: Optional[float] = None # None = rango abierto
+    total: int
+
+class PriceHistogram(BaseModel):
+    modo: str
+    total: int
+    precio_min: Optional[float] = None
+    precio_max: Optional[float] = None
+    buckets: List[PriceBucket] = []
+
+class ProductFacets(BaseModel):
+    talles: List[FacetValue] = []
+    colores: List[FacetValue] = []
+    categorias: List[CategoriaFacet] = []
+    precios: List[PriceBucket] = []
+
+# --- Esquemas para el autocompletado del buscador ---
+class ProductSuggestion(BaseModel):
+    id: int
+    nombre: str
+    vendidos: int
+
+class SuggestResponse(BaseModel):
+    productos: List[ProductSuggestion] = []
+    categorias: List[Categoria] = []
+    colores: List[str] = []
+
+# --- Esquemas para la importación masiva del catálogo ---
+class ProductImportRow(ProductBase):
+    # Si no viene el stock total se calcula sumando las variantes
+    stock: Optional[int] = Field(None, ge=0)
+    variantes: List[VarianteProductoCreate] = []
+
+    @model_validator(mode="after")
+    def unique_variants(self):
+        # La tabla de variantes no tiene índice único: una repetida se insertaría dos veces
+        seen = set()
+        for variante in self.variantes:
+            key = (variante.tamanio, variante.color)
+            if key in seen:
+                raise ValueError(f"La variante {variante.tamanio}/{variante.color} está repetida.")
+            seen.add(key)
+        return self
+
+class ImportRowError(BaseModel):
+    fila: int
+    sku: Optional[str] = None
+    error: str
+
+class ImportReport(BaseModel):
+    filas: int
+    creados: int
+    actualizados: int
+    variantes_creadas: int
+    variantes_actualizadas: int
+    total_errores: int
+    errores: List[ImportRowError] = [] # como máximo las primeras 1000
@@ -0,0 +1,125 @@
+# En BACKEND/services/availability_service.py
+#
+# Disponibilidad precalculada por producto (stock total, talles y colores con
+# stock), en la tabla 'disponibilidad_productos'.
+#
+# 'Producto.stock' y la suma de las variantes se cargaban por separado y se
+# desfasaban. Ahora, cada vez que cambian variantes (checkout, endpoints de
+# variantes, alta/edición de productos, importación), se llama a
+# refresh_availability() ANTES del commit, así el agregado y 'Producto.stock'
+# quedan en la misma transacción que el cambio de stock.
+#
+# Los productos sin variantes (cargados a mano, sin talle) conservan su
+# 'Producto.stock' como total.
+
+from typing import Dict, Iterable, List, Set
+
+from sqlalchemy import case, select, update
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.models import DisponibilidadProducto, Producto, VarianteProducto
+
+CHUNK_SIZE = 500
+
+
+def _chunks(items: List[int], size: int = CHUNK_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _queries(product_ids: List[int]):
+    products = select(Producto.id, Producto.stock).where(Producto.id.in_(product_ids))
+    variants = (
+        select(VarianteProducto.producto_id, VarianteProducto.tamanio, VarianteProducto.color, VarianteProducto.cantidad_en_stock)
+        .where(VarianteProducto.producto_id.in_(product_ids))
+        .order_by(VarianteProducto.id)
+    )
+    return products, variants
+
+
+def _build_rows(product_stock: Dict[int, int], variant_rows) -> tuple:
+    """Arma las filas del agregado y el stock total a sincronizar en 'productos'."""
+    aggregates: Dict[int, dict] = {}
+    for producto_id, tamanio, color, cantidad in variant_rows:
+        agg = aggregates.setdefault(producto_id, {"stock_total": 0, "talles": [], "colores": []})
+        agg["stock_total"] += cantidad
+        if cantidad > 0:
+            if tamanio not in agg["talles"]:
+                agg["talles"].append(tamanio)
+            if color not in agg["colores"]:
+                agg["colores"].append(color)
+
+    rows, stock_updates = [], {}
+    for producto_id, stock in product_stock.items():
+        agg = aggregates.get(producto_id)
+        if agg is None:
+            rows.append({"producto_id": producto_id, "stock_total": stock or 0, "talles": [], "colores": []})
+            continue
+        rows.append({"producto_id": producto_id, **agg})
+        if stock != agg["stock_total"]:
+            stock_updates[producto_id] = agg["stock_total"]
+    return rows, stock_updates
+
+
+def _write_statements(dialect_name: str, rows: List[dict], stock_updates: Dict[int, int]) -> list:
+    table = DisponibilidadProducto.__table__
+    statements = []
+    if rows:
+        if dialect_name == "mysql":
+            stmt = mysql_insert(table).values(rows)
+            stmt = stmt.on_duplicate_key_update(
+                stock_total=stmt.inserted.stock_total, talles=stmt.inserted.talles, colores=stmt.inserted.colores
+            )
+        else:
+            stmt = sqlite_insert(table).values(rows)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[table.c.producto_id],
+                set_={"stock_total": stmt.excluded.stock_total, "talles": stmt.excluded.talles, "colores": stmt.excluded.colores}
+            )
+        statements.append(stmt)
+    if stock_updates:
+        productos = Producto.__table__
+        statements.append(
+            update(productos)
+            .where(productos.c.id.in_(list(stock_updates)))
+            .values(stock=case(stock_updates, value=productos.c.id))
+        )
+    return statements
+
+
+async def refresh_availability(db: AsyncSession, product_ids: Iterable[int]) -> Set[int]:
+    """
+    Recalcula el agregado de esos productos dentro de la transacción actual (no
+    hace commit). Devuelve los productos que pasaron de agotados a disponibles o
+    al revés: esos cambian los listados con 'in_stock_only' y hay que invalidarlos.
+    """
+    # Los cambios de stock hechos con el ORM (ej: checkout) tienen que estar en la base antes de leer
+    await db.flush()
+    ids = sorted(set(product_ids))
+    flipped: Set[int] = set()
+    for chunk in _chunks(ids):
+        products_query, variants_query = _queries(chunk)
+        product_stock = dict((await db.execute(products_query)).all())
+        variant_rows = (await db.execute(variants_query)).all()
+        previous = dict((await db.execute(
+            select(DisponibilidadProducto.producto_id, DisponibilidadProducto.stock_total)
+            .where(DisponibilidadProducto.producto_id.in_(chunk))
+        )).all())
+
+        rows, stock_updates = _build_rows(product_stock, variant_rows)
+        flipped.update(
+            row["producto_id"] for row in rows
+            if (previous.get(row["producto_id"], 0) > 0) != (row["stock_total"] > 0)
+        )
+        for stmt in _write_statements(db.bind.dialect.name, rows, stock_updates):
+            await db.execute(stmt)
+    return flipped
+
+
+def in_stock_clause():
+    """Productos con stock, resuelto sobre el índice (stock_total, producto_id)."""
+    return Producto.id.in_(
+        select(DisponibilidadProducto.producto_id).where(DisponibilidadProducto.stock_total > 0)
+    )
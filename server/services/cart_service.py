@@ -0,0 +1,297 @@
+# En BACKEND/services/cart_service.py
+#
+# Mutaciones del carrito en un solo viaje a Mongo.
+#
+# Antes agregar un item eran hasta tres consultas (update_one con $inc, si no
+# había línea otro update_one con $push y upsert, y un find_one para devolver
+# el carrito). Entre la primera y la segunda, dos "agregar" simultáneos del
+# mismo producto podían pushear dos líneas iguales.
+#
+# Ahora cada operación es una etapa de un pipeline de actualización y se manda
+# todo en un único find_one_and_update (upsert + ReturnDocument.AFTER): Mongo
+# lo aplica atómicamente sobre el documento y devuelve el carrito ya
+# modificado. Las etapas se pueden encadenar (ver apply_cart_mutation).
+
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from pymongo import ReturnDocument
+from pymongo.errors import PyMongoError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.models import Producto, VarianteProducto
+from services import catalog_cache
+
+logger = logging.getLogger(__name__)
+
+# Campos de cada línea (cart_schemas.CartItem). Se arman a mano porque
+# '$mergeObjects' no está en todas las versiones que usamos (ni en mongomock).
+ITEM_FIELDS = ("variante_id", "quantity", "price", "name", "image_url", "size")
+
+_ITEMS = {"$ifNull": ["$items", []]}
+
+
+def _line_with_quantity(quantity_expr) -> dict:
+    line = {field: f"$$it.{field}" for field in ITEM_FIELDS}
+    line["quantity"] = quantity_expr
+    return line
+
+
+def _map_line(variante_id: int, quantity_expr) -> dict:
+    """La lista de items con la cantidad de esa variante reemplazada por 'quantity_expr'."""
+    return {"$map": {
+        "input": _ITEMS,
+        "as": "it",
+        "in": {"$cond": [
+            {"$eq": ["$$it.variante_id", variante_id]},
+            _line_with_quantity(quantity_expr),
+            "$$it",
+        ]},
+    }}
+
+
+def _has_line(variante_id: int) -> dict:
+    return {"$in": [variante_id, {"$map": {"input": _ITEMS, "as": "it", "in": "$$it.variante_id"}}]}
+
+
+def _push_line(item: dict) -> dict:
+    # $literal: el nombre o la URL del item no se interpretan como expresiones aunque empiecen con '$'
+    return {"$concatArrays": [_ITEMS, {"$literal": [item]}]}
+
+
+def _drop_empty_lines() -> dict:
+    return {"$set": {"items": {"$filter": {"input": _ITEMS, "as": "it", "cond": {"$gt": ["$$it.quantity", 0]}}}}}
+
+
+# --- Etapas ---
+def add_item(item: dict) -> List[dict]:
+    """Suma la cantidad si la variante ya está en el carrito; si no, agrega la línea."""
+    variante_id = item["variante_id"]
+    return [{"$set": {"items": {"$cond": [
+        _has_line(variante_id),
+        _map_line(variante_id, {"$add": ["$$it.quantity", item["quantity"]]}),
+        _push_line(item),
+    ]}}}]
+
+
+def increment_item(variante_id: int, delta: int) -> List[dict]:
+    """Suma (o resta) a una línea existente. Si queda en 0 o menos, la línea se va."""
+    return [
+        {"$set": {"items": _map_line(variante_id, {"$add": ["$$it.quantity", delta]})}},
+        _drop_empty_lines(),
+    ]
+
+
+def set_item_quantity(variante_id: int, quantity: int, item: Optional[dict] = None) -> List[dict]:
+    """
+    Deja la línea con esa cantidad (0 la elimina). Si la variante no estaba y
+    viene 'item', se agrega con esa cantidad; si no, no hace nada.
+    """
+    if quantity <= 0:
+        return remove_item(variante_id)
+    missing = _push_line({**item, "quantity": quantity}) if item is not None else _ITEMS
+    return [{"$set": {"items": {"$cond": [
+        _has_line(variante_id),
+        _map_line(variante_id, quantity),
+        missing,
+    ]}}}]
+
+
+def remove_item(variante_id: int) -> List[dict]:
+    return [{"$set": {"items": {"$filter": {
+        "input": _ITEMS, "as": "it", "cond": {"$ne": ["$$it.variante_id", variante_id]}
+    }}}}]
+
+
+def bulk_stages(operations) -> List[dict]:
+    """Las etapas de una lista de cart_schemas.CartItemOperation, en orden."""
+    stages: List[dict] = []
+    for operation in operations:
+        if operation.op == "set":
+            stages += set_item_quantity(operation.variante_id, operation.quantity)
+        elif operation.op == "increment":
+            stages += increment_item(operation.variante_id, operation.quantity)
+        else:
+            stages += remove_item(operation.variante_id)
+    return stages
+
+
+# --- Ejecución ---
+async def apply_cart_mutation(collection, identifier: dict, stages: List[dict], upsert: bool = True) -> Optional[dict]:
+    """
+    Aplica las etapas en un único find_one_and_update y devuelve el carrito ya
+    modificado. Con upsert=False devuelve None si el carrito no existe.
+    """
+    pipeline = stages + [{"$set": {"items": _ITEMS, "last_updated": datetime.now()}}]
+    return await collection.find_one_and_update(
+        identifier,
+        pipeline,
+        upsert=upsert,
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+# --- Merge del carrito de invitado al loguearse ---
+# Antes se leían los dos carritos, se mezclaban en un dict en Python, se
+# reescribía todo 'items' y se borraba el del invitado: cuatro viajes, y un
+# "agregar" que cayera en el medio se perdía al reescribir.
+#
+# Ahora son dos operaciones:
+#   1. find_one_and_delete del carrito del invitado: lo "reclama" de forma
+#      atómica. Si el login reintenta el merge, o llegan dos a la vez, solo uno
+#      lo encuentra; el resto ve que no hay nada y no suma dos veces.
+#   2. un único apply_cart_mutation sobre el carrito del usuario (con upsert,
+#      el índice único de user_id evita duplicados) con una etapa add_item por
+#      línea del invitado: las cantidades se suman en Mongo, sobre lo que haya
+#      en ese momento.
+# No usamos transacción porque el Mongo de desarrollo es standalone. Si falla
+# el paso 2 se vuelve a insertar el carrito del invitado para no perderlo. Como
+# el error puede ser ambiguo (un timeout después de que el update se aplicó),
+# el paso 2 es idempotente: el carrito del usuario guarda el _id de cada carrito
+# de invitado ya mezclado y las etapas no hacen nada si el _id ya está. El
+# reintento vuelve a reclamar el mismo carrito (mismo _id) y no suma de nuevo.
+
+# Cuántos _id de carritos mezclados se recuerdan (alcanza para los reintentos)
+MAX_MERGED_CARTS = 20
+
+
+def _already_merged(cart_id) -> dict:
+    return {"$in": [{"$literal": cart_id}, {"$ifNull": ["$carritos_mezclados", []]}]}
+
+
+def _merge_stages(cart_id, items: List[dict]) -> List[dict]:
+    """Un add_item por línea, salteado si ese carrito ya se mezcló, y la marca del _id."""
+    stages: List[dict] = []
+    for item in items:
+        for stage in add_item({field: item.get(field) for field in ITEM_FIELDS}):
+            stages.append({"$set": {"items": {"$cond": [_already_merged(cart_id), _ITEMS, stage["$set"]["items"]]}}})
+    merged = {"$concatArrays": [{"$ifNull": ["$carritos_mezclados", []]}, {"$literal": [cart_id]}]}
+    stages.append({"$set": {"carritos_mezclados": {"$cond": [
+        _already_merged(cart_id),
+        "$carritos_mezclados",
+        {"$slice": [merged, -MAX_MERGED_CARTS]},
+    ]}}})
+    return stages
+
+
+async def merge_guest_cart(collection, guest_session_id: str, user_id) -> Optional[dict]:
+    """
+    Pasa las líneas del carrito del invitado al del usuario y borra el del
+    invitado. Devuelve el carrito del usuario, o None si no había nada que
+    mezclar (carrito vacío, inexistente o ya mezclado en un intento anterior).
+    """
+    guest_cart = await collection.find_one_and_delete(
+        {"guest_session_id": guest_session_id, "items.0": {"$exists": True}}
+    )
+    if guest_cart is None:
+        return None
+
+    stages = _merge_stages(guest_cart["_id"], guest_cart["items"])
+    try:
+        return await apply_cart_mutation(collection, {"user_id": user_id}, stages)
+    except Exception:
+        # Se devuelve tal cual (mismo _id): si el update sí se aplicó, el reintento no suma dos veces
+        try:
+            await collection.insert_one(guest_cart)
+        except PyMongoError as e:
+            logger.error(f"No se pudo restaurar el carrito de invitado {guest_session_id}: {e}")
+        raise
+
+
+# --- Conciliación con el catálogo ---
+# Las líneas guardan el precio y el nombre que mandó el front al agregarlas y
+# nadie los actualizaba: el checkout recién ahí se enteraba, variante por
+# variante, de precios viejos o falta de stock. 'GET /api/cart?reconcile=true'
+# resuelve todas las variantes del carrito contra SQL en una sola consulta IN
+# (o desde el cache del catálogo si ya están) y marca cada línea.
+
+PRICE_TOLERANCE = 0.005
+_NOT_FOUND = {"existe": False}
+
+
+def _snapshot_key(variante_id: int) -> tuple:
+    return ("cart-variant", variante_id)
+
+
+async def load_variant_snapshots(db: AsyncSession, variant_ids: List[int]) -> Dict[int, dict]:
+    """
+    Precio, nombre, stock e imagen actuales de cada variante. Las que no están
+    en el cache se traen juntas; se guardan con el tag de su producto, así un
+    cambio de stock o de precio las invalida como al resto del catálogo.
+    """
+    cache = catalog_cache.catalog_cache
+    snapshots: Dict[int, dict] = {}
+    missing = []
+    for variante_id in dict.fromkeys(variant_ids):
+        cached = cache.get(_snapshot_key(variante_id))
+        if cached is None:
+            missing.append(variante_id)
+        elif cached is not _NOT_FOUND:
+            snapshots[variante_id] = cached
+    if not missing:
+        return snapshots
+
+    result = await db.execute(
+        select(
+            VarianteProducto.id, VarianteProducto.producto_id, VarianteProducto.tamanio, VarianteProducto.color,
+            VarianteProducto.cantidad_en_stock, Producto.nombre, Producto.precio, Producto.urls_imagenes,
+            Producto.imagenes_derivadas,
+        )
+        .join(Producto, Producto.id == VarianteProducto.producto_id)
+        .where(VarianteProducto.id.in_(missing))
+    )
+    for row in result.all():
+        urls = row.urls_imagenes or []
+        miniatura = None
+        if urls:
+            miniatura = ((row.imagenes_derivadas or {}).get(urls[0]) or {}).get("miniatura", urls[0])
+        snapshot = {
+            "producto_id": row.producto_id,
+            "nombre": row.nombre,
+            "precio": float(row.precio),
+            "stock": row.cantidad_en_stock,
+            "talle": row.tamanio,
+            "color": row.color,
+            "miniatura": miniatura,
+        }
+        cache.set(_snapshot_key(row.id), snapshot, tags=[catalog_cache.product_tag(row.producto_id)])
+        snapshots[row.id] = snapshot
+    # Las que no existen también se recuerdan, si no cada carrito viejo iría a la
+    # base en cada pedido. Crear variantes invalida "lists", así que se olvidan ahí.
+    for variante_id in missing:
+        if variante_id not in snapshots:
+            cache.set(_snapshot_key(variante_id), _NOT_FOUND, tags=[catalog_cache.PRODUCT_LISTS])
+    return snapshots
+
+
+async def reconcile_cart(db: AsyncSession, cart: dict) -> dict:
+    """El carrito con los datos actuales de cada línea y flags para el front."""
+    items = cart.get("items") or []
+    snapshots = await load_variant_snapshots(db, [item["variante_id"] for item in items])
+
+    reconciled, total, requiere_revision = [], 0.0, False
+    for item in items:
+        snapshot = snapshots.get(item["variante_id"])
+        line = {**item, "existe": snapshot is not None}
+        if snapshot is None:
+            # La variante ya no existe (se borró el producto): no se puede comprar
+            line.update({"disponible": False, "precio_cambio": False})
+            requiere_revision = True
+        else:
+            precio_cambio = abs(snapshot["precio"] - item["price"]) >= PRICE_TOLERANCE
+            disponible = snapshot["stock"] >= item["quantity"]
+            line.update({
+                "precio_actual": snapshot["precio"],
+                "nombre_actual": snapshot["nombre"],
+                "stock_disponible": snapshot["stock"],
+                "miniatura": snapshot["miniatura"],
+                "disponible": disponible,
+                "precio_cambio": precio_cambio,
+            })
+            total += snapshot["precio"] * item["quantity"]
+            requiere_revision = requiere_revision or precio_cambio or not disponible
+        reconciled.append(line)
+
+    return {**cart, "items": reconciled, "total": round(total, 2), "requiere_revision": requiere_revision}
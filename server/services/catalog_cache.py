@@ -0,0 +1,141 @@
+# En BACKEND/services/catalog_cache.py
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, Iterable, Optional, Set
+
+from settings import settings
+
+# --- Cache de lecturas del catálogo ---
+# El catálogo cambia pocas veces por día, pero cada lectura iba a MySQL y se
+# volvía a validar con Pydantic. Este cache guarda el JSON ya serializado de las
+# respuestas, con un tope de entradas (LRU) y un vencimiento (TTL).
+#
+# Cada entrada lleva "tags" para invalidar con precisión:
+#   - "product:<id>": la entrada incluye ese producto (detalle o listados).
+#   - "lists": cualquier listado/agregado que dependa del conjunto de productos.
+#   - "categories": el listado de categorías.
+# Un alta o edición de producto puede cambiar qué productos entran en cada
+# listado, así que invalida "lists"; un cambio de stock solo invalida las
+# entradas que contienen ese producto.
+#
+# Es un cache por proceso: con varios workers, el TTL acota cuánto puede tardar
+# un worker en ver un cambio hecho a través de otro.
+
+PRODUCT_LISTS = "lists"
+CATEGORIES = "categories"
+
+
+def product_tag(product_id: int) -> str:
+    return f"product:{product_id}"
+
+
+class LRUTTLCache:
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()  # key -> (vence, valor, tags)
+        self._tags: Dict[str, Set[Hashable]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def _unlink(self, key: Hashable):
+        _, _, tags = self._entries.pop(key)
+        for tag in tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def get(self, key: Hashable):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[0] < time.monotonic():
+                self._unlink(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: Hashable, value, tags: Iterable[str] = ()):
+        tags = frozenset(tags)
+        with self._lock:
+            if key in self._entries:
+                self._unlink(key)
+            self._entries[key] = (time.monotonic() + self.ttl, value, tags)
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.maxsize:
+                oldest = next(iter(self._entries))
+                self._unlink(oldest)
+                self.evictions += 1
+
+    def invalidate_tags(self, *tags: str):
+        with self._lock:
+            for tag in tags:
+                for key in list(self._tags.get(tag, ())):
+                    self._unlink(key)
+                    self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+
+    def reset(self):
+        """Vacía el cache y pone los contadores en cero (útil en tests)."""
+        self.clear()
+        self.hits = self.misses = self.evictions = self.expirations = self.invalidations = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+
+catalog_cache = LRUTTLCache(
+    maxsize=settings.CATALOG_CACHE_MAXSIZE,
+    ttl=settings.CATALOG_CACHE_TTL_SECONDS,
+)
+
+
+# --- Invalidación (write-through) ---
+def invalidate_product(product_id: Optional[int] = None):
+    """Después de crear, editar o borrar un producto: su detalle y todos los listados."""
+    tags = [PRODUCT_LISTS]
+    if product_id is not None:
+        tags.append(product_tag(product_id))
+    catalog_cache.invalidate_tags(*tags)
+
+
+def invalidate_stock(product_ids: Iterable[int], availability_changed: bool = False):
+    """
+    Después de un cambio de stock: solo las entradas que contienen esos productos.
+    Si algún producto se agotó o volvió a tener stock, también los listados
+    (el filtro 'in_stock_only' puede sumarlo o sacarlo).
+    """
+    tags = [product_tag(pid) for pid in set(product_ids)]
+    if availability_changed:
+        tags.append(PRODUCT_LISTS)
+    catalog_cache.invalidate_tags(*tags)
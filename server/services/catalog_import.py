@@ -0,0 +1,320 @@
+# En BACKEND/services/catalog_import.py
+#
+# Importación masiva del catálogo (endpoint de admin y CLI en workers/).
+#
+# El archivo se lee en streaming, fila por fila, y cada fila se valida con
+# Pydantic apenas se lee. Las filas válidas se juntan en lotes y cada lote se
+# guarda en UNA transacción con pocos statements:
+#   1. SELECT de los SKUs que ya existen (para el reporte creados/actualizados).
+#   2. INSERT multi-fila de productos con upsert por 'sku'
+#      (ON DUPLICATE KEY UPDATE en MySQL, ON CONFLICT en SQLite).
+#   3. SELECT de los ids y de las variantes existentes de esos productos.
+#   4. UPDATE en lote (executemany) del stock de las variantes que ya existían
+#      e INSERT multi-fila de las nuevas.
+# Una fila inválida se reporta y se saltea; si falla un lote se reintenta en
+# mitades hasta aislar las filas que fallan, que se reportan, y se sigue. Las
+# variantes que no vienen en el archivo no se tocan (pueden estar referenciadas
+# por órdenes).
+#
+# Formatos:
+#   - JSONL: un producto por línea, con "variantes": [{"tamanio", "color", "cantidad_en_stock"}].
+#   - CSV: columnas sku, nombre, descripcion, precio, stock, categoria_id (o categoria
+#     con el nombre), material, urls_imagenes (separadas por '|') y variantes con el
+#     formato "S:Negro:5|M:Blanco:2".
+
+import csv
+import json
+import logging
+from typing import IO, Iterator, List, Optional, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import bindparam, func, insert, select, update
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.models import Categoria, Producto, VarianteProducto
+from schemas import product_schemas
+from services import availability_service, catalog_cache, search_service, suggest_service
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+
+# Columnas que se pisan cuando el SKU ya existe
+UPSERT_COLUMNS = ["nombre", "descripcion", "precio", "stock", "categoria_id", "material", "urls_imagenes"]
+
+
+class ImportReport:
+    def __init__(self):
+        self.filas = 0
+        self.creados = 0
+        self.actualizados = 0
+        self.variantes_creadas = 0
+        self.variantes_actualizadas = 0
+        self.total_errores = 0
+        self.errores: List[dict] = []
+
+    def add_error(self, fila: int, sku: Optional[str], error: str):
+        self.total_errores += 1
+        if len(self.errores) < MAX_REPORTED_ERRORS:
+            self.errores.append({"fila": fila, "sku": sku, "error": error})
+
+    def as_dict(self) -> dict:
+        return {
+            "filas": self.filas,
+            "creados": self.creados,
+            "actualizados": self.actualizados,
+            "variantes_creadas": self.variantes_creadas,
+            "variantes_actualizadas": self.variantes_actualizadas,
+            "total_errores": self.total_errores,
+            "errores": self.errores,
+        }
+
+
+# --- Lectura en streaming ---
+def _parse_variants(value: str) -> List[dict]:
+    variants = []
+    for chunk in value.split("|"):
+        if not chunk.strip():
+            continue
+        tamanio, color, cantidad = [part.strip() for part in chunk.split(":")]
+        variants.append({"tamanio": tamanio, "color": color, "cantidad_en_stock": cantidad})
+    return variants
+
+
+def _csv_row_to_dict(row: dict) -> dict:
+    data = {k.strip(): (v.strip() if isinstance(v, str) else v) for k, v in row.items() if k}
+    data = {k: v for k, v in data.items() if v not in ("", None)}
+    if "urls_imagenes" in data:
+        data["urls_imagenes"] = [u.strip() for u in data["urls_imagenes"].split("|") if u.strip()]
+    if "variantes" in data:
+        data["variantes"] = _parse_variants(data["variantes"])
+    return data
+
+
+def _decoded_lines(binary_file: IO[bytes]) -> Iterator[str]:
+    # Se decodifica línea por línea: un byte inválido corta justo en su línea
+    for index, raw in enumerate(binary_file):
+        yield raw.decode("utf-8-sig" if index == 0 else "utf-8")
+
+
+def _unreadable(e: Exception) -> str:
+    if isinstance(e, UnicodeDecodeError):
+        detalle = "el archivo no está en UTF-8"
+    else:
+        detalle = f"CSV inválido ({e})"
+    return f"No se pudo seguir leyendo: {detalle}. Lo anterior se importó; el resto del archivo no."
+
+
+def iter_rows(binary_file: IO[bytes], file_format: str) -> Iterator[Tuple[int, Optional[dict], Optional[str]]]:
+    """
+    Recorre el archivo sin cargarlo entero en memoria.
+    Devuelve (número de fila, datos o None, error de parseo o None). Si el
+    archivo no se puede seguir leyendo (encoding, comillas rotas, bytes NUL)
+    devuelve el error de esa fila y termina.
+    """
+    lines = _decoded_lines(binary_file)
+    if file_format == "csv":
+        reader = csv.DictReader(lines)
+        line_number = 1  # la fila 1 es el encabezado
+        while True:
+            line_number += 1
+            try:
+                row = next(reader)
+            except StopIteration:
+                return
+            except (csv.Error, UnicodeDecodeError) as e:
+                yield line_number, None, _unreadable(e)
+                return
+            try:
+                yield line_number, _csv_row_to_dict(row), None
+            except ValueError:
+                yield line_number, None, "El formato de 'variantes' es inválido (esperado 'S:Negro:5|M:Blanco:2')."
+    else:
+        line_number = 0
+        while True:
+            line_number += 1
+            try:
+                line = next(lines)
+            except StopIteration:
+                return
+            except UnicodeDecodeError as e:
+                yield line_number, None, _unreadable(e)
+                return
+            if not line.strip():
+                continue
+            try:
+                data = json.loads(line)
+            except json.JSONDecodeError as e:
+                yield line_number, None, f"JSON inválido: {e.msg}"
+                continue
+            if not isinstance(data, dict):
+                yield line_number, None, "Cada línea tiene que ser un objeto JSON."
+                continue
+            yield line_number, data, None
+
+
+def detect_format(filename: Optional[str]) -> Optional[str]:
+    name = (filename or "").lower()
+    if name.endswith(".csv"):
+        return "csv"
+    if name.endswith((".jsonl", ".ndjson")):
+        return "jsonl"
+    return None
+
+
+def _format_validation_error(e: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in e.errors())
+
+
+# --- Escritura por lotes ---
+def _upsert_statement(dialect_name: str, rows: List[dict]):
+    if dialect_name == "mysql":
+        stmt = mysql_insert(Producto).values(rows)
+        updates = {col: stmt.inserted[col] for col in UPSERT_COLUMNS}
+        updates["actualizado_en"] = func.now()
+        return stmt.on_duplicate_key_update(**updates)
+
+    stmt = sqlite_insert(Producto).values(rows)
+    updates = {col: stmt.excluded[col] for col in UPSERT_COLUMNS}
+    updates["actualizado_en"] = func.now()
+    return stmt.on_conflict_do_update(index_elements=[Producto.sku], set_=updates)
+
+
+async def _write_batch(db: AsyncSession, batch: List[Tuple[int, product_schemas.ProductImportRow]], report: ImportReport):
+    skus = [row.sku for _, row in batch]
+
+    existing = await db.execute(select(Producto.sku).where(Producto.sku.in_(skus)))
+    existing_skus = set(existing.scalars().all())
+
+    product_rows = []
+    for _, row in batch:
+        data = row.model_dump(exclude={"variantes"})
+        if data["stock"] is None:
+            data["stock"] = sum(v.cantidad_en_stock for v in row.variantes)
+        product_rows.append(data)
+    await db.execute(_upsert_statement(db.bind.dialect.name, product_rows))
+
+    ids = await db.execute(select(Producto.sku, Producto.id).where(Producto.sku.in_(skus)))
+    id_by_sku = dict(ids.all())
+
+    current = await db.execute(
+        select(VarianteProducto.id, VarianteProducto.producto_id, VarianteProducto.tamanio, VarianteProducto.color)
+        .where(VarianteProducto.producto_id.in_(list(id_by_sku.values())))
+    )
+    variant_id_by_key = {(r.producto_id, r.tamanio, r.color): r.id for r in current.all()}
+
+    to_update, to_insert = [], []
+    for _, row in batch:
+        producto_id = id_by_sku[row.sku]
+        for variant in row.variantes:
+            variant_id = variant_id_by_key.get((producto_id, variant.tamanio, variant.color))
+            if variant_id is None:
+                to_insert.append({"producto_id": producto_id, **variant.model_dump()})
+            else:
+                to_update.append({"variant_id": variant_id, "nuevo_stock": variant.cantidad_en_stock})
+
+    if to_update:
+        # Con la tabla (y no el modelo) es un executemany de Core, sin pasar por el ORM
+        variantes = VarianteProducto.__table__
+        await db.execute(
+            update(variantes)
+            .where(variantes.c.id == bindparam("variant_id"))
+            .values(cantidad_en_stock=bindparam("nuevo_stock")),
+            to_update
+        )
+    if to_insert:
+        await db.execute(insert(VarianteProducto).values(to_insert))
+
+    await availability_service.refresh_availability(db, id_by_sku.values())
+    await db.commit()
+
+    report.creados += len(set(skus) - existing_skus)
+    report.actualizados += len(existing_skus)
+    report.variantes_creadas += len(to_insert)
+    report.variantes_actualizadas += len(to_update)
+    return list(id_by_sku.values())
+
+
+async def _write_or_split(db: AsyncSession, batch: List[Tuple[int, product_schemas.ProductImportRow]], report: ImportReport) -> List[int]:
+    """
+    Guarda el lote; si falla lo parte en mitades y reintenta cada una, así solo
+    las filas que fallan de verdad quedan con error y el resto se guarda.
+    """
+    try:
+        return await _write_batch(db, batch, report)
+    except Exception as e:
+        await db.rollback()
+        # Sin conexión no tiene sentido seguir partiendo: falla todo el lote igual
+        if len(batch) > 1 and not getattr(e, "connection_invalidated", False):
+            middle = len(batch) // 2
+            return await _write_or_split(db, batch[:middle], report) + await _write_or_split(db, batch[middle:], report)
+        logger.error(f"Error al guardar {len(batch)} fila(s) de la importación: {e}")
+        for line_number, row in batch:
+            report.add_error(line_number, row.sku, f"No se pudo guardar: {e}")
+        return []
+
+
+async def import_catalog(db: AsyncSession, binary_file: IO[bytes], file_format: str, batch_size: int = BATCH_SIZE) -> dict:
+    report = ImportReport()
+
+    categorias = await db.execute(select(Categoria.id, Categoria.nombre))
+    categoria_rows = categorias.all()
+    category_ids = {r.id for r in categoria_rows}
+    category_by_name = {r.nombre.lower(): r.id for r in categoria_rows}
+
+    touched_ids: List[int] = []
+    batch: List[Tuple[int, product_schemas.ProductImportRow]] = []
+    skus_in_batch = set()
+
+    async def flush():
+        if not batch:
+            return
+        touched_ids.extend(await _write_or_split(db, list(batch), report))
+        batch.clear()
+        skus_in_batch.clear()
+
+    for line_number, data, parse_error in iter_rows(binary_file, file_format):
+        report.filas += 1
+        if parse_error:
+            report.add_error(line_number, None, parse_error)
+            continue
+
+        # Se acepta la categoría por id o por nombre
+        nombre_categoria = data.pop("categoria", None)
+        if "categoria_id" not in data and nombre_categoria:
+            data["categoria_id"] = category_by_name.get(str(nombre_categoria).lower())
+
+        try:
+            row = product_schemas.ProductImportRow.model_validate(data)
+        except ValidationError as e:
+            report.add_error(line_number, data.get("sku"), _format_validation_error(e))
+            continue
+
+        if row.categoria_id not in category_ids:
+            report.add_error(line_number, row.sku, f"La categoría {row.categoria_id or nombre_categoria} no existe.")
+            continue
+        if row.sku in skus_in_batch:
+            report.add_error(line_number, row.sku, "SKU repetido en el mismo lote del archivo.")
+            continue
+
+        batch.append((line_number, row))
+        skus_in_batch.add(row.sku)
+        if len(batch) >= batch_size:
+            await flush()
+
+    await flush()
+
+    # Muchos productos cambiaron: el índice de búsqueda se reconstruye en la
+    # próxima consulta, el de autocompletado acá mismo (las sugerencias siguen
+    # respondiendo con el viejo mientras tanto) y el cache suelta lo tocado.
+    if touched_ids:
+        search_service.product_index.reset()
+        await suggest_service.rebuild(db)
+        catalog_cache.invalidate_product()
+        catalog_cache.invalidate_stock(touched_ids)
+
+    return report.as_dict()
@@ -0,0 +1,486 @@
+# En BACKEND/services/catalog_service.py
+
+import base64
+import binascii
+import json
+import math
+from decimal import Decimal, InvalidOperation
+from typing import List, Optional, Tuple
+
+from fastapi import HTTPException, Query, status
+from sqlalchemy import String, and_, case, cast, distinct, func, literal, or_, select, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, selectinload
+
+from database.models import Categoria, Producto, VarianteProducto
+from services import availability_service, search_service
+
+
+# --- Filtros del catálogo ---
+# Los comparten el listado y cualquier endpoint que necesite "los mismos filtros
+# que get_products". Talle y color van como EXISTS sobre las variantes: así la
+# query principal devuelve una fila por producto y el LIMIT cuenta productos.
+
+def split_csv(value: Optional[str]) -> List[str]:
+    return [v.strip() for v in value.split(',') if v.strip()] if value else []
+
+
+class CatalogFilters:
+    def __init__(
+        self,
+        q: Optional[str] = None,
+        precio_min: Optional[float] = None,
+        precio_max: Optional[float] = None,
+        categoria_ids: Optional[List[int]] = None,
+        talles: Optional[List[str]] = None,
+        colores: Optional[List[str]] = None,
+        in_stock_only: bool = False,
+    ):
+        self.q = q
+        self.precio_min = precio_min
+        self.precio_max = precio_max
+        self.categoria_ids = categoria_ids or []
+        self.talles = talles or []
+        self.colores = colores or []
+        self.in_stock_only = in_stock_only
+        # Los completa prepare() cuando hay búsqueda de texto
+        self.search_clause = None
+        self.relevance = None
+
+    def signature(self) -> tuple:
+        """Clave estable de los filtros (para cachear resultados por combinación de filtros)."""
+        return (
+            self.q, self.precio_min, self.precio_max,
+            tuple(sorted(self.categoria_ids)), tuple(sorted(self.talles)), tuple(sorted(self.colores)),
+            self.in_stock_only,
+        )
+
+    async def prepare(self, db: AsyncSession):
+        """Resuelve la búsqueda de texto (FULLTEXT o índice en memoria) antes de armar la query."""
+        if self.q:
+            self.search_clause, self.relevance = await search_service.relevance_clause(db, self.q)
+
+    def where_clauses(self) -> list:
+        clauses = []
+        if self.search_clause is not None: clauses.append(self.search_clause)
+        if self.precio_min is not None: clauses.append(Producto.precio >= self.precio_min)
+        if self.precio_max is not None: clauses.append(Producto.precio <= self.precio_max)
+        if self.categoria_ids: clauses.append(Producto.categoria_id.in_(self.categoria_ids))
+
+        # Talle y color tienen que cumplirse en la misma variante (como con el join
+        # de antes): un solo EXISTS con las dos condiciones, no uno por filtro.
+        variant_clauses = []
+        if self.talles: variant_clauses.append(VarianteProducto.tamanio.in_(self.talles))
+        if self.colores: variant_clauses.append(VarianteProducto.color.in_(self.colores))
+        if variant_clauses:
+            clauses.append(Producto.variantes.any(and_(*variant_clauses)))
+        if self.in_stock_only:
+            clauses.append(availability_service.in_stock_clause())
+        return clauses
+
+
+# Tope de ids por pedido en los endpoints de lookup en lote
+MAX_BATCH_IDS = 300
+
+
+def parse_id_list(value: str, param: str = "ids") -> List[int]:
+    """Parsea '1,2,3' a [1, 2, 3] sin duplicados (respetando el orden) y con tope."""
+    try:
+        ids = list(dict.fromkeys(int(i) for i in split_csv(value)))
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"El formato de '{param}' es inválido. Deben ser números separados por comas.")
+    if not ids:
+        raise HTTPException(status_code=400, detail=f"'{param}' no puede estar vacío.")
+    if len(ids) > MAX_BATCH_IDS:
+        raise HTTPException(status_code=400, detail=f"Se pueden pedir como máximo {MAX_BATCH_IDS} ids por vez.")
+    return ids
+
+
+def get_catalog_filters(
+    q: Optional[str] = Query(None, description="Búsqueda de texto en nombre, descripción, material y color"),
+    precio_min: Optional[float] = Query(None, ge=0),
+    precio_max: Optional[float] = Query(None, ge=0),
+    categoria_id: Optional[str] = Query(None, description="IDs de categoría separados por comas (ej: 1,3,5)"),
+    talle: Optional[str] = Query(None, description="Talles separados por comas (ej: S,M,L)"),
+    color: Optional[str] = Query(None, description="Colores separados por comas (ej: Rojo,Azul)"),
+    in_stock_only: bool = Query(False, description="Solo productos con stock disponible"),
+) -> CatalogFilters:
+    """Dependencia con los filtros de query comunes a los endpoints del catálogo."""
+    try:
+        categoria_ids = [int(i) for i in split_csv(categoria_id)]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="El formato de 'categoria_id' es inválido. Deben ser números separados por comas.")
+
+    return CatalogFilters(
+        q=q, precio_min=precio_min, precio_max=precio_max,
+        categoria_ids=categoria_ids, talles=split_csv(talle), colores=split_csv(color),
+        in_stock_only=in_stock_only
+    )
+
+
+# --- Versiones (para ETags) ---
+def product_version(product: Producto) -> tuple:
+    """
+    Todo lo que puede cambiar la representación de un producto: sus columnas
+    (incluida 'actualizado_en') y el stock de cada variante. No pasa por Pydantic.
+    """
+    columns = tuple(getattr(product, c.key) for c in Producto.__table__.columns)
+    variants = tuple(sorted(
+        (v.id, v.tamanio, v.color, v.cantidad_en_stock) for v in product.variantes
+    ))
+    return columns + (variants,)
+
+
+# --- Orden del catálogo ---
+# Cada opción de 'sort_by' se traduce a (columna, descendente?). El 'id' siempre
+# se agrega como desempate, así el orden es total y el cursor nunca salta filas.
+SORT_OPTIONS = {
+    None: (Producto.id, False),
+    "precio_asc": (Producto.precio, False),
+    "precio_desc": (Producto.precio, True),
+    "nombre_asc": (Producto.nombre, False),
+    "nombre_desc": (Producto.nombre, True),
+}
+
+
+def get_sort(sort_by: Optional[str]):
+    """Devuelve (columna, descendente) para un 'sort_by'. Valores desconocidos usan el orden por defecto."""
+    return SORT_OPTIONS.get(sort_by, SORT_OPTIONS[None])
+
+
+def apply_sort(query, sort_by: Optional[str]):
+    """Ordena la query por la columna pedida más el 'id' como desempate."""
+    column, descending = get_sort(sort_by)
+    if column is Producto.id:
+        return query.order_by(Producto.id.desc() if descending else Producto.id.asc())
+    if descending:
+        return query.order_by(column.desc(), Producto.id.desc())
+    return query.order_by(column.asc(), Producto.id.asc())
+
+
+# --- Cursores opacos (keyset pagination) ---
+# El cursor guarda el valor de orden y el id de la última fila de la página.
+# La página siguiente arranca con un WHERE sobre esos valores en vez de un
+# OFFSET, así cada página cuesta lo mismo sin importar qué tan profunda sea.
+
+# Las búsquedas por relevancia son la excepción: el puntaje no es una columna,
+# así que su cursor guarda un offset. Como el resultado de una búsqueda está
+# acotado, ese offset nunca crece como el de un listado completo.
+
+def _pack(payload: dict) -> str:
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _unpack(cursor: str, sort_by: Optional[str]) -> dict:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, binascii.Error, UnicodeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="El 'cursor' es inválido.")
+    if not isinstance(payload, dict) or payload.get("s") != sort_by:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="El 'cursor' pertenece a otro orden. Pedí la primera página de nuevo con el 'sort_by' actual."
+        )
+    return payload
+
+
+def encode_cursor(sort_by: Optional[str], product: Producto) -> str:
+    column, _ = get_sort(sort_by)
+    value = getattr(product, column.key)
+    if isinstance(value, Decimal):
+        value = str(value)
+    return _pack({"s": sort_by, "v": value, "i": product.id})
+
+
+def encode_offset_cursor(sort_by: Optional[str], offset: int) -> str:
+    return _pack({"s": sort_by, "o": offset})
+
+
+def decode_offset_cursor(cursor: str, sort_by: Optional[str]) -> int:
+    payload = _unpack(cursor, sort_by)
+    try:
+        return max(int(payload["o"]), 0)
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="El 'cursor' es inválido.")
+
+
+def decode_cursor(cursor: str, sort_by: Optional[str]) -> dict:
+    invalid = HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="El 'cursor' es inválido.")
+    payload = _unpack(cursor, sort_by)
+    try:
+        last_id = int(payload["i"])
+        value = payload["v"]
+    except (ValueError, KeyError, TypeError):
+        raise invalid
+
+    column, _ = get_sort(sort_by)
+    if column is Producto.precio:
+        try:
+            value = Decimal(str(value))
+        except InvalidOperation:
+            raise invalid
+    return {"value": value, "id": last_id}
+
+
+def apply_cursor(query, sort_by: Optional[str], cursor: str):
+    """Filtra la query para que arranque justo después de la fila del cursor."""
+    position = decode_cursor(cursor, sort_by)
+    column, descending = get_sort(sort_by)
+
+    if column is Producto.id:
+        if descending:
+            return query.where(Producto.id < position["id"])
+        return query.where(Producto.id > position["id"])
+
+    if descending:
+        return query.where(or_(
+            column < position["value"],
+            and_(column == position["value"], Producto.id < position["id"])
+        ))
+    return query.where(or_(
+        column > position["value"],
+        and_(column == position["value"], Producto.id > position["id"])
+    ))
+
+
+# --- Motor de consulta en dos fases ---
+
+async def fetch_product_page(
+    db: AsyncSession,
+    filters: CatalogFilters,
+    sort_by: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 12,
+    cursor: Optional[str] = None,
+) -> Tuple[List[Producto], Optional[str]]:
+    """
+    Trae una página del catálogo en dos consultas:
+    1. Los productos de la página (filtros, orden y LIMIT sobre 'productos', sin joins).
+    2. Las variantes de esos productos en un solo batch (selectinload con IN).
+    Devuelve (productos, cursor de la página siguiente o None).
+    """
+    await filters.prepare(db)
+    query = select(Producto).where(*filters.where_clauses())
+
+    # Búsqueda sin 'sort_by' explícito: ordenamos por relevancia
+    by_relevance = sort_by is None and filters.relevance is not None
+    if by_relevance:
+        offset = decode_offset_cursor(cursor, sort_by) if cursor else skip
+        query = query.order_by(filters.relevance.desc(), Producto.id.asc()).offset(offset)
+    else:
+        query = apply_sort(query, sort_by)
+        if cursor:
+            query = apply_cursor(query, sort_by, cursor)
+        else:
+            query = query.offset(skip)
+
+    query = query.limit(limit).options(selectinload(Producto.variantes))
+    result = await db.execute(query)
+    products = list(result.scalars().all())
+
+    # Si la página vino llena, puede haber una siguiente
+    next_cursor = None
+    if len(products) == limit:
+        if by_relevance:
+            next_cursor = encode_offset_cursor(sort_by, offset + limit)
+        else:
+            next_cursor = encode_cursor(sort_by, products[-1])
+    return products, next_cursor
+
+
+# --- Facetas del catálogo ---
+# Cortes por defecto de los rangos de precio (en ARS). El último rango queda abierto.
+DEFAULT_PRICE_EDGES = [0, 20000, 50000, 100000, 200000]
+# Cada corte es una rama del CASE y una clave de cache distinta: con tope
+MAX_PRICE_EDGES = 20
+
+
+def parse_price_edges(value: Optional[str]) -> List[float]:
+    """Parsea '0,20000,50000' a cortes ordenados y sin duplicados. Sin valor, los de por defecto."""
+    try:
+        edges = sorted({float(e) for e in split_csv(value)})
+    except ValueError:
+        raise HTTPException(status_code=400, detail="El formato de 'price_edges' es inválido. Deben ser números separados por comas.")
+    if not all(math.isfinite(e) for e in edges):
+        raise HTTPException(status_code=400, detail="'price_edges' solo acepta números finitos.")
+    if len(edges) > MAX_PRICE_EDGES:
+        raise HTTPException(status_code=400, detail=f"Se pueden pedir como máximo {MAX_PRICE_EDGES} cortes de precio.")
+    return edges or DEFAULT_PRICE_EDGES
+
+
+async def compute_facets(db: AsyncSession, filters: CatalogFilters, price_edges: List[float]) -> dict:
+    """
+    Calcula todas las facetas (talle, color, categoría y rango de precio) para el
+    conjunto filtrado en UNA sola consulta: un UNION ALL de GROUP BYs sobre un CTE
+    con los productos que pasan los filtros. Cada conteo es de productos distintos.
+    """
+    await filters.prepare(db)
+    filtrados = (
+        select(Producto.id, Producto.categoria_id, Producto.precio)
+        .where(*filters.where_clauses())
+        .cte("filtrados")
+    )
+
+    def variant_facet(name, column):
+        return (
+            select(
+                literal(name).label("faceta"),
+                column.label("valor"),
+                literal(None, String).label("etiqueta"),
+                func.count(distinct(VarianteProducto.producto_id)).label("total"),
+            )
+            .join(filtrados, filtrados.c.id == VarianteProducto.producto_id)
+            .group_by(column)
+        )
+
+    categoria_facet = (
+        select(
+            literal("categoria").label("faceta"),
+            cast(filtrados.c.categoria_id, String).label("valor"),
+            Categoria.nombre.label("etiqueta"),
+            func.count().label("total"),
+        )
+        .join(Categoria, Categoria.id == filtrados.c.categoria_id)
+        .group_by(filtrados.c.categoria_id, Categoria.nombre)
+    )
+
+    # Rango de precio: índice del último corte que es <= precio
+    bucket = case(
+        *[(filtrados.c.precio >= edge, str(i)) for i, edge in reversed(list(enumerate(price_edges)))],
+        else_=None,
+    )
+    precio_facet = (
+        select(
+            literal("precio").label("faceta"),
+            bucket.label("valor"),
+            literal(None, String).label("etiqueta"),
+            func.count().label("total"),
+        )
+        .group_by(bucket)
+    )
+
+    query = union_all(
+        variant_facet("talle", VarianteProducto.tamanio),
+        variant_facet("color", VarianteProducto.color),
+        categoria_facet,
+        precio_facet,
+    )
+    rows = (await db.execute(query)).all()
+
+    facets = {"talle": {}, "color": {}, "categoria": {}, "precio": {}}
+    nombres = {}
+    for row in rows:
+        if row.valor is None:
+            continue
+        facets[row.faceta][row.valor] = row.total
+        if row.faceta == "categoria":
+            nombres[int(row.valor)] = row.etiqueta
+
+    precios = []
+    for i, edge in enumerate(price_edges):
+        hasta = price_edges[i + 1] if i + 1 < len(price_edges) else None
+        precios.append({"desde": edge, "hasta": hasta, "total": facets["precio"].get(str(i), 0)})
+
+    return {
+        "talles": [{"valor": v, "total": t} for v, t in sorted(facets["talle"].items())],
+        "colores": [{"valor": v, "total": t} for v, t in sorted(facets["color"].items())],
+        "categorias": [
+            {"id": int(i), "nombre": nombres[int(i)], "total": t}
+            for i, t in sorted(facets["categoria"].items(), key=lambda item: int(item[0]))
+        ],
+        "precios": precios,
+    }
+
+
+
+# --- Lookups en lote ---
+# Una sola consulta (joinedload, sin LIMIT) para resolver muchos ids a la vez.
+# Devuelven los resultados en el orden pedido y omiten los ids que no existen.
+
+async def fetch_products_by_ids(db: AsyncSession, ids: List[int]) -> List[Producto]:
+    result = await db.execute(
+        select(Producto).options(joinedload(Producto.variantes)).where(Producto.id.in_(ids))
+    )
+    by_id = {p.id: p for p in result.scalars().unique().all()}
+    return [by_id[i] for i in ids if i in by_id]
+
+
+async def fetch_variants_by_ids(db: AsyncSession, ids: List[int]) -> List[VarianteProducto]:
+    result = await db.execute(
+        select(VarianteProducto).options(joinedload(VarianteProducto.producto)).where(VarianteProducto.id.in_(ids))
+    )
+    by_id = {v.id: v for v in result.scalars().all()}
+    return [by_id[i] for i in ids if i in by_id]
+
+
+# --- Histograma de precios (slider del catálogo) ---
+HISTOGRAM_MODES = ("fijo", "adaptativo")
+
+
+async def compute_price_histogram(db: AsyncSession, filters: CatalogFilters, buckets: int, mode: str = "fijo") -> dict:
+    """
+    Distribución de precios de los productos que pasan los filtros, en UNA consulta:
+      - "fijo": rangos del mismo ancho entre el precio mínimo y el máximo.
+      - "adaptativo": rangos con la misma cantidad de productos (NTILE), útiles
+        cuando los precios están muy concentrados.
+    """
+    await filters.prepare(db)
+    filtrados = (
+        select(Producto.precio)
+        .where(*filters.where_clauses())
+        .cte("filtrados")
+    )
+
+    if mode == "adaptativo":
+        tiles = select(
+            filtrados.c.precio,
+            func.ntile(buckets).over(order_by=filtrados.c.precio).label("bucket"),
+        ).subquery()
+        query = (
+            select(tiles.c.bucket, func.min(tiles.c.precio), func.max(tiles.c.precio), func.count())
+            .group_by(tiles.c.bucket)
+            .order_by(tiles.c.bucket)
+        )
+        rows = (await db.execute(query)).all()
+        histogram = [
+            {"desde": float(desde), "hasta": float(hasta), "total": total}
+            for _, desde, hasta, total in rows
+        ]
+        total = sum(b["total"] for b in histogram)
+        precio_min = histogram[0]["desde"] if histogram else None
+        precio_max = histogram[-1]["hasta"] if histogram else None
+        return {"modo": mode, "total": total, "precio_min": precio_min, "precio_max": precio_max, "buckets": histogram}
+
+    # Ancho fijo: el bucket de cada precio sale de su posición entre el mínimo y el máximo
+    rango = select(func.min(filtrados.c.precio).label("minimo"), func.max(filtrados.c.precio).label("maximo")).subquery()
+    position = case(
+        (rango.c.maximo == rango.c.minimo, 0),
+        else_=func.floor((filtrados.c.precio - rango.c.minimo) * buckets / (rango.c.maximo - rango.c.minimo)),
+    )
+    # El precio máximo cae justo en el borde: va al último bucket
+    bucket = case((position >= buckets, buckets - 1), else_=position)
+    query = (
+        select(bucket.label("bucket"), func.count(), func.min(rango.c.minimo), func.max(rango.c.maximo))
+        .select_from(filtrados.join(rango, literal(True)))
+        .group_by(bucket)
+    )
+    rows = (await db.execute(query)).all()
+    if not rows:
+        return {"modo": mode, "total": 0, "precio_min": None, "precio_max": None, "buckets": []}
+
+    counts = {int(row[0]): row[1] for row in rows}
+    precio_min, precio_max = float(rows[0][2]), float(rows[0][3])
+    width = (precio_max - precio_min) / buckets
+    histogram = []
+    for i in range(buckets if width else 1):
+        histogram.append({
+            "desde": round(precio_min + i * width, 2),
+            "hasta": round(precio_min + (i + 1) * width, 2) if width else precio_max,
+            "total": counts.get(i, 0),
+        })
+    return {
+        "modo": mode, "total": sum(counts.values()),
+        "precio_min": precio_min, "precio_max": precio_max, "buckets": histogram,
+    }
@@ -1,12 +1,18 @@
 # En BACKEND/services/cloudinary_service.py
 
+import asyncio
+import logging
 import os
 import cloudinary
 import cloudinary.uploader
 import re # Importamos el módulo de expresiones regulares
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from settings import settings
-from fastapi import HTTPException, UploadFile, status
-from typing import List
+from typing import BinaryIO, Callable, List, Optional
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
 
 # --- Configuración de Cloudinary ---
 cloudinary.config(
@@ -19,48 +25,107 @@ cloudinary.config(
 # --- Constante para la carpeta de Cloudinary ---
 CLOUDINARY_FOLDER = "void_ecommerce_products"
 
-async def upload_images(files: List[UploadFile]) -> List[str]:
+# --- Pool de threads para el SDK (que es sincrónico) ---
+# Antes cada 'upload' corría en el event loop y lo frenaba durante toda la
+# subida. Ahora cada archivo va a un thread de este pool (acotado, para no
+# abrir conexiones sin límite) y se esperan todos juntos: 3 imágenes tardan
+# más o menos lo mismo que una. La única subida es upload_stream, que usa
+# storage_service.CloudinaryStorage (el pipeline de imágenes pasa por ahí).
+_executor = ThreadPoolExecutor(max_workers=settings.UPLOAD_MAX_WORKERS, thread_name_prefix="cloudinary")
+UPLOAD_TIMEOUT_SECONDS = settings.UPLOAD_TIMEOUT_SECONDS
+# Bloques de las subidas por partes (Cloudinary pide al menos 5 MB por parte)
+CHUNK_SIZE = 6 * 1024 * 1024
+
+
+async def _run_in_pool(fn, *args, on_late_result: Optional[Callable[[dict], None]] = None, **kwargs):
     """
-    Sube una lista de archivos a Cloudinary y devuelve sus URLs seguras.
+    Corre una llamada del SDK en el pool, con tope de tiempo por archivo.
+
+    Si se pasa el tiempo, el thread no se puede cortar y la subida puede terminar
+    bien igual, cuando ya nadie la espera. 'on_late_result' recibe ese resultado
+    tardío (en el thread del pool) para poder borrar lo que se subió.
     """
-    uploaded_urls = []
-    for file in files:
-        try:
-            upload_result = cloudinary.uploader.upload(
-                file.file,
-                folder=CLOUDINARY_FOLDER,
-                resource_type="image"
-            )
-            uploaded_urls.append(upload_result.get("secure_url"))
-        except Exception as e:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Error al subir la imagen '{file.filename}': {e}"
-            )
-    return uploaded_urls
+    loop = asyncio.get_running_loop()
+    # El SDK también recibe el timeout, así el thread no queda colgado para siempre
+    call = partial(fn, *args, timeout=UPLOAD_TIMEOUT_SECONDS, **kwargs)
+    future = _executor.submit(call)
+    try:
+        return await asyncio.wait_for(asyncio.wrap_future(future, loop=loop), timeout=UPLOAD_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        if on_late_result is not None:
+            future.add_done_callback(partial(_handle_late_result, on_late_result))
+        raise
+
+
+def _handle_late_result(callback: Callable[[dict], None], future):
+    if future.cancelled() or future.exception() is not None:
+        return
+    try:
+        callback(future.result())
+    except Exception as e:
+        logger.error(f"Error limpiando una subida que terminó después del tiempo límite: {e}")
+
+
+def _destroy_late_upload(result: dict):
+    """Borra una subida que terminó después del timeout (corre en el thread del pool)."""
+    public_id = result.get("public_id") or _public_id_from_url(result.get("secure_url") or "")
+    if public_id is None:
+        logger.error(f"Subida tardía sin public_id, queda huérfana: {result}")
+        return
+    logger.warning(f"La subida de {public_id} terminó después del tiempo límite; se borra.")
+    cloudinary.uploader.destroy(public_id, resource_type="image", timeout=UPLOAD_TIMEOUT_SECONDS)
+
+
+def _describe_error(e: Exception) -> str:
+    if isinstance(e, asyncio.TimeoutError):
+        return f"se pasó el tiempo límite de {UPLOAD_TIMEOUT_SECONDS}s"
+    return str(e)
+
+
+async def upload_stream(file: BinaryIO, public_id: str) -> str:
+    """
+    Sube un archivo abierto con un public_id fijo dentro de la carpeta. Va con
+    'upload_large', que lo lee y lo manda de a bloques de CHUNK_SIZE en vez de
+    armar el pedido con el archivo entero en memoria.
+    """
+    result = await _run_in_pool(
+        cloudinary.uploader.upload_large, file, folder=CLOUDINARY_FOLDER, public_id=public_id,
+        resource_type="image", overwrite=True, chunk_size=CHUNK_SIZE, on_late_result=_destroy_late_upload
+    )
+    return result.get("secure_url")
+
+
+def _public_id_from_url(url: str):
+    # Extraemos el public_id de la URL. Es más robusto que hacer un simple split.
+    # Buscamos la parte de la ruta que está dentro de nuestra carpeta de cloudinary.
+    match = re.search(f"{CLOUDINARY_FOLDER}/(.+)$", url)
+    if not match:
+        return None
+    public_id = os.path.splitext(match.group(1))[0]
+    return f"{CLOUDINARY_FOLDER}/{public_id}"
+
 
 # --- ¡NUEVA FUNCIÓN PARA BORRAR IMÁGENES! ---
-async def delete_images(urls: List[str]):
+async def delete_images(urls: List[str]) -> dict:
     """
-    Elimina una lista de imágenes de Cloudinary a partir de sus URLs.
+    Elimina una lista de imágenes de Cloudinary a partir de sus URLs, en paralelo.
+    Un error de borrado no corta la actualización: se registra y se devuelve.
     """
-    for url in urls:
-        try:
-            # Extraemos el public_id de la URL. Es más robusto que hacer un simple split.
-            # Buscamos la parte de la ruta que está dentro de nuestra carpeta de cloudinary.
-            match = re.search(f"{CLOUDINARY_FOLDER}/(.*?)", url)
-            if not match:
-                print(f"No se pudo extraer el public_id de la URL: {url}")
-                continue
-
-            public_id_with_extension = match.group(1)
-            public_id = os.path.splitext(public_id_with_extension)[0]
-            full_public_id = f"{CLOUDINARY_FOLDER}/{public_id}"
-
-            # Llamamos a la API de Cloudinary para destruir la imagen
-            cloudinary.uploader.destroy(full_public_id, resource_type="image")
-            
-        except Exception as e:
-            # Si algo falla, simplemente lo registramos en la consola y continuamos
-            # para no detener el proceso de actualización por un error de borrado.
-            print(f"Error al eliminar la imagen {url} de Cloudinary: {e}")
\ No newline at end of file
+    async def delete_one(url: str):
+        public_id = _public_id_from_url(url)
+        if public_id is None:
+            raise ValueError("no se pudo extraer el public_id de la URL")
+        # Llamamos a la API de Cloudinary para destruir la imagen
+        await _run_in_pool(cloudinary.uploader.destroy, public_id, resource_type="image")
+
+    results = await asyncio.gather(*[delete_one(url) for url in urls], return_exceptions=True)
+
+    eliminadas, errores = [], []
+    for url, result in zip(urls, results):
+        if isinstance(result, Exception):
+            # Si algo falla, simplemente lo registramos y continuamos
+            logger.error(f"Error al eliminar la imagen {url} de Cloudinary: {_describe_error(result)}")
+            errores.append({"url": url, "error": _describe_error(result)})
+        else:
+            eliminadas.append(url)
+    return {"eliminadas": eliminadas, "errores": errores}
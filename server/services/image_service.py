@@ -0,0 +1,179 @@
+# En BACKEND/services/image_service.py
+#
+# Pipeline de imágenes de productos.
+#
+# Antes se guardaba solo el original y la grilla del catálogo bajaba fotos de
+# varios MB. Ahora, al subir, cada imagen se decodifica una vez en un pool de
+# procesos (Pillow es CPU puro, en threads se pelearía con el GIL) y se generan
+# derivados WebP por ancho: 'miniatura' para grillas y buscador, 'mediana' para
+# tarjetas y vista rápida, 'grande' para la página del producto.
+#
+# Original y derivados se guardan con el backend de storage_service (Cloudinary
+# o disco local) y las URLs de los derivados quedan en
+# 'Producto.imagenes_derivadas' ({url_original: {tamaño: url}}).
+
+import asyncio
+import io
+import logging
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional, Union
+
+from fastapi import HTTPException, UploadFile, status
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from services import storage_service, upload_service
+from settings import settings
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Ancho máximo de cada derivado (nunca se agranda una imagen más chica)
+DERIVATIVE_WIDTHS = {"grande": 1600, "mediana": 800, "miniatura": 320}
+WEBP_QUALITY = 80
+
+_ORIGINAL_EXTENSIONS = {"JPEG": "jpg", "PNG": "png", "WEBP": "webp", "GIF": "gif"}
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+class InvalidImageError(ValueError):
+    """El archivo subido no es una imagen que Pillow pueda abrir."""
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    # Se crea recién al primer uso: los workers que no suben imágenes no levantan procesos
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=settings.IMAGE_PROCESS_WORKERS)
+    return _executor
+
+
+def shutdown():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def render_derivatives(source: Union[bytes, str]) -> dict:
+    """
+    Corre en el pool de procesos. Recibe los bytes (archivos chicos) o la ruta
+    del temporal en disco, y devuelve el formato del original y los bytes WebP
+    de cada derivado. Cada tamaño se achica desde el anterior (más grande), que
+    es bastante más rápido que partir siempre del original.
+    """
+    try:
+        with Image.open(io.BytesIO(source) if isinstance(source, bytes) else source) as original:
+            original_format = original.format
+            if original_format not in _ORIGINAL_EXTENSIONS:
+                raise InvalidImageError(f"formato no soportado: {original_format}")
+            # Las fotos de celular vienen rotadas por EXIF
+            image = ImageOps.exif_transpose(original)
+            has_alpha = image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info
+            image = image.convert("RGBA" if has_alpha else "RGB")
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError) as e:
+        raise InvalidImageError(str(e))
+
+    derivados = {}
+    for name, width in sorted(DERIVATIVE_WIDTHS.items(), key=lambda item: -item[1]):
+        image.thumbnail((width, width * 4), Image.Resampling.LANCZOS)
+        buffer = io.BytesIO()
+        image.save(buffer, format="WEBP", quality=WEBP_QUALITY, method=4)
+        derivados[name] = buffer.getvalue()
+    return {
+        "extension": _ORIGINAL_EXTENSIONS[original_format],
+        "content_type": Image.MIME[original_format],
+        "derivados": derivados,
+    }
+
+
+async def _store_image_set(storage: storage_service.StorageBackend, upload: upload_service.SpooledUpload,
+                           rendered: dict) -> Dict[str, str]:
+    base = f"productos/{uuid.uuid4().hex}"
+    # El original se manda de a bloques desde memoria o desde el temporal; los derivados ya son chicos
+    pending = [("original", f"{base}/original.{rendered['extension']}", upload.open(), rendered["content_type"])]
+    pending += [
+        (name, f"{base}/{name}.webp", io.BytesIO(content), "image/webp")
+        for name, content in rendered["derivados"].items()
+    ]
+
+    try:
+        results = await asyncio.gather(
+            *[storage.save(key, content, content_type) for _, key, content, content_type in pending],
+            return_exceptions=True
+        )
+    finally:
+        for _, _, content, _ in pending:
+            content.close()
+    saved = [url for url in results if not isinstance(url, Exception)]
+    failed = [e for e in results if isinstance(e, Exception)]
+    if failed:
+        if saved:
+            await storage.delete(saved)
+        raise failed[0]
+    return {name: url for (name, _, _, _), url in zip(pending, results)}
+
+
+async def process_uploads(files: List[UploadFile], storage: Optional[storage_service.StorageBackend] = None) -> List[Dict[str, str]]:
+    """
+    Valida, procesa y guarda todas las imágenes en paralelo. Devuelve, en el mismo orden,
+    {'original': url, 'grande': url, 'mediana': url, 'miniatura': url} por archivo.
+    Un archivo muy grande o que no es imagen corta todo antes de guardar (413/415).
+    Si después falla alguna se borra lo que se llegó a guardar y se responde con
+    el detalle (400 si Pillow no pudo abrirla, 502 si falló el almacenamiento).
+    """
+    storage = storage or storage_service.get_storage()
+    loop = asyncio.get_running_loop()
+
+    # Primero se validan y se leen todos (tipo, tope por archivo y por pedido):
+    # si alguno se pasa no se procesa ni se guarda nada
+    budget = upload_service.UploadBudget(settings.UPLOAD_MAX_REQUEST_BYTES)
+    uploads: List[upload_service.SpooledUpload] = []
+    try:
+        for file in files:
+            uploads.append(await upload_service.spool_upload(file, budget))
+
+        async def process_one(upload: upload_service.SpooledUpload) -> Dict[str, str]:
+            rendered = await loop.run_in_executor(_get_executor(), render_derivatives, upload.source())
+            return await _store_image_set(storage, upload, rendered)
+
+        results = await asyncio.gather(*[process_one(u) for u in uploads], return_exceptions=True)
+    finally:
+        for upload in uploads:
+            upload.close()
+
+    errores = [(f.filename, r) for f, r in zip(files, results) if isinstance(r, Exception)]
+    if not errores:
+        return list(results)
+
+    saved = [url for r in results if not isinstance(r, Exception) for url in r.values()]
+    if saved:
+        await storage.delete(saved)
+    invalid = any(isinstance(e, InvalidImageError) for _, e in errores)
+    detalle = "; ".join(f"'{filename}': {e}" for filename, e in errores)
+    raise HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST if invalid else status.HTTP_502_BAD_GATEWAY,
+        detail=f"No se pudieron procesar {len(errores)} de {len(files)} imágenes. {detalle}"
+    )
+
+
+def split_image_sets(image_sets: List[Dict[str, str]]) -> tuple:
+    """De la salida de process_uploads a las dos columnas del producto."""
+    urls = [s["original"] for s in image_sets]
+    derivadas = {s["original"]: {name: url for name, url in s.items() if name != "original"} for s in image_sets}
+    return urls, derivadas
+
+
+def urls_with_derivatives(urls: Iterable[str], derivadas: Optional[dict]) -> List[str]:
+    """Los originales más todos sus derivados, para borrarlos juntos."""
+    derivadas = derivadas or {}
+    result = []
+    for url in urls:
+        result.append(url)
+        result.extend((derivadas.get(url) or {}).values())
+    return result
+
+
+async def delete_product_images(urls: List[str], derivadas: Optional[dict] = None) -> dict:
+    return await storage_service.get_storage().delete(urls_with_derivatives(urls, derivadas))
@@ -0,0 +1,191 @@
+# En BACKEND/services/recommendation_service.py
+#
+# "Los que compraron esto también compraron".
+#
+# Un job por lotes (workers/update_recommendations.py) mantiene dos tablas:
+#   - coocurrencias_productos: matriz dispersa producto × producto con la cantidad
+#     de órdenes en las que aparecieron juntos (solo los pares que existen).
+#   - productos_relacionados: los K vecinos con más co-compras de cada producto,
+#     ya ordenados. El endpoint '/api/products/{id}/related' lee solo de acá.
+#
+# Es incremental: cada corrida solo cuenta los pares de las órdenes nuevas, los
+# suma a la matriz y recalcula el top-K de los productos que cambiaron. Todo se
+# hace con consultas por conjunto (self-join de orden × producto agrupado,
+# ROW_NUMBER() para el top-K) en vez de recorrer órdenes en Python.
+#
+# Qué es "nueva": los ids autoincrementales no se confirman en orden (con dos
+# transacciones a la vez, la de id 10 puede hacer commit después de que se leyó
+# la 11), así que no alcanza con "id > última procesada". 'estado_trabajos'
+# guarda 'ultimo_id', debajo del cual está todo procesado, e 'ids_recientes',
+# las órdenes ya contadas por encima. Cada corrida vuelve a mirar todo lo que
+# está por encima de 'ultimo_id' y cuenta solo lo que no está en ese conjunto.
+# 'ultimo_id' avanza hasta las órdenes creadas hace más de COMMIT_LAG: a esa
+# altura se asume que ya no puede aparecer una orden con un id más chico.
+#
+# Solo cuentan las compras pagas (PAID_STATES). Una orden que todavía no lo
+# está no entra en 'ids_recientes' y se vuelve a mirar en la próxima corrida
+# mientras siga dentro de la ventana de COMMIT_LAG.
+
+import logging
+from datetime import timedelta
+from typing import Dict, List
+
+from sqlalchemy import and_, delete, func, select
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from database.models import (
+    CoocurrenciaProducto, DetalleOrden, EstadoTrabajo, Orden, Producto, ProductoRelacionado, VarianteProducto
+)
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+JOB_NAME = "productos_relacionados"
+TOP_K = 12
+CHUNK_SIZE = 1000
+# Cuánto puede tardar en confirmarse una orden después de creada (checkout + pago)
+COMMIT_LAG = timedelta(minutes=10)
+# estado_pago de las compras concretadas: "Aprobado" (Mercado Pago) y "pagado" (ventas cargadas por el admin)
+PAID_STATES = ("Aprobado", "pagado")
+
+
+def _chunks(items: List, size: int = CHUNK_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _increment_statement(dialect_name: str, rows: List[dict]):
+    """INSERT multi-fila que suma 'veces' si el par ya estaba en la matriz."""
+    table = CoocurrenciaProducto.__table__
+    if dialect_name == "mysql":
+        stmt = mysql_insert(table).values(rows)
+        return stmt.on_duplicate_key_update(veces=table.c.veces + stmt.inserted.veces)
+    stmt = sqlite_insert(table).values(rows)
+    return stmt.on_conflict_do_update(
+        index_elements=[table.c.producto_id, table.c.relacionado_id],
+        set_={"veces": table.c.veces + stmt.excluded.veces}
+    )
+
+
+async def _count_new_pairs(db: AsyncSession, order_ids: List[int]) -> List[tuple]:
+    """(producto, relacionado, órdenes en común) para esas órdenes."""
+    # Cada orden cuenta una sola vez por producto aunque tenga varias variantes
+    items = (
+        select(DetalleOrden.orden_id, VarianteProducto.producto_id)
+        .join(VarianteProducto, VarianteProducto.id == DetalleOrden.variante_producto_id)
+        .where(DetalleOrden.orden_id.in_(order_ids))
+        .distinct()
+        .subquery()
+    )
+    a, b = items.alias("a"), items.alias("b")
+    pairs = (
+        select(a.c.producto_id, b.c.producto_id.label("relacionado_id"), func.count().label("veces"))
+        .select_from(a.join(b, and_(a.c.orden_id == b.c.orden_id, a.c.producto_id != b.c.producto_id)))
+        .group_by(a.c.producto_id, b.c.producto_id)
+    )
+    result = await db.execute(pairs)
+    return result.all()
+
+
+async def _rebuild_top_k(db: AsyncSession, product_ids: List[int], top_k: int):
+    """Reemplaza el top-K de esos productos con un INSERT ... SELECT sobre la matriz."""
+    matriz = CoocurrenciaProducto.__table__
+    relacionados = ProductoRelacionado.__table__
+    for chunk in _chunks(product_ids):
+        await db.execute(delete(relacionados).where(relacionados.c.producto_id.in_(chunk)))
+        ranked = (
+            select(
+                matriz.c.producto_id,
+                func.row_number().over(
+                    partition_by=matriz.c.producto_id,
+                    order_by=(matriz.c.veces.desc(), matriz.c.relacionado_id)
+                ).label("posicion"),
+                matriz.c.relacionado_id,
+                matriz.c.veces,
+            )
+            .where(matriz.c.producto_id.in_(chunk))
+            .subquery()
+        )
+        await db.execute(
+            relacionados.insert().from_select(
+                ["producto_id", "posicion", "relacionado_id", "veces"],
+                select(ranked.c.producto_id, ranked.c.posicion, ranked.c.relacionado_id, ranked.c.veces)
+                .where(ranked.c.posicion <= top_k)
+            )
+        )
+
+
+async def update_recommendations(db: AsyncSession, top_k: int = TOP_K, full: bool = False) -> Dict[str, int]:
+    """
+    Procesa las órdenes nuevas desde la última corrida (o todo el historial con
+    'full=True') en una sola transacción. Devuelve un resumen de lo que hizo.
+    """
+    estado = await db.get(EstadoTrabajo, JOB_NAME)
+    if estado is None:
+        estado = EstadoTrabajo(nombre=JOB_NAME, ultimo_id=0, ids_recientes=[])
+        db.add(estado)
+
+    if full:
+        await db.execute(delete(CoocurrenciaProducto.__table__))
+        await db.execute(delete(ProductoRelacionado.__table__))
+        estado.ultimo_id = 0
+        estado.ids_recientes = []
+
+    # La hora de la base, para compararla con 'creado_en' sin depender del reloj del worker
+    cutoff = (await db.execute(select(func.now()))).scalar() - COMMIT_LAG
+    after_id = estado.ultimo_id
+    already = set(estado.ids_recientes or [])
+    visible = (await db.execute(
+        select(Orden.id, Orden.creado_en, Orden.estado_pago).where(Orden.id > after_id).order_by(Orden.id)
+    )).all()
+    new_ids = [
+        order_id for order_id, _, estado_pago in visible
+        if order_id not in already and estado_pago in PAID_STATES
+    ]
+
+    pairs_count = 0
+    affected = set()
+    dialect_name = db.bind.dialect.name
+    for order_chunk in _chunks(new_ids):
+        pairs = await _count_new_pairs(db, order_chunk)
+        for chunk in _chunks(pairs):
+            rows = [{"producto_id": p, "relacionado_id": r, "veces": n} for p, r, n in chunk]
+            await db.execute(_increment_statement(dialect_name, rows))
+        pairs_count += len(pairs)
+        affected.update(p for p, _, _ in pairs)
+
+    affected = sorted(affected)
+    await _rebuild_top_k(db, affected, top_k)
+
+    # Todo lo visible y pago quedó contado; 'ultimo_id' sube hasta lo que ya salió de la ventana
+    settled = [order_id for order_id, creado_en, _ in visible if creado_en is not None and creado_en <= cutoff]
+    ultimo_id = max(settled, default=after_id)
+    estado.ultimo_id = ultimo_id
+    estado.ids_recientes = sorted(i for i in already.union(new_ids) if i > ultimo_id)
+    await db.commit()
+
+    summary = {
+        "ordenes_nuevas": len(new_ids),
+        "ultimo_id": ultimo_id,
+        "pares": pairs_count,
+        "productos_actualizados": len(affected),
+    }
+    logger.info(f"Recomendaciones actualizadas: {summary}")
+    return summary
+
+
+async def get_related_products(db: AsyncSession, product_id: int, limit: int) -> List[Producto]:
+    """Los relacionados precalculados de un producto, en orden, con sus variantes."""
+    query = (
+        select(Producto)
+        .join(ProductoRelacionado, ProductoRelacionado.relacionado_id == Producto.id)
+        .where(ProductoRelacionado.producto_id == product_id)
+        .order_by(ProductoRelacionado.posicion)
+        .limit(limit)
+        .options(selectinload(Producto.variantes))
+    )
+    result = await db.execute(query)
+    return list(result.scalars().all())
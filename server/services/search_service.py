@@ -0,0 +1,214 @@
+# En BACKEND/services/search_service.py
+
+import asyncio
+import bisect
+import re
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import and_, case, or_, select
+from sqlalchemy.dialects.mysql import match
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.models import Producto
+from settings import settings
+
+# --- Configuración de la búsqueda ---
+# Peso de cada campo del producto al calcular la relevancia
+FIELD_WEIGHTS = {
+    "nombre": 3.0,
+    "color": 2.0,
+    "material": 2.0,
+    "descripcion": 1.0,
+}
+# Un match por prefijo ("cami" -> "camisa") vale menos que uno exacto
+PREFIX_WEIGHT = 0.5
+
+STOPWORDS = {"de", "del", "la", "las", "el", "los", "y", "o", "en", "con", "para", "por", "un", "una"}
+_TOKEN_RE = re.compile(r"\w+")
+
+
+# --- Normalización ---
+def fold(text: str) -> str:
+    """Pasa a minúsculas y saca los acentos ("Camisá" -> "camisa")."""
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).lower()
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    if not text:
+        return []
+    return [t for t in _TOKEN_RE.findall(fold(text)) if t not in STOPWORDS]
+
+
+# --- Índice invertido en memoria (fallback para SQLite/tests) ---
+class InvertedIndex:
+    """
+    Índice token -> {producto_id: peso}. Se construye una vez desde la base y
+    después se mantiene al día con cada alta, edición o baja de productos.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.postings: Dict[str, Dict[int, float]] = {}
+        self.doc_tokens: Dict[int, Set[str]] = {}
+        self.vocabulary: List[str] = []  # ordenado, para buscar por prefijo con bisect
+        self.built = False
+
+    def _add_token(self, token: str, product_id: int, weight: float):
+        docs = self.postings.get(token)
+        if docs is None:
+            docs = self.postings[token] = {}
+            bisect.insort(self.vocabulary, token)
+        docs[product_id] = docs.get(product_id, 0.0) + weight
+
+    def _drop_token(self, token: str, product_id: int):
+        docs = self.postings.get(token)
+        if not docs:
+            return
+        docs.pop(product_id, None)
+        if not docs:
+            del self.postings[token]
+            pos = bisect.bisect_left(self.vocabulary, token)
+            if pos < len(self.vocabulary) and self.vocabulary[pos] == token:
+                self.vocabulary.pop(pos)
+
+    def add(self, product: Producto):
+        self.remove(product.id)
+        tokens = set()
+        for field, weight in FIELD_WEIGHTS.items():
+            for token in tokenize(getattr(product, field, None)):
+                self._add_token(token, product.id, weight)
+                tokens.add(token)
+        self.doc_tokens[product.id] = tokens
+
+    def remove(self, product_id: int):
+        for token in self.doc_tokens.pop(product_id, ()):
+            self._drop_token(token, product_id)
+
+    def _prefix_tokens(self, prefix: str) -> Iterable[str]:
+        pos = bisect.bisect_left(self.vocabulary, prefix)
+        while pos < len(self.vocabulary) and self.vocabulary[pos].startswith(prefix):
+            yield self.vocabulary[pos]
+            pos += 1
+
+    def search(self, query: str, limit: Optional[int] = None) -> List[Tuple[int, float]]:
+        """
+        Devuelve [(producto_id, puntaje)] ordenado por relevancia. Todos los
+        términos tienen que matchear. Sin 'limit' devuelve todos los candidatos.
+        """
+        terms = tokenize(query)
+        if not terms:
+            return []
+
+        scores: Optional[Dict[int, float]] = None
+        for term in terms:
+            term_scores: Dict[int, float] = {}
+            for token in self._prefix_tokens(term):
+                factor = 1.0 if token == term else PREFIX_WEIGHT
+                for product_id, weight in self.postings[token].items():
+                    term_scores[product_id] = max(term_scores.get(product_id, 0.0), weight * factor)
+
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {pid: s + term_scores[pid] for pid, s in scores.items() if pid in term_scores}
+            if not scores:
+                return []
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return ranked[:limit]
+
+
+product_index = InvertedIndex()
+_build_lock = asyncio.Lock()
+
+
+async def ensure_index(db: AsyncSession):
+    """Construye el índice en memoria la primera vez que se lo necesita."""
+    if product_index.built:
+        return
+    async with _build_lock:
+        if product_index.built:
+            return
+        result = await db.execute(select(
+            Producto.id, Producto.nombre, Producto.descripcion, Producto.material, Producto.color
+        ))
+        for row in result.all():
+            product_index.add(row)
+        product_index.built = True
+
+
+def index_product(product: Producto):
+    """Actualiza el índice en memoria después de crear o editar un producto."""
+    if product_index.built:
+        product_index.add(product)
+
+
+def remove_product(product_id: int):
+    """Saca un producto borrado del índice en memoria."""
+    if product_index.built:
+        product_index.remove(product_id)
+
+
+# --- Punto de entrada para el catálogo ---
+# Lista de stopwords por defecto de InnoDB: no se indexan, y un "+de*" obligatorio
+# haría que la búsqueda entera no devuelva nada
+MYSQL_FULLTEXT_STOPWORDS = {
+    "a", "about", "an", "are", "as", "at", "be", "by", "com", "de", "en", "for", "from", "how", "i",
+    "in", "is", "it", "la", "of", "on", "or", "that", "the", "this", "to", "was", "what", "when",
+    "where", "who", "will", "with", "und", "www",
+}
+
+
+def _fulltext_terms(query: str) -> List[str]:
+    """Los términos que el índice FULLTEXT de MySQL puede encontrar."""
+    return [
+        term for term in tokenize(query)
+        if len(term) >= settings.SEARCH_MYSQL_MIN_TOKEN_SIZE and term not in MYSQL_FULLTEXT_STOPWORDS
+    ]
+
+
+def _boolean_query(query: str) -> Optional[str]:
+    # En MySQL cada término es obligatorio (+) y admite prefijo (*). Los cortos
+    # ("t" de "t shirt") y las stopwords quedan afuera: no están en el índice.
+    terms = _fulltext_terms(query)
+    return " ".join(f"+{term}*" for term in terms) if terms else None
+
+
+def _short_terms_clause(query: str):
+    # Solo términos que FULLTEXT no ve ("xl"): alguna palabra del nombre empieza con cada uno
+    return and_(*[
+        or_(Producto.nombre.startswith(term, autoescape=True), Producto.nombre.contains(f" {term}", autoescape=True))
+        for term in tokenize(query)
+    ])
+
+
+async def relevance_clause(db: AsyncSession, query: str):
+    """
+    Devuelve (condición WHERE, expresión de relevancia) para buscar 'query'.
+    En MySQL usa el índice FULLTEXT; en otros motores, el índice invertido en memoria.
+    Si la búsqueda no tiene términos útiles devuelve (None, None) y no se filtra.
+    """
+    if not tokenize(query):
+        return None, None
+
+    if db.bind.dialect.name == "mysql":
+        against = _boolean_query(query)
+        if against is None:
+            return _short_terms_clause(query), None
+        relevance = match(
+            Producto.nombre, Producto.descripcion, Producto.material, Producto.color,
+            against=against
+        ).in_boolean_mode()
+        return relevance > 0, relevance
+
+    # Todos los candidatos, sin tope: el catálogo pagina y cuenta sobre el conjunto completo
+    await ensure_index(db)
+    ranked = product_index.search(query)
+    if not ranked:
+        return Producto.id.in_([]), None
+    scores = dict(ranked)
+    return Producto.id.in_(list(scores)), case(scores, value=Producto.id, else_=0)
@@ -0,0 +1,113 @@
+# En BACKEND/services/storage_service.py
+#
+# Dónde se guardan las imágenes de los productos (originales y derivados).
+#
+# Los routers y el pipeline de imágenes no hablan directo con Cloudinary: usan
+# get_storage(), que devuelve el backend configurado en IMAGE_STORAGE_BACKEND.
+#   - 'cloudinary': producción, sube con cloudinary_service (pool de threads).
+#   - 'local': escribe en MEDIA_ROOT y sirve las URLs bajo MEDIA_URL (main.py
+#     monta la carpeta). Sirve para desarrollo y tests sin internet.
+
+import asyncio
+import logging
+import os
+from abc import ABC, abstractmethod
+from typing import BinaryIO, List, Optional
+
+from services import cloudinary_service, upload_service
+from settings import settings
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class StorageBackend(ABC):
+    """Interfaz mínima: guardar un archivo bajo una clave y borrar por URL."""
+
+    name = ""
+
+    @abstractmethod
+    async def save(self, key: str, content: BinaryIO, content_type: str) -> str:
+        """Guarda el archivo leyéndolo de a bloques (nunca entero en memoria) y devuelve su URL."""
+
+    @abstractmethod
+    async def delete(self, urls: List[str]) -> dict:
+        """Borra las URLs y devuelve {'eliminadas': [...], 'errores': [...]}."""
+
+
+class CloudinaryStorage(StorageBackend):
+    name = "cloudinary"
+
+    async def save(self, key: str, content: BinaryIO, content_type: str) -> str:
+        # Cloudinary arma la extensión según el formato: el public_id va sin ella
+        public_id = os.path.splitext(key)[0]
+        return await cloudinary_service.upload_stream(content, public_id)
+
+    async def delete(self, urls: List[str]) -> dict:
+        return await cloudinary_service.delete_images(urls)
+
+
+class LocalStorage(StorageBackend):
+    name = "local"
+
+    def __init__(self, root: str, base_url: str):
+        self.root = os.path.abspath(root)
+        self.base_url = base_url.rstrip("/")
+
+    def _path_for_key(self, key: str) -> Optional[str]:
+        path = os.path.abspath(os.path.join(self.root, key))
+        # Nada de '../': todo tiene que quedar adentro de MEDIA_ROOT
+        if os.path.commonpath([self.root, path]) != self.root:
+            return None
+        return path
+
+    def _write(self, path: str, content: BinaryIO):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            upload_service.copy_in_chunks(content, f)
+
+    async def save(self, key: str, content: BinaryIO, content_type: str) -> str:
+        path = self._path_for_key(key)
+        if path is None:
+            raise ValueError(f"Clave de imagen inválida: {key}")
+        await asyncio.to_thread(self._write, path, content)
+        return f"{self.base_url}/{key}"
+
+    async def delete(self, urls: List[str]) -> dict:
+        eliminadas, errores = [], []
+        for url in urls:
+            path = self._path_for_key(url[len(self.base_url) + 1:]) if url.startswith(self.base_url + "/") else None
+            if path is None:
+                errores.append({"url": url, "error": "la URL no pertenece al almacenamiento local"})
+                continue
+            try:
+                await asyncio.to_thread(os.remove, path)
+                eliminadas.append(url)
+            except OSError as e:
+                logger.error(f"Error al eliminar la imagen local {url}: {e}")
+                errores.append({"url": url, "error": str(e)})
+        return {"eliminadas": eliminadas, "errores": errores}
+
+
+def _build_storage() -> StorageBackend:
+    if settings.IMAGE_STORAGE_BACKEND == "local":
+        return LocalStorage(settings.MEDIA_ROOT, f"{settings.BACKEND_URL.rstrip('/')}{settings.MEDIA_URL}")
+    if settings.IMAGE_STORAGE_BACKEND != "cloudinary":
+        raise ValueError(f"IMAGE_STORAGE_BACKEND desconocido: {settings.IMAGE_STORAGE_BACKEND}")
+    return CloudinaryStorage()
+
+
+_storage: Optional[StorageBackend] = None
+
+
+def get_storage() -> StorageBackend:
+    global _storage
+    if _storage is None:
+        _storage = _build_storage()
+    return _storage
+
+
+def set_storage(storage: Optional[StorageBackend]):
+    """Cambia el backend en caliente (tests). Con None vuelve a leer la configuración."""
+    global _storage
+    _storage = storage
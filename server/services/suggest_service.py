@@ -0,0 +1,388 @@
+# En BACKEND/services/suggest_service.py
+
+import asyncio
+import bisect
+import heapq
+import logging
+import time
+from typing import Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.database import AsyncSessionLocal
+from database.models import Categoria, DetalleOrden, Producto, VarianteProducto
+from services.search_service import fold, tokenize
+from settings import settings
+
+logger = logging.getLogger(__name__)
+
+# --- Autocompletado del buscador ---
+# El buscador pedía el listado completo en cada tecla. Este índice vive en
+# memoria (arrays ordenados + bisect) y responde sin ir a la base:
+#   - productos cuyo nombre, categoría o color empieza con lo tipeado, ordenados
+#     por unidades vendidas (DetalleOrden);
+#   - categorías y colores que empiezan con lo tipeado.
+# Se construye al arrancar (lifespan) y se mantiene al día con las escrituras de
+# productos, variantes y con cada orden guardada.
+#
+# Esas escrituras solo llegan al índice del mismo proceso: los otros workers de
+# uvicorn, el worker de importación o un cambio directo en la base no. Por eso
+# cada SUGGEST_INDEX_CHECK_SECONDS se compara una "versión" barata del catálogo
+# (cantidades, ids máximos y última actualización) y si cambió se reconstruye.
+# Cada SUGGEST_INDEX_MAX_AGE_SECONDS se reconstruye igual, para lo que la
+# versión no detecta (por ejemplo un UPDATE a mano que no toca actualizado_en).
+# El chequeo y la reconstrucción corren en una tarea aparte que arma un índice
+# nuevo y lo cambia por el viejo al terminar: las sugerencias nunca esperan a la
+# base. Las escrituras locales guardan la versión nueva, así no reconstruyen.
+
+DEFAULT_LIMIT = 8
+MAX_LIMIT = 20
+# Respuestas memorizadas por (prefijo, límite). Los prefijos cortos ("r", "re")
+# matchean casi todo el catálogo y son los que más se repiten entre usuarios.
+MAX_MEMO_ENTRIES = 2048
+
+
+class _SortedKeys:
+    """Claves normalizadas ordenadas, para buscar por prefijo con bisect."""
+
+    def __init__(self):
+        self.keys: List[str] = []
+
+    def add(self, key: str):
+        pos = bisect.bisect_left(self.keys, key)
+        if pos == len(self.keys) or self.keys[pos] != key:
+            self.keys.insert(pos, key)
+
+    def discard(self, key: str):
+        pos = bisect.bisect_left(self.keys, key)
+        if pos < len(self.keys) and self.keys[pos] == key:
+            self.keys.pop(pos)
+
+    def with_prefix(self, prefix: str) -> Iterable[str]:
+        pos = bisect.bisect_left(self.keys, prefix)
+        while pos < len(self.keys) and self.keys[pos].startswith(prefix):
+            yield self.keys[pos]
+            pos += 1
+
+
+class PrefixIndex:
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.tokens = _SortedKeys()
+        self.postings: Dict[str, Set[int]] = {}  # token -> productos
+        self.docs: Dict[int, dict] = {}  # producto_id -> {nombre, categoria_id, color, colores_variantes, tokens}
+        self.popularity: Dict[int, int] = {}  # producto_id -> unidades vendidas
+        self.categories: Dict[int, str] = {}
+        self.category_keys = _SortedKeys()
+        self.category_by_key: Dict[str, int] = {}
+        self.color_keys = _SortedKeys()
+        self.colors: Dict[str, list] = {}  # color normalizado -> [como se muestra, cantidad de productos]
+        self._memo: Dict[tuple, dict] = {}
+        self.built = False
+        self.version: Optional[tuple] = None
+        self.built_at = 0.0
+        self.checked_at = 0.0
+
+    # --- Categorías ---
+    def set_categories(self, categories: Dict[int, str]):
+        self._memo.clear()
+        self.categories = dict(categories)
+        self.category_keys = _SortedKeys()
+        self.category_by_key = {}
+        for category_id, nombre in self.categories.items():
+            key = fold(nombre)
+            self.category_keys.add(key)
+            self.category_by_key[key] = category_id
+
+    # --- Productos ---
+    def _colors_of(self, doc: dict) -> Set[str]:
+        colores = set(doc["colores_variantes"])
+        if doc["color"]:
+            colores.add(doc["color"])
+        return colores
+
+    def add(self, product_id: int, nombre: str, categoria_id: int, color: Optional[str] = None,
+            colores_variantes: Optional[Iterable[str]] = None):
+        """Agrega o reemplaza un producto. Sin 'colores_variantes' conserva los que ya tenía."""
+        self._memo.clear()
+        previous = self.docs.get(product_id)
+        if colores_variantes is None:
+            colores_variantes = previous["colores_variantes"] if previous else set()
+        self.remove(product_id)
+
+        doc = {
+            "nombre": nombre,
+            "categoria_id": categoria_id,
+            "color": color,
+            "colores_variantes": set(colores_variantes),
+        }
+        colores = self._colors_of(doc)
+        tokens = set(tokenize(nombre)) | set(tokenize(self.categories.get(categoria_id)))
+        for c in colores:
+            tokens.update(tokenize(c))
+        doc["tokens"] = tokens
+        self.docs[product_id] = doc
+
+        for token in tokens:
+            docs = self.postings.get(token)
+            if docs is None:
+                docs = self.postings[token] = set()
+                self.tokens.add(token)
+            docs.add(product_id)
+        for c in colores:
+            entry = self.colors.get(fold(c))
+            if entry is None:
+                self.colors[fold(c)] = [c, 1]
+                self.color_keys.add(fold(c))
+            else:
+                entry[1] += 1
+
+    def add_colors(self, product_id: int, colores: Iterable[str]):
+        doc = self.docs.get(product_id)
+        if doc is None:
+            return
+        self.add(product_id, doc["nombre"], doc["categoria_id"], doc["color"], doc["colores_variantes"] | set(colores))
+
+    def remove(self, product_id: int):
+        self._memo.clear()
+        doc = self.docs.pop(product_id, None)
+        if doc is None:
+            return
+        for token in doc["tokens"]:
+            docs = self.postings.get(token)
+            if docs is None:
+                continue
+            docs.discard(product_id)
+            if not docs:
+                del self.postings[token]
+                self.tokens.discard(token)
+        for c in self._colors_of(doc):
+            entry = self.colors.get(fold(c))
+            if entry is None:
+                continue
+            entry[1] -= 1
+            if entry[1] <= 0:
+                del self.colors[fold(c)]
+                self.color_keys.discard(fold(c))
+
+    def record_sales(self, units_by_product: Dict[int, int]):
+        self._memo.clear()
+        for product_id, units in units_by_product.items():
+            self.popularity[product_id] = self.popularity.get(product_id, 0) + units
+
+    # --- Consulta ---
+    def _matching_products(self, terms: List[str]) -> Set[int]:
+        matches: Optional[Set[int]] = None
+        for term in terms:
+            term_matches: Set[int] = set()
+            for token in self.tokens.with_prefix(term):
+                term_matches |= self.postings[token]
+            matches = term_matches if matches is None else matches & term_matches
+            if not matches:
+                return set()
+        return matches or set()
+
+    def suggest(self, prefix: str, limit: int = DEFAULT_LIMIT) -> dict:
+        terms = tokenize(prefix)
+        if not terms:
+            return {"productos": [], "categorias": [], "colores": []}
+
+        memo_key = (" ".join(fold(prefix).split()), limit)
+        cached = self._memo.get(memo_key)
+        if cached is not None:
+            return cached
+        if len(self._memo) >= MAX_MEMO_ENTRIES:
+            self._memo.clear()
+        result = self._memo[memo_key] = self._compute(prefix, terms, limit)
+        return result
+
+    def _compute(self, prefix: str, terms: List[str], limit: int) -> dict:
+        candidates = self._matching_products(terms)
+        top = heapq.nsmallest(
+            limit, candidates,
+            key=lambda pid: (-self.popularity.get(pid, 0), self.docs[pid]["nombre"], pid)
+        )
+        productos = [
+            {"id": pid, "nombre": self.docs[pid]["nombre"], "vendidos": self.popularity.get(pid, 0)}
+            for pid in top
+        ]
+
+        # Categorías y colores se completan con lo tipeado entero ("camp" -> "Camperas")
+        folded = " ".join(fold(prefix).split())
+        categorias = []
+        for key in self.category_keys.with_prefix(folded):
+            category_id = self.category_by_key[key]
+            categorias.append({"id": category_id, "nombre": self.categories[category_id]})
+            if len(categorias) >= limit:
+                break
+        colores = sorted(
+            (self.colors[key] for key in self.color_keys.with_prefix(folded)),
+            key=lambda entry: (-entry[1], entry[0])
+        )[:limit]
+        return {"productos": productos, "categorias": categorias, "colores": [c[0] for c in colores]}
+
+
+prefix_index = PrefixIndex()
+_build_lock = asyncio.Lock()
+_refresh_task: Optional[asyncio.Task] = None
+# Escrituras locales aplicadas al índice (ver _refresh)
+_local_writes = 0
+
+
+async def _catalog_version(db: AsyncSession) -> tuple:
+    """Una sola consulta con lo que cambia cuando se crea, edita o borra algo que el índice usa."""
+    result = await db.execute(select(
+        select(func.count(Producto.id)).scalar_subquery(),
+        select(func.max(Producto.id)).scalar_subquery(),
+        select(func.max(Producto.actualizado_en)).scalar_subquery(),
+        select(func.count(VarianteProducto.id)).scalar_subquery(),
+        select(func.max(VarianteProducto.id)).scalar_subquery(),
+        select(func.count(Categoria.id)).scalar_subquery(),
+        select(func.max(Categoria.id)).scalar_subquery(),
+        select(func.count(DetalleOrden.id)).scalar_subquery(),
+    ))
+    return tuple(result.one())
+
+
+async def _build(db: AsyncSession) -> PrefixIndex:
+    """Arma un índice nuevo desde la base, sin tocar el que se está usando."""
+    # La versión se toma antes de leer: lo que cambie mientras tanto se ve en el próximo chequeo
+    version = await _catalog_version(db)
+    categories = await db.execute(select(Categoria.id, Categoria.nombre))
+    products = await db.execute(select(Producto.id, Producto.nombre, Producto.categoria_id, Producto.color))
+    variant_colors = await db.execute(select(VarianteProducto.producto_id, VarianteProducto.color).distinct())
+    sales = await db.execute(
+        select(VarianteProducto.producto_id, func.sum(DetalleOrden.cantidad))
+        .join(DetalleOrden, DetalleOrden.variante_producto_id == VarianteProducto.id)
+        .group_by(VarianteProducto.producto_id)
+    )
+
+    index = PrefixIndex()
+    index.set_categories(dict(categories.all()))
+    colors_by_product: Dict[int, Set[str]] = {}
+    for producto_id, color in variant_colors.all():
+        colors_by_product.setdefault(producto_id, set()).add(color)
+    for row in products.all():
+        index.add(row.id, row.nombre, row.categoria_id, row.color, colors_by_product.get(row.id, ()))
+    index.record_sales({pid: int(units or 0) for pid, units in sales.all()})
+    index.version = version
+    index.built_at = index.checked_at = time.monotonic()
+    index.built = True
+    return index
+
+
+def _swap(index: PrefixIndex):
+    # Las consultas leen suggest_service.prefix_index en cada pedido: el cambio es atómico
+    global prefix_index
+    prefix_index = index
+
+
+async def _refresh():
+    """Chequea la versión y, si hace falta, arma un índice nuevo y lo cambia por el actual."""
+    writes = _local_writes
+    try:
+        async with AsyncSessionLocal() as db:
+            current = prefix_index
+            version = await _catalog_version(db)
+            now = time.monotonic()
+            expired = now >= current.built_at + settings.SUGGEST_INDEX_MAX_AGE_SECONDS
+            if version == current.version and not expired:
+                current.checked_at = now
+                return
+            index = await _build(db)
+    except Exception as e:
+        logger.error(f"No se pudo actualizar el índice de sugerencias: {e}")
+        return
+    # Una escritura local mientras se armaba puede no estar en el índice nuevo: se rechequea enseguida
+    if writes != _local_writes:
+        index.checked_at = 0.0
+    _swap(index)
+
+
+def _is_fresh(now: float) -> bool:
+    return now < prefix_index.checked_at + settings.SUGGEST_INDEX_CHECK_SECONDS
+
+
+async def ensure_index(db: AsyncSession):
+    """
+    La primera vez construye el índice con la sesión del pedido (no hay con qué
+    responder mientras tanto). Después nunca espera: si toca chequear la versión
+    lanza _refresh en segundo plano y se sigue respondiendo con el índice actual.
+    """
+    global _refresh_task
+    if prefix_index.built:
+        if not _is_fresh(time.monotonic()) and (_refresh_task is None or _refresh_task.done()):
+            _refresh_task = asyncio.create_task(_refresh())
+        return
+    async with _build_lock:
+        if not prefix_index.built:
+            _swap(await _build(db))
+
+
+def shutdown():
+    global _refresh_task
+    if _refresh_task is not None and not _refresh_task.done():
+        _refresh_task.cancel()
+    _refresh_task = None
+
+
+def reset():
+    """Índice vacío y sin reconstrucción pendiente (tests)."""
+    shutdown()
+    prefix_index.reset()
+
+
+# --- Hooks para las escrituras (no hacen nada si el índice todavía no se construyó) ---
+# Después de aplicar el cambio guardan la versión nueva del catálogo: así la
+# escritura local no dispara una reconstrucción entera en el próximo chequeo.
+async def _note_local_write(db: AsyncSession):
+    global _local_writes
+    _local_writes += 1
+    index = prefix_index
+    try:
+        index.version = await _catalog_version(db)
+        index.checked_at = time.monotonic()
+    except Exception as e:
+        logger.error(f"No se pudo leer la versión del catálogo: {e}")
+        index.checked_at = 0.0
+
+
+async def index_product(db: AsyncSession, product: Producto, colores_variantes: Optional[Iterable[str]] = None):
+    if prefix_index.built:
+        prefix_index.add(product.id, product.nombre, product.categoria_id, product.color, colores_variantes)
+        await _note_local_write(db)
+
+
+async def add_variant_colors(db: AsyncSession, product_id: int, colores: Iterable[str]):
+    if prefix_index.built:
+        prefix_index.add_colors(product_id, colores)
+        await _note_local_write(db)
+
+
+async def remove_product(db: AsyncSession, product_id: int):
+    if prefix_index.built:
+        prefix_index.remove(product_id)
+        await _note_local_write(db)
+
+
+async def record_sales(db: AsyncSession, units_by_product: Dict[int, int]):
+    if prefix_index.built:
+        prefix_index.record_sales(units_by_product)
+        await _note_local_write(db)
+
+
+async def rebuild(db: AsyncSession):
+    """
+    Después de cambios masivos (importación): arma el índice nuevo con la sesión
+    de quien escribió y lo cambia por el viejo. Las consultas no esperan.
+    """
+    if not prefix_index.built:
+        return
+    try:
+        _swap(await _build(db))
+    except Exception as e:
+        logger.error(f"No se pudo reconstruir el índice de sugerencias: {e}")
+        prefix_index.checked_at = 0.0
@@ -0,0 +1,164 @@
+# En BACKEND/services/upload_service.py
+#
+# Lectura acotada de las imágenes que suben los admins.
+#
+# Antes el archivo entero se pasaba tal cual a Cloudinary, sin tope de tamaño.
+# Ahora cada UploadFile se lee de a bloques:
+#   - con los primeros bytes se detecta el tipo real (firma del archivo, no el
+#     Content-Type que manda el navegador) y se rechaza lo que no es imagen;
+#   - se cuenta lo leído contra el tope por archivo y el tope de todo el pedido,
+#     cortando apenas se pasa (sin leer el resto);
+#   - hasta UPLOAD_SPOOL_THRESHOLD_BYTES queda en memoria, después se pasa a un
+#     archivo temporal en disco. Así la memoria por pedido queda acotada aunque
+#     haya varios admins subiendo a la vez.
+# El tope del pedido completo también se controla antes de leer el body, en
+# utils/request_limits.py.
+
+import io
+import os
+import shutil
+import tempfile
+from typing import BinaryIO, Optional, Union
+
+from fastapi import HTTPException, UploadFile, status
+
+from settings import settings
+
+CHUNK_SIZE = 64 * 1024
+SNIFF_BYTES = 16
+# 413 va como número: el nombre de la constante cambió entre versiones de Starlette
+PAYLOAD_TOO_LARGE = 413
+
+
+def sniff_content_type(head: bytes) -> Optional[str]:
+    """Tipo de imagen según la firma de los primeros bytes (None si no es una soportada)."""
+    if head.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if head[:6] in (b"GIF87a", b"GIF89a"):
+        return "image/gif"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    return None
+
+
+def _megabytes(size: int) -> str:
+    return f"{size / (1024 * 1024):.1f} MB"
+
+
+class UploadBudget:
+    """Bytes que le quedan a un pedido para todos sus archivos."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.used = 0
+
+    def consume(self, size: int, filename: str):
+        self.used += size
+        if self.used > self.max_bytes:
+            raise HTTPException(
+                status_code=PAYLOAD_TOO_LARGE,
+                detail=f"Las imágenes del pedido superan el máximo de {_megabytes(self.max_bytes)} (se cortó en '{filename}')."
+            )
+
+
+class SpooledUpload:
+    """Un archivo ya validado: en memoria si es chico, en un temporal en disco si no."""
+
+    def __init__(self, filename: str, content_type: str):
+        self.filename = filename
+        self.content_type = content_type
+        self.size = 0
+        self._buffer: Optional[io.BytesIO] = io.BytesIO()
+        self.path: Optional[str] = None
+        self._disk: Optional[BinaryIO] = None
+
+    def write(self, chunk: bytes, threshold: int):
+        self.size += len(chunk)
+        if self._disk is None and self.size > threshold:
+            # Pasamos a disco: un archivo con nombre, así el pool de procesos lo abre por ruta
+            self._disk = tempfile.NamedTemporaryFile(prefix="upload-", delete=False)
+            self.path = self._disk.name
+            self._disk.write(self._buffer.getbuffer())
+            self._buffer = None
+        if self._disk is not None:
+            self._disk.write(chunk)
+        else:
+            self._buffer.write(chunk)
+
+    def finish(self):
+        if self._disk is not None:
+            self._disk.close()
+            self._disk = None
+
+    @property
+    def in_memory(self) -> bool:
+        return self.path is None
+
+    def source(self) -> Union[bytes, str]:
+        """Lo que se le pasa al pool de procesos: los bytes si son pocos, si no la ruta."""
+        return self._buffer.getvalue() if self.in_memory else self.path
+
+    def open(self) -> BinaryIO:
+        """Un lector nuevo desde el principio, para mandarlo de a bloques al storage."""
+        if self.in_memory:
+            return io.BytesIO(self._buffer.getbuffer())
+        return open(self.path, "rb")
+
+    def close(self):
+        self.finish()
+        self._buffer = None
+        if self.path is not None:
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+            self.path = None
+
+
+async def spool_upload(
+    file: UploadFile,
+    budget: UploadBudget,
+    max_file_bytes: Optional[int] = None,
+    spool_threshold: Optional[int] = None,
+) -> SpooledUpload:
+    """Lee un UploadFile de a bloques validando tipo y tamaño. Corta con 413/415 sin leer el resto."""
+    max_file_bytes = max_file_bytes or settings.UPLOAD_MAX_FILE_BYTES
+    spool_threshold = spool_threshold or settings.UPLOAD_SPOOL_THRESHOLD_BYTES
+    filename = file.filename or "archivo"
+
+    too_large = HTTPException(
+        status_code=PAYLOAD_TOO_LARGE,
+        detail=f"La imagen '{filename}' supera el máximo de {_megabytes(max_file_bytes)} por archivo."
+    )
+    # Si ya se conoce el tamaño no hace falta leer nada para rechazarlo
+    if file.size is not None and file.size > max_file_bytes:
+        raise too_large
+
+    head = await file.read(CHUNK_SIZE)
+    content_type = sniff_content_type(head[:SNIFF_BYTES])
+    if content_type is None:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail=f"'{filename}' no es una imagen JPEG, PNG, GIF o WebP."
+        )
+
+    spooled = SpooledUpload(filename, content_type)
+    try:
+        chunk = head
+        while chunk:
+            if spooled.size + len(chunk) > max_file_bytes:
+                raise too_large
+            budget.consume(len(chunk), filename)
+            spooled.write(chunk, spool_threshold)
+            chunk = await file.read(CHUNK_SIZE)
+        spooled.finish()
+    except BaseException:
+        spooled.close()
+        raise
+    return spooled
+
+
+def copy_in_chunks(source: BinaryIO, destination: BinaryIO):
+    shutil.copyfileobj(source, destination, CHUNK_SIZE)
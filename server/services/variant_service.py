@@ -0,0 +1,163 @@
+# En BACKEND/services/variant_service.py
+#
+# Altas y cambios de stock de variantes en lote.
+#
+# Antes cada variante era un request con su commit y su refresh (6 talles × 8
+# colores = 48 idas y vueltas). Acá todo el lote va en una transacción con
+# statements por conjunto:
+#   - UN UPDATE con CASE por id para todas las variantes que ya existen.
+#   - UN INSERT multi-fila para las combinaciones talle/color nuevas.
+
+from typing import Dict, Iterable, List
+
+from fastapi import HTTPException, status
+from sqlalchemy import case, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.models import VarianteProducto
+from schemas import product_schemas
+
+
+def build_variant_matrix(product_id: int, variants: Iterable[VarianteProducto]) -> dict:
+    """Arma la grilla talle × color a partir de las variantes de un producto."""
+    variants = sorted(variants, key=lambda v: v.id)
+    talles, colores = [], []
+    matriz: Dict[str, Dict[str, int]] = {}
+    for v in variants:
+        if v.tamanio not in talles:
+            talles.append(v.tamanio)
+        if v.color not in colores:
+            colores.append(v.color)
+        matriz.setdefault(v.tamanio, {})[v.color] = v.cantidad_en_stock
+    return {
+        "producto_id": product_id,
+        "talles": talles,
+        "colores": colores,
+        "matriz": matriz,
+        "variantes": variants,
+    }
+
+
+def build_availability_grid(product_id: int, variant_rows) -> dict:
+    """
+    Versión compacta para la página de producto: ejes de talles y colores y dos
+    matrices [talle][color] con el stock y el id de cada variante (null si esa
+    combinación no existe). Recibe filas (id, tamanio, color, cantidad_en_stock).
+    """
+    talles, colores = [], []
+    cells = {}
+    for variant_id, tamanio, color, cantidad in variant_rows:
+        if tamanio not in talles:
+            talles.append(tamanio)
+        if color not in colores:
+            colores.append(color)
+        cells[(tamanio, color)] = (variant_id, cantidad)
+
+    stock = [[cells[(t, c)][1] if (t, c) in cells else None for c in colores] for t in talles]
+    ids = [[cells[(t, c)][0] if (t, c) in cells else None for c in colores] for t in talles]
+    return {"producto_id": product_id, "talles": talles, "colores": colores, "stock": stock, "ids": ids}
+
+
+async def get_availability_grid(db: AsyncSession, product_id: int) -> dict:
+    result = await db.execute(
+        select(VarianteProducto.id, VarianteProducto.tamanio, VarianteProducto.color, VarianteProducto.cantidad_en_stock)
+        .where(VarianteProducto.producto_id == product_id)
+        .order_by(VarianteProducto.id)
+    )
+    return build_availability_grid(product_id, result.all())
+
+
+async def _load_variants(db: AsyncSession, product_id: int) -> List[VarianteProducto]:
+    # populate_existing: las variantes pueden estar en la sesión con el stock de antes del UPDATE
+    result = await db.execute(
+        select(VarianteProducto)
+        .where(VarianteProducto.producto_id == product_id)
+        .execution_options(populate_existing=True)
+    )
+    return list(result.scalars().all())
+
+
+async def apply_variant_matrix(db: AsyncSession, product_id: int, matriz: Dict[str, Dict[str, int]]) -> bool:
+    """
+    Deja el stock de cada combinación talle/color de la matriz en el valor pedido,
+    creando las que no existen. Las variantes que no están en la matriz no se tocan.
+    Devuelve True si se creó alguna variante nueva. No hace commit.
+    """
+    existing = {(v.tamanio, v.color): v.id for v in await _load_variants(db, product_id)}
+
+    new_stock_by_id, to_insert = {}, []
+    for tamanio, colores in matriz.items():
+        for color, cantidad in colores.items():
+            variant_id = existing.get((tamanio, color))
+            if variant_id is None:
+                to_insert.append({"producto_id": product_id, "tamanio": tamanio, "color": color, "cantidad_en_stock": cantidad})
+            else:
+                new_stock_by_id[variant_id] = cantidad
+
+    variantes = VarianteProducto.__table__
+    if new_stock_by_id:
+        await db.execute(
+            update(variantes)
+            .where(variantes.c.id.in_(list(new_stock_by_id)))
+            .values(cantidad_en_stock=case(new_stock_by_id, value=variantes.c.id))
+        )
+    if to_insert:
+        await db.execute(insert(variantes).values(to_insert))
+    return bool(to_insert)
+
+
+async def apply_stock_adjustments(db: AsyncSession, product_id: int, ajustes: List[product_schemas.VariantStockAdjustment]):
+    """
+    Aplica valores absolutos ('cantidad_en_stock') o relativos ('delta') por id de
+    variante en un solo UPDATE. Todas las variantes tienen que ser del producto y
+    ningún stock puede quedar negativo. No hace commit.
+    """
+    ids = [a.variant_id for a in ajustes]
+    if len(set(ids)) != len(ids):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Hay variantes repetidas en los ajustes.")
+
+    result = await db.execute(
+        select(VarianteProducto.id, VarianteProducto.cantidad_en_stock)
+        .where(VarianteProducto.producto_id == product_id, VarianteProducto.id.in_(ids))
+    )
+    current = dict(result.all())
+    missing = [i for i in ids if i not in current]
+    if missing:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Variantes no encontradas para el producto {product_id}: {missing}"
+        )
+
+    negative = [a.variant_id for a in ajustes if a.delta is not None and current[a.variant_id] + a.delta < 0]
+    if negative:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"El ajuste deja stock negativo en las variantes: {negative}"
+        )
+
+    variantes = VarianteProducto.__table__
+    absolutes = {a.variant_id: a.cantidad_en_stock for a in ajustes if a.delta is None}
+    deltas = {a.variant_id: a.delta for a in ajustes if a.delta is not None}
+    # Los deltas se suman sobre el valor de la base (no sobre el que leímos) para
+    # no pisar una compra que entre en el medio
+    new_value = variantes.c.cantidad_en_stock
+    if deltas:
+        new_value = variantes.c.cantidad_en_stock + case(deltas, value=variantes.c.id, else_=0)
+    if absolutes:
+        new_value = case(absolutes, value=variantes.c.id, else_=new_value)
+    await db.execute(update(variantes).where(variantes.c.id.in_(ids)).values(cantidad_en_stock=new_value))
+
+    if deltas:
+        # Las filas ya están bloqueadas por el UPDATE: si una compra se coló entre
+        # la lectura y el UPDATE, el chequeo de acá lo ve y el request hace rollback
+        result = await db.execute(select(variantes.c.id).where(variantes.c.id.in_(list(deltas)), variantes.c.cantidad_en_stock < 0))
+        negative = list(result.scalars().all())
+        if negative:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"El stock cambió mientras se aplicaba el ajuste y quedaría negativo en las variantes: {negative}"
+            )
+
+
+async def get_variant_matrix(db: AsyncSession, product_id: int) -> dict:
+    return build_variant_matrix(product_id, await _load_variants(db, product_id))
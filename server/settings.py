@@ -50,6 +50,42 @@ class Settings(BaseSettings):
     # --- Nombre de la tienda ---
     SITE_NAME: str
 
+    # =================================================================
+    #  CACHE DEL CATÁLOGO (en memoria, por proceso)
+    # =================================================================
+    CATALOG_CACHE_MAXSIZE: int = 2048
+    CATALOG_CACHE_TTL_SECONDS: int = 300
+    # Búsqueda en MySQL: igual a innodb_ft_min_token_size del servidor (los términos más cortos no se indexan)
+    SEARCH_MYSQL_MIN_TOKEN_SIZE: int = 3
+    # Autocompletado: cada cuánto se mira si el catálogo cambió desde otro proceso
+    # y cada cuánto se reconstruye el índice aunque no se haya detectado nada
+    SUGGEST_INDEX_CHECK_SECONDS: int = 60
+    SUGGEST_INDEX_MAX_AGE_SECONDS: int = 1800
+
+    # =================================================================
+    #  SUBIDA DE IMÁGENES
+    # =================================================================
+    UPLOAD_MAX_WORKERS: int = 4
+    UPLOAD_TIMEOUT_SECONDS: int = 30
+    # Topes de tamaño: por imagen, por pedido (todas las imágenes juntas) y
+    # a partir de cuánto se pasa el archivo de memoria a un temporal en disco
+    UPLOAD_MAX_FILE_BYTES: int = 10 * 1024 * 1024
+    UPLOAD_MAX_REQUEST_BYTES: int = 25 * 1024 * 1024
+    UPLOAD_SPOOL_THRESHOLD_BYTES: int = 1024 * 1024
+
+    # --- Derivados (miniaturas WebP) y dónde se guardan ---
+    # 'cloudinary' en producción, 'local' para desarrollo y tests (funciona sin internet)
+    IMAGE_STORAGE_BACKEND: str = "cloudinary"
+    MEDIA_ROOT: str = "media"
+    MEDIA_URL: str = "/media"
+    IMAGE_PROCESS_WORKERS: int = 2
+
+    # =================================================================
+    #  CARRITOS
+    # =================================================================
+    # Los carritos de invitados sin cambios en estos días los borra MongoDB (índice TTL)
+    GUEST_CART_TTL_DAYS: int = 30
+
     # Esto le dice a Pydantic que lea las variables de un archivo .env
     @staticmethod
     def get_env_file():
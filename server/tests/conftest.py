@@ -21,6 +21,8 @@ from database.database import get_db
 from database.models import Producto, Base, Categoria
 from database.database import get_db_nosql
 from utils.security import get_password_hash, create_access_token
+from services import search_service, suggest_service
+from services.catalog_cache import catalog_cache
 
 # --- Configuración del Event Loop para la sesión ---
 @pytest.fixture(scope="session")
@@ -41,6 +43,14 @@ class AsyncMongoMockCollection:
         return self._sync_collection.update_one(*args, **kwargs)
     async def delete_one(self, *args, **kwargs):
         return self._sync_collection.delete_one(*args, **kwargs)
+    async def find_one_and_update(self, *args, **kwargs):
+        return self._sync_collection.find_one_and_update(*args, **kwargs)
+    async def find_one_and_delete(self, *args, **kwargs):
+        return self._sync_collection.find_one_and_delete(*args, **kwargs)
+    async def create_index(self, *args, **kwargs):
+        return self._sync_collection.create_index(*args, **kwargs)
+    async def index_information(self, *args, **kwargs):
+        return self._sync_collection.index_information(*args, **kwargs)
     async def find(self, *args, **kwargs):
         return self._sync_collection.find(*args, **kwargs)
 
@@ -50,6 +60,8 @@ class AsyncMongoMock:
     def __getattr__(self, name):
         collection = getattr(self._sync_db, name)
         return AsyncMongoMockCollection(collection)
+    def __getitem__(self, name):
+        return AsyncMongoMockCollection(self._sync_db[name])
 
 # --- Fixtures de NoSQL (Mongo) ---
 @pytest_asyncio.fixture(scope="function")
@@ -102,6 +114,17 @@ async def override_get_db_sql(db_sql: AsyncSession):
     yield
     app.dependency_overrides.pop(get_db, None)
 
+# --- Índices y cache en memoria: cada test arranca con la base vacía ---
+@pytest.fixture(autouse=True)
+def reset_in_memory_indexes():
+    search_service.product_index.reset()
+    suggest_service.reset()
+    catalog_cache.reset()
+    yield
+    search_service.product_index.reset()
+    suggest_service.reset()
+    catalog_cache.reset()
+
 # --- Fixture de cliente HTTP (Respeta Lifespan) ---
 @pytest_asyncio.fixture(scope="function")
 async def client() -> AsyncClient:
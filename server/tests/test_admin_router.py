@@ -0,0 +1,31 @@
+import pytest
+from httpx import AsyncClient
+from fastapi import status
+from sqlalchemy.ext.asyncio import AsyncSession
+from database.models import Orden, DetalleOrden, Producto, VarianteProducto, Categoria
+
+
+@pytest.mark.asyncio
+async def test_get_sales_fast_path(admin_authenticated_client: AsyncClient, db_sql: AsyncSession, test_category: Categoria):
+    producto = Producto(nombre="Remera", precio=100, sku="ADM-1", stock=5, categoria_id=test_category.id)
+    producto.variantes = [VarianteProducto(tamanio="M", color="Negro", cantidad_en_stock=5)]
+    db_sql.add(producto)
+    await db_sql.flush()
+    orden = Orden(usuario_id="user-1", monto_total=200, estado="Completado", estado_pago="Aprobado")
+    orden.detalles = [DetalleOrden(variante_producto_id=producto.variantes[0].id, cantidad=2, precio_en_momento_compra=100)]
+    db_sql.add(orden)
+    await db_sql.commit()
+
+    response = await admin_authenticated_client.get("/api/admin/sales")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"] == "application/json"
+    data = response.json()
+    assert len(data) == 1
+    assert data[0]["monto_total"] == 200.0
+    assert data[0]["detalles"][0]["cantidad"] == 2
+
+
+@pytest.mark.asyncio
+async def test_get_sales_requires_admin(authenticated_client: AsyncClient):
+    response = await authenticated_client.get("/api/admin/sales")
+    assert response.status_code == status.HTTP_403_FORBIDDEN
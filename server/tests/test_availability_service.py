@@ -0,0 +1,74 @@
+# En tests/test_availability_service.py
+import pytest
+from httpx import AsyncClient
+from fastapi import status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.models import Categoria, DisponibilidadProducto, Producto, VarianteProducto
+from routers.checkout_router import save_order_and_update_stock
+from services import availability_service
+
+
+async def get_availability(db: AsyncSession, product_id: int) -> DisponibilidadProducto:
+    result = await db.execute(
+        select(DisponibilidadProducto)
+        .where(DisponibilidadProducto.producto_id == product_id)
+        .execution_options(populate_existing=True)
+    )
+    return result.scalar_one()
+
+
+@pytest.mark.asyncio
+async def test_checkout_updates_availability_in_the_same_transaction(db_sql: AsyncSession, test_category: Categoria):
+    producto = Producto(nombre="Disp", precio=10, sku="DISP-1", stock=999, categoria_id=test_category.id)
+    producto.variantes = [
+        VarianteProducto(tamanio="S", color="Negro", cantidad_en_stock=2),
+        VarianteProducto(tamanio="M", color="Blanco", cantidad_en_stock=1),
+    ]
+    db_sql.add(producto)
+    await db_sql.flush()
+    product_id = producto.id
+    variant_m = producto.variantes[1].id
+    await availability_service.refresh_availability(db_sql, [product_id])
+    await db_sql.commit()
+
+    disponibilidad = await get_availability(db_sql, product_id)
+    assert (disponibilidad.stock_total, disponibilidad.talles, disponibilidad.colores) == (3, ["S", "M"], ["Negro", "Blanco"])
+    # 'Producto.stock' queda sincronizado con la suma de las variantes
+    stock = (await db_sql.execute(select(Producto.stock).where(Producto.id == product_id))).scalar_one()
+    assert stock == 3
+
+    items = [{"id": variant_m, "quantity": 1, "unit_price": 10}]
+    await save_order_and_update_stock(db_sql, "u1", 10, "pago-disp-1", items, "mercadopago")
+
+    disponibilidad = await get_availability(db_sql, product_id)
+    assert (disponibilidad.stock_total, disponibilidad.talles, disponibilidad.colores) == (2, ["S"], ["Negro"])
+
+
+@pytest.mark.asyncio
+async def test_in_stock_only_filter(admin_authenticated_client: AsyncClient, db_sql: AsyncSession, test_category: Categoria):
+    categoria_id = test_category.id
+    productos = []
+    for i, cantidad in enumerate([0, 4]):
+        producto = Producto(nombre=f"Filtro {i}", precio=10, sku=f"FS-{i}", stock=0, categoria_id=categoria_id)
+        producto.variantes = [VarianteProducto(tamanio="M", color="Negro", cantidad_en_stock=cantidad)]
+        productos.append(producto)
+    db_sql.add_all(productos)
+    await db_sql.flush()
+    agotado, con_stock = [p.id for p in productos]
+    await availability_service.refresh_availability(db_sql, [agotado, con_stock])
+    await db_sql.commit()
+
+    response = await admin_authenticated_client.get("/api/products/", params={"in_stock_only": "true"})
+    assert [p["id"] for p in response.json()] == [con_stock]
+    response = await admin_authenticated_client.get("/api/products/")
+    assert len(response.json()) == 2
+
+    # Reponer stock con el endpoint de variantes actualiza el agregado y el listado
+    body = {"matriz": {"M": {"Negro": 3}}}
+    response = await admin_authenticated_client.put(f"/api/products/{agotado}/variants/bulk", json=body)
+    assert response.status_code == status.HTTP_200_OK
+    response = await admin_authenticated_client.get("/api/products/", params={"in_stock_only": "true"})
+    assert sorted(p["id"] for p in response.json()) == sorted([agotado, con_stock])
+    assert next(p for p in response.json() if p["id"] == agotado)["stock"] == 3
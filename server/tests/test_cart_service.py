@@ -0,0 +1,338 @@
+# En tests/test_cart_service.py
+import pytest
+import pytest_asyncio
+from httpx import AsyncClient
+from sqlalchemy import event, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.models import Categoria, Producto, VarianteProducto
+from services import cart_service, catalog_cache
+
+GUEST = {"guest_session_id": "invitado-1"}
+
+
+def make_item(variante_id: int, quantity: int = 1, **extra) -> dict:
+    return {
+        "variante_id": variante_id, "quantity": quantity, "price": 10.0,
+        "name": f"Producto {variante_id}", "image_url": None, "size": "M", **extra
+    }
+
+
+class CountingCollection:
+    """Cuenta los viajes a Mongo que hace el router."""
+
+    def __init__(self, collection):
+        self._collection = collection
+        self.calls = []
+
+    def __getattr__(self, name):
+        method = getattr(self._collection, name)
+
+        async def wrapper(*args, **kwargs):
+            self.calls.append(name)
+            return await method(*args, **kwargs)
+        return wrapper
+
+
+@pytest.mark.asyncio
+async def test_add_creates_cart_and_increments_same_line(db_nosql):
+    cart = await cart_service.apply_cart_mutation(db_nosql.carts, GUEST, cart_service.add_item(make_item(5, 2)))
+    assert cart["guest_session_id"] == "invitado-1"
+    assert [(i["variante_id"], i["quantity"]) for i in cart["items"]] == [(5, 2)]
+
+    cart = await cart_service.apply_cart_mutation(db_nosql.carts, GUEST, cart_service.add_item(make_item(5, 3)))
+    cart = await cart_service.apply_cart_mutation(db_nosql.carts, GUEST, cart_service.add_item(make_item(7)))
+    # Nunca dos líneas para la misma variante
+    assert [(i["variante_id"], i["quantity"]) for i in cart["items"]] == [(5, 5), (7, 1)]
+    assert cart["items"][0]["name"] == "Producto 5"
+
+
+@pytest.mark.asyncio
+async def test_item_values_are_not_evaluated_as_expressions(db_nosql):
+    item = make_item(1, name="$items", image_url="$$ROOT")
+    cart = await cart_service.apply_cart_mutation(db_nosql.carts, GUEST, cart_service.add_item(item))
+    assert cart["items"][0]["name"] == "$items"
+    assert cart["items"][0]["image_url"] == "$$ROOT"
+
+
+@pytest.mark.asyncio
+async def test_set_increment_and_remove(db_nosql):
+    stages = cart_service.add_item(make_item(1, 2)) + cart_service.add_item(make_item(2, 1))
+    await cart_service.apply_cart_mutation(db_nosql.carts, GUEST, stages)
+
+    cart = await cart_service.apply_cart_mutation(db_nosql.carts, GUEST, cart_service.set_item_quantity(1, 10))
+    assert [(i["variante_id"], i["quantity"]) for i in cart["items"]] == [(1, 10), (2, 1)]
+
+    # Sin 'item' no se agrega una variante que no estaba
+    cart = await cart_service.apply_cart_mutation(db_nosql.carts, GUEST, cart_service.set_item_quantity(9, 3))
+    assert [i["variante_id"] for i in cart["items"]] == [1, 2]
+    cart = await cart_service.apply_cart_mutation(
+        db_nosql.carts, GUEST, cart_service.set_item_quantity(9, 3, make_item(9))
+    )
+    assert cart["items"][-1]["quantity"] == 3
+
+    cart = await cart_service.apply_cart_mutation(db_nosql.carts, GUEST, cart_service.increment_item(1, -4))
+    assert cart["items"][0]["quantity"] == 6
+    # Bajar a 0 (o menos) saca la línea
+    cart = await cart_service.apply_cart_mutation(db_nosql.carts, GUEST, cart_service.increment_item(2, -1))
+    assert [i["variante_id"] for i in cart["items"]] == [1, 9]
+    cart = await cart_service.apply_cart_mutation(db_nosql.carts, GUEST, cart_service.set_item_quantity(9, 0))
+    cart = await cart_service.apply_cart_mutation(db_nosql.carts, GUEST, cart_service.remove_item(1))
+    assert cart["items"] == []
+
+
+@pytest.mark.asyncio
+async def test_mutation_without_upsert_on_missing_cart(db_nosql):
+    cart = await cart_service.apply_cart_mutation(db_nosql.carts, GUEST, cart_service.remove_item(1), upsert=False)
+    assert cart is None
+    assert await db_nosql.carts.find_one(GUEST) is None
+
+
+@pytest.mark.asyncio
+async def test_router_mutations_are_one_round_trip(client: AsyncClient, db_nosql, monkeypatch):
+    counting = CountingCollection(db_nosql.carts)
+    monkeypatch.setattr(type(db_nosql), "__getattr__", lambda self, name: counting)
+    headers = {"X-Guest-Session-ID": "invitado-2"}
+
+    response = await client.post("/api/cart/items", json=make_item(3, 2), headers=headers)
+    assert response.status_code == 200
+    assert response.json()["items"][0]["quantity"] == 2
+    response = await client.post("/api/cart/items", json=make_item(3, 1), headers=headers)
+    assert response.json()["items"][0]["quantity"] == 3
+    response = await client.put("/api/cart/items/3", json={"quantity": 7}, headers=headers)
+    assert response.json()["items"][0]["quantity"] == 7
+    response = await client.delete("/api/cart/items/3", headers=headers)
+    assert response.json()["items"] == []
+
+    assert counting.calls == ["find_one_and_update"] * 4
+
+
+@pytest.mark.asyncio
+async def test_router_missing_cart_returns_404(client: AsyncClient):
+    headers = {"X-Guest-Session-ID": "sin-carrito"}
+    response = await client.delete("/api/cart/items/3", headers=headers)
+    assert response.status_code == 404
+    response = await client.put("/api/cart/items/3", json={"quantity": 2}, headers=headers)
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_bulk_patch_applies_all_operations_in_one_update(client: AsyncClient, db_nosql, monkeypatch):
+    headers = {"X-Guest-Session-ID": "invitado-3"}
+    for variante_id in (1, 2, 3):
+        await client.post("/api/cart/items", json=make_item(variante_id, 2), headers=headers)
+
+    counting = CountingCollection(db_nosql.carts)
+    monkeypatch.setattr(type(db_nosql), "__getattr__", lambda self, name: counting)
+    operations = [
+        {"variante_id": 1, "quantity": 5},
+        {"variante_id": 2, "op": "increment", "quantity": -2},
+        {"variante_id": 3, "op": "increment", "quantity": 4},
+        {"variante_id": 3, "op": "increment", "quantity": -1},
+        {"variante_id": 99, "op": "remove"},
+    ]
+    response = await client.patch("/api/cart/items", json=operations, headers=headers)
+
+    assert response.status_code == 200
+    assert [(i["variante_id"], i["quantity"]) for i in response.json()["items"]] == [(1, 5), (3, 5)]
+    assert counting.calls == ["find_one_and_update"]
+
+
+@pytest.mark.asyncio
+async def test_bulk_patch_validation(client: AsyncClient):
+    headers = {"X-Guest-Session-ID": "invitado-4"}
+    await client.post("/api/cart/items", json=make_item(1), headers=headers)
+
+    for operations in (
+        [],
+        [{"variante_id": 1}],
+        [{"variante_id": 1, "quantity": -1}],
+        [{"variante_id": 1, "op": "increment", "quantity": 0}],
+        [{"variante_id": 1, "op": "duplicar", "quantity": 1}],
+        [{"variante_id": 1, "quantity": 1}] * 101,
+    ):
+        response = await client.patch("/api/cart/items", json=operations, headers=headers)
+        assert response.status_code == 422
+
+    response = await client.patch("/api/cart/items", json=[{"variante_id": 1, "quantity": 1}], headers={"X-Guest-Session-ID": "otro"})
+    assert response.status_code == 404
+
+
+# --- Vista conciliada ---
+@pytest_asyncio.fixture
+async def cart_products(db_sql: AsyncSession, test_category: Categoria):
+    remera = Producto(nombre="Remera", precio=20, sku="CART-1", stock=0, categoria_id=test_category.id)
+    remera.variantes = [
+        VarianteProducto(tamanio="M", color="Negro", cantidad_en_stock=5),
+        VarianteProducto(tamanio="L", color="Negro", cantidad_en_stock=1),
+    ]
+    buzo = Producto(nombre="Buzo", precio=50, sku="CART-2", stock=0, categoria_id=test_category.id)
+    buzo.variantes = [VarianteProducto(tamanio="S", color="Gris", cantidad_en_stock=0)]
+    db_sql.add_all([remera, buzo])
+    await db_sql.flush()
+    ids = {"remera": remera.id, "m": remera.variantes[0].id, "l": remera.variantes[1].id, "buzo_s": buzo.variantes[0].id}
+    await db_sql.commit()
+    return ids
+
+
+class QueryCounter:
+    def __init__(self, engine):
+        self.engine = engine.sync_engine
+        self.statements = []
+
+    def _on_execute(self, conn, cursor, statement, *args):
+        self.statements.append(statement)
+
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self._on_execute)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, "before_cursor_execute", self._on_execute)
+
+
+@pytest.mark.asyncio
+async def test_reconciled_cart_flags_price_stock_and_missing(client: AsyncClient, db_sql: AsyncSession, cart_products: dict):
+    headers = {"X-Guest-Session-ID": "invitado-5"}
+    operations = [
+        make_item(cart_products["m"], 2, price=20.0),  # al día
+        make_item(cart_products["l"], 3, price=18.0),  # precio viejo y poco stock
+        make_item(cart_products["buzo_s"], 1, price=50.0),  # agotado
+        make_item(999999, 1),  # la variante ya no existe
+    ]
+    for item in operations:
+        await client.post("/api/cart/items", json=item, headers=headers)
+
+    plain = await client.get("/api/cart/", headers=headers)
+    assert "requiere_revision" not in plain.json()
+    assert "disponible" not in plain.json()["items"][0]
+
+    with QueryCounter(db_sql.bind) as counter:
+        response = await client.get("/api/cart/?reconcile=true", headers=headers)
+    assert response.status_code == 200
+    assert len(counter.statements) == 1
+    data = response.json()
+    lines = {item["variante_id"]: item for item in data["items"]}
+
+    assert lines[cart_products["m"]]["disponible"] and not lines[cart_products["m"]]["precio_cambio"]
+    assert lines[cart_products["l"]]["precio_cambio"] and lines[cart_products["l"]]["precio_actual"] == 20.0
+    assert not lines[cart_products["l"]]["disponible"] and lines[cart_products["l"]]["stock_disponible"] == 1
+    assert not lines[cart_products["buzo_s"]]["disponible"]
+    assert lines[999999]["existe"] is False
+    assert data["total"] == 20.0 * 2 + 20.0 * 3 + 50.0
+    assert data["requiere_revision"] is True
+
+    # Con el cache caliente no hay consultas
+    with QueryCounter(db_sql.bind) as counter:
+        again = await client.get("/api/cart/?reconcile=true", headers=headers)
+    assert again.json() == data
+    assert counter.statements == []
+
+
+@pytest.mark.asyncio
+async def test_reconciled_snapshot_is_invalidated_with_the_product(db_sql: AsyncSession, cart_products: dict):
+    cart = {"items": [make_item(cart_products["m"], 1, price=20.0)]}
+    first = await cart_service.reconcile_cart(db_sql, cart)
+    assert first["items"][0]["stock_disponible"] == 5
+
+    await db_sql.execute(
+        update(VarianteProducto).where(VarianteProducto.id == cart_products["m"]).values(cantidad_en_stock=0)
+    )
+    await db_sql.commit()
+    catalog_cache.invalidate_stock([cart_products["remera"]])
+
+    second = await cart_service.reconcile_cart(db_sql, cart)
+    assert second["items"][0]["stock_disponible"] == 0
+    assert second["requiere_revision"] is True
+
+
+@pytest.mark.asyncio
+async def test_merge_guest_cart_sums_lines_and_is_idempotent(db_nosql):
+    user = {"user_id": "usuario-1"}
+    await cart_service.apply_cart_mutation(db_nosql.carts, user, cart_service.add_item(make_item(1, 2)))
+    await cart_service.apply_cart_mutation(
+        db_nosql.carts, GUEST, cart_service.add_item(make_item(1, 3)) + cart_service.add_item(make_item(2, 1))
+    )
+
+    cart = await cart_service.merge_guest_cart(db_nosql.carts, "invitado-1", "usuario-1")
+    assert [(i["variante_id"], i["quantity"]) for i in cart["items"]] == [(1, 5), (2, 1)]
+    assert await db_nosql.carts.find_one(GUEST) is None
+
+    # El login reintenta: no hay nada que mezclar y las cantidades no se duplican
+    assert await cart_service.merge_guest_cart(db_nosql.carts, "invitado-1", "usuario-1") is None
+    cart = await db_nosql.carts.find_one(user)
+    assert [(i["variante_id"], i["quantity"]) for i in cart["items"]] == [(1, 5), (2, 1)]
+
+
+@pytest.mark.asyncio
+async def test_merge_guest_cart_without_user_cart_or_guest_items(db_nosql):
+    await cart_service.apply_cart_mutation(db_nosql.carts, GUEST, cart_service.add_item(make_item(4, 2)))
+    cart = await cart_service.merge_guest_cart(db_nosql.carts, "invitado-1", "usuario-2")
+    assert cart["user_id"] == "usuario-2"
+    assert "guest_session_id" not in cart
+    assert [(i["variante_id"], i["quantity"]) for i in cart["items"]] == [(4, 2)]
+
+    # Un carrito de invitado vacío se deja como está (lo limpia el TTL)
+    await db_nosql.carts.insert_one({"guest_session_id": "invitado-3", "items": []})
+    assert await cart_service.merge_guest_cart(db_nosql.carts, "invitado-3", "usuario-2") is None
+    assert await db_nosql.carts.find_one({"guest_session_id": "invitado-3"}) is not None
+
+
+@pytest.mark.asyncio
+async def test_merge_guest_cart_restores_guest_cart_if_update_fails(db_nosql, monkeypatch):
+    await cart_service.apply_cart_mutation(db_nosql.carts, GUEST, cart_service.add_item(make_item(6, 1)))
+
+    async def failing_mutation(*args, **kwargs):
+        raise RuntimeError("Mongo no responde")
+    monkeypatch.setattr(cart_service, "apply_cart_mutation", failing_mutation)
+
+    with pytest.raises(RuntimeError):
+        await cart_service.merge_guest_cart(db_nosql.carts, "invitado-1", "usuario-3")
+    guest_cart = await db_nosql.carts.find_one(GUEST)
+    assert [(i["variante_id"], i["quantity"]) for i in guest_cart["items"]] == [(6, 1)]
+
+
+@pytest.mark.asyncio
+async def test_merge_guest_cart_retry_after_ambiguous_failure_does_not_double(db_nosql, monkeypatch):
+    await cart_service.apply_cart_mutation(db_nosql.carts, GUEST, cart_service.add_item(make_item(6, 1)))
+    original = cart_service.apply_cart_mutation
+
+    # El update se aplica pero la respuesta se pierde (timeout de red)
+    async def applied_then_timeout(*args, **kwargs):
+        await original(*args, **kwargs)
+        raise RuntimeError("timeout esperando la respuesta")
+    monkeypatch.setattr(cart_service, "apply_cart_mutation", applied_then_timeout)
+    with pytest.raises(RuntimeError):
+        await cart_service.merge_guest_cart(db_nosql.carts, "invitado-1", "usuario-4")
+    assert await db_nosql.carts.find_one(GUEST) is not None
+
+    monkeypatch.setattr(cart_service, "apply_cart_mutation", original)
+    cart = await cart_service.merge_guest_cart(db_nosql.carts, "invitado-1", "usuario-4")
+    assert [(i["variante_id"], i["quantity"]) for i in cart["items"]] == [(6, 1)]
+    assert await db_nosql.carts.find_one(GUEST) is None
+
+    # Un carrito nuevo del mismo invitado sí se suma
+    await cart_service.apply_cart_mutation(db_nosql.carts, GUEST, cart_service.add_item(make_item(6, 2)))
+    cart = await cart_service.merge_guest_cart(db_nosql.carts, "invitado-1", "usuario-4")
+    assert [(i["variante_id"], i["quantity"]) for i in cart["items"]] == [(6, 3)]
+
+
+@pytest.mark.asyncio
+async def test_merge_endpoint_uses_two_round_trips(authenticated_client: AsyncClient, db_nosql, test_user: dict, monkeypatch):
+    await cart_service.apply_cart_mutation(db_nosql.carts, GUEST, cart_service.add_item(make_item(8, 2)))
+    counting = CountingCollection(db_nosql.carts)
+    original_getattr = type(db_nosql).__getattr__
+    monkeypatch.setattr(
+        type(db_nosql), "__getattr__",
+        lambda self, name: counting if name == "carts" else original_getattr(self, name)
+    )
+
+    response = await authenticated_client.post("/api/auth/merge-cart", json={"guest_session_id": "invitado-1"})
+    assert response.status_code == 200
+    assert response.json() == {"message": "Carts merged successfully."}
+    assert counting.calls == ["find_one_and_delete", "find_one_and_update"]
+
+    response = await authenticated_client.post("/api/auth/merge-cart", json={"guest_session_id": "invitado-1"})
+    assert response.json() == {"message": "No guest cart to merge."}
+    cart = await db_nosql.carts.find_one({"user_id": test_user["_id"]})
+    assert [(i["variante_id"], i["quantity"]) for i in cart["items"]] == [(8, 2)]
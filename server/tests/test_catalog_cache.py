@@ -0,0 +1,39 @@
+import time
+
+from services.catalog_cache import LRUTTLCache
+
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUTTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.stats()["evictions"] == 1
+
+
+def test_entries_expire_after_ttl():
+    cache = LRUTTLCache(maxsize=10, ttl=0.01)
+    cache.set("a", 1)
+    time.sleep(0.02)
+    assert cache.get("a") is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_invalidate_by_tag_only_drops_tagged_entries():
+    cache = LRUTTLCache(maxsize=10, ttl=60)
+    cache.set(("detail", 1), "p1", tags=["product:1"])
+    cache.set(("list", "todos"), "lista", tags=["lists", "product:1", "product:2"])
+    cache.set(("detail", 2), "p2", tags=["product:2"])
+
+    cache.invalidate_tags("product:1")
+
+    assert cache.get(("detail", 1)) is None
+    assert cache.get(("list", "todos")) is None
+    assert cache.get(("detail", 2)) == "p2"
+    stats = cache.stats()
+    assert stats["invalidations"] == 2
+    assert stats["hits"] == 1 and stats["misses"] == 2
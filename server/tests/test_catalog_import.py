@@ -0,0 +1,116 @@
+# En tests/test_catalog_import.py
+import io
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.models import Categoria, Producto, VarianteProducto
+from services import catalog_import
+
+
+CSV = """sku,nombre,precio,categoria,stock,urls_imagenes,variantes
+CSV-1,Remera Lisa,1000,{categoria},,a.jpg|b.jpg,S:Negro:5|M:Negro:3
+CSV-2,Buzo,2000,{categoria},7,,
+CSV-3,Campera,3000,Inexistente,1,,
+CSV-4,Jean,4000,{categoria},1,,S-Negro-5
+CSV-5,Short,500,{categoria},2,,
+"""
+
+
+@pytest.mark.asyncio
+async def test_import_csv_in_small_batches(db_sql: AsyncSession, test_category: Categoria):
+    nombre_categoria = test_category.nombre
+    data = CSV.format(categoria=nombre_categoria).encode("utf-8")
+
+    report = await catalog_import.import_catalog(db_sql, io.BytesIO(data), "csv", batch_size=2)
+    assert report["filas"] == 5
+    assert report["creados"] == 3
+    assert [e["fila"] for e in report["errores"]] == [4, 5]
+
+    producto = (await db_sql.execute(select(Producto).where(Producto.sku == "CSV-1"))).scalar_one()
+    assert producto.stock == 8
+    assert producto.urls_imagenes == ["a.jpg", "b.jpg"]
+
+    # Reimportar actualiza por SKU: no duplica productos ni variantes
+    data = "sku,nombre,precio,categoria,variantes\nCSV-1,Remera Lisa,1200,{0},S:Negro:1|L:Negro:2\n".format(nombre_categoria)
+    report = await catalog_import.import_catalog(db_sql, io.BytesIO(data.encode("utf-8")), "csv")
+    assert (report["creados"], report["actualizados"]) == (0, 1)
+    assert (report["variantes_creadas"], report["variantes_actualizadas"]) == (1, 1)
+
+    db_sql.expire_all()
+    variantes = (await db_sql.execute(
+        select(VarianteProducto.tamanio, VarianteProducto.cantidad_en_stock)
+        .join(Producto).where(Producto.sku == "CSV-1").order_by(VarianteProducto.tamanio)
+    )).all()
+    assert [tuple(v) for v in variantes] == [("L", 2), ("M", 3), ("S", 1)]
+
+
+@pytest.mark.asyncio
+async def test_import_reports_duplicated_sku_in_batch(db_sql: AsyncSession, test_category: Categoria):
+    categoria_id = test_category.id
+    data = (
+        f'{{"sku": "D-1", "nombre": "A", "precio": 1, "stock": 1, "categoria_id": {categoria_id}}}\n'
+        f'{{"sku": "D-1", "nombre": "B", "precio": 1, "stock": 1, "categoria_id": {categoria_id}}}\n'
+        '[1, 2]\n'
+    )
+    report = await catalog_import.import_catalog(db_sql, io.BytesIO(data.encode("utf-8")), "jsonl")
+    assert report["creados"] == 1
+    assert [e["fila"] for e in report["errores"]] == [2, 3]
+
+
+@pytest.mark.asyncio
+async def test_import_rejects_rows_with_repeated_variants(db_sql: AsyncSession, test_category: Categoria):
+    data = "sku,nombre,precio,categoria,variantes\nV-1,Remera,1,{0},S:Negro:5|S:Negro:3\nV-2,Buzo,1,{0},S:Negro:5\n"
+    data = data.format(test_category.nombre)
+    report = await catalog_import.import_catalog(db_sql, io.BytesIO(data.encode("utf-8")), "csv")
+    assert report["creados"] == 1
+    assert [(e["fila"], e["sku"]) for e in report["errores"]] == [(2, "V-1")]
+    assert "S/Negro" in report["errores"][0]["error"]
+    assert (await db_sql.execute(select(Producto).where(Producto.sku == "V-1"))).first() is None
+
+
+@pytest.mark.asyncio
+async def test_import_stops_cleanly_on_unreadable_files(db_sql: AsyncSession, test_category: Categoria):
+    nombre_categoria, categoria_id = test_category.nombre, test_category.id
+    # Un byte que no es UTF-8 en la fila 3: las anteriores quedan importadas y se reporta dónde cortó
+    data = "sku,nombre,precio,categoria\nU-1,Remera,1,{0}\n".format(nombre_categoria).encode("utf-8")
+    data += b"U-2,Camis\xe9ta,1," + nombre_categoria.encode("utf-8") + b"\nU-3,Buzo,1,x\n"
+    report = await catalog_import.import_catalog(db_sql, io.BytesIO(data), "csv")
+    assert report["creados"] == 1
+    assert [e["fila"] for e in report["errores"]] == [3]
+    assert "UTF-8" in report["errores"][0]["error"]
+
+    data = '{"sku": "U-4", "nombre": "Gorra", "precio": 1, "stock": 1, "categoria_id": %d}\n' % categoria_id
+    report = await catalog_import.import_catalog(db_sql, io.BytesIO(data.encode("utf-8") + b"\xff\n"), "jsonl")
+    assert report["creados"] == 1
+    assert [e["fila"] for e in report["errores"]] == [2]
+
+    # Un error del lector de CSV (acá, un campo más grande que el límite del módulo csv)
+    data = "sku,nombre,precio,categoria\nU-5,Short,1,{0}\nU-6,{1},1,{0}\n".format(nombre_categoria, "x" * 200_000)
+    report = await catalog_import.import_catalog(db_sql, io.BytesIO(data.encode("utf-8")), "csv")
+    assert report["creados"] == 1
+    assert [e["fila"] for e in report["errores"]] == [3]
+    assert "CSV inválido" in report["errores"][0]["error"]
+
+
+@pytest.mark.asyncio
+async def test_failed_batch_only_reports_the_failing_rows(db_sql: AsyncSession, test_category: Categoria, monkeypatch):
+    original = catalog_import._upsert_statement
+
+    def upsert_failing_on_bad_sku(dialect_name, rows):
+        if any(row["sku"] == "B-3" for row in rows):
+            raise RuntimeError("la base rechazó la fila")
+        return original(dialect_name, rows)
+    monkeypatch.setattr(catalog_import, "_upsert_statement", upsert_failing_on_bad_sku)
+
+    categoria_id = test_category.id
+    data = "".join(
+        f'{{"sku": "B-{i}", "nombre": "P{i}", "precio": 1, "stock": 1, "categoria_id": {categoria_id}}}\n'
+        for i in range(1, 7)
+    )
+    report = await catalog_import.import_catalog(db_sql, io.BytesIO(data.encode("utf-8")), "jsonl")
+    assert report["creados"] == 5
+    assert [(e["fila"], e["sku"]) for e in report["errores"]] == [(3, "B-3")]
+    skus = (await db_sql.execute(select(Producto.sku).order_by(Producto.sku))).scalars().all()
+    assert skus == ["B-1", "B-2", "B-4", "B-5", "B-6"]
@@ -0,0 +1,52 @@
+import pytest
+from httpx import AsyncClient
+from fastapi import status
+from sqlalchemy.ext.asyncio import AsyncSession
+from database.models import Categoria, Producto, VarianteProducto
+from services import availability_service
+
+
+@pytest.mark.asyncio
+async def test_get_categories_with_etag(client: AsyncClient, test_category: Categoria):
+    response = await client.get("/api/categories/")
+    assert response.status_code == status.HTTP_200_OK
+    assert [c["nombre"] for c in response.json()] == ["Ropa de Prueba Para Crear"]
+
+    response = await client.get("/api/categories/", headers={"If-None-Match": response.headers["ETag"]})
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+
+@pytest.mark.asyncio
+async def test_get_categories_with_stats(admin_authenticated_client: AsyncClient, db_sql: AsyncSession, test_category: Categoria):
+    categoria_id = test_category.id
+    vacia = Categoria(nombre="Categoria Vacia")
+    db_sql.add(vacia)
+    productos = []
+    for i, (precio, cantidad) in enumerate([(100, 0), (250, 3)]):
+        producto = Producto(nombre=f"Cat {i}", precio=precio, sku=f"CAT-{i}", stock=0, categoria_id=categoria_id)
+        producto.variantes = [VarianteProducto(tamanio="M", color="Negro", cantidad_en_stock=cantidad)]
+        productos.append(producto)
+    db_sql.add_all(productos)
+    await db_sql.flush()
+    agotado = productos[0].id
+    await availability_service.refresh_availability(db_sql, [p.id for p in productos])
+    await db_sql.commit()
+
+    response = await admin_authenticated_client.get("/api/categories/", params={"include_stats": "true"})
+    assert response.status_code == status.HTTP_200_OK
+    stats = {c["nombre"]: c for c in response.json()}
+    assert stats["Categoria Vacia"]["total_productos"] == 0
+    assert stats["Categoria Vacia"]["precio_min"] is None
+    ropa = stats["Ropa de Prueba Para Crear"]
+    assert (ropa["total_productos"], ropa["productos_en_stock"]) == (2, 1)
+    assert (ropa["precio_min"], ropa["precio_max"]) == (100, 250)
+
+    # El listado simple no cambia de forma
+    response = await admin_authenticated_client.get("/api/categories/")
+    assert "total_productos" not in response.json()[0]
+
+    # Reponer el producto agotado invalida las estadísticas cacheadas
+    await admin_authenticated_client.put(f"/api/products/{agotado}/variants/bulk", json={"matriz": {"M": {"Negro": 1}}})
+    response = await admin_authenticated_client.get("/api/categories/", params={"include_stats": "true"})
+    ropa = next(c for c in response.json() if c["id"] == categoria_id)
+    assert ropa["productos_en_stock"] == 2
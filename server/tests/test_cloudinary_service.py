@@ -0,0 +1,113 @@
+# En tests/test_cloudinary_service.py
+import asyncio
+import io
+import threading
+import time
+
+import pytest
+
+from services import cloudinary_service
+
+UPLOAD_DELAY = 0.3
+
+
+def make_file(data: bytes = b"imagen"):
+    return io.BytesIO(data)
+
+
+@pytest.fixture
+def fake_cloudinary(monkeypatch):
+    """Reemplaza el SDK por funciones que tardan como una subida real."""
+    calls = {"upload": [], "destroy": [], "threads": set()}
+
+    def upload_large(file, folder, public_id, resource_type, overwrite, chunk_size, timeout):
+        calls["threads"].add(threading.current_thread().name)
+        time.sleep(UPLOAD_DELAY)
+        data = file.read()
+        if data == b"falla":
+            raise RuntimeError("archivo rechazado")
+        if data == b"lento":
+            time.sleep(1)
+        calls["upload"].append(public_id)
+        return {
+            "public_id": f"{folder}/{public_id}",
+            "secure_url": f"https://res.cloudinary.com/demo/image/upload/v1/{folder}/{public_id}.jpg",
+        }
+
+    def destroy(public_id, resource_type, timeout):
+        time.sleep(UPLOAD_DELAY)
+        calls["destroy"].append(public_id)
+        return {"result": "ok"}
+
+    monkeypatch.setattr(cloudinary_service.cloudinary.uploader, "upload_large", upload_large)
+    monkeypatch.setattr(cloudinary_service.cloudinary.uploader, "destroy", destroy)
+    return calls
+
+
+@pytest.mark.asyncio
+async def test_uploads_run_concurrently(fake_cloudinary):
+    start = time.perf_counter()
+    urls = await asyncio.gather(*[cloudinary_service.upload_stream(make_file(), f"foto{i}") for i in range(3)])
+    elapsed = time.perf_counter() - start
+
+    assert len(urls) == 3
+    assert all(url.startswith("https://") for url in urls)
+    # 3 subidas tardan lo mismo que una (con margen), no la suma
+    assert elapsed < UPLOAD_DELAY * 2
+    assert all(name.startswith("cloudinary") for name in fake_cloudinary["threads"])
+
+
+@pytest.mark.asyncio
+async def test_uploads_do_not_block_the_event_loop(fake_cloudinary):
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.01)
+            ticks += 1
+
+    task = asyncio.create_task(ticker())
+    await cloudinary_service.upload_stream(make_file(), "a")
+    task.cancel()
+    assert ticks > 5
+
+
+@pytest.mark.asyncio
+async def test_upload_failure_is_raised(fake_cloudinary):
+    with pytest.raises(RuntimeError, match="archivo rechazado"):
+        await cloudinary_service.upload_stream(make_file(b"falla"), "mala")
+    assert fake_cloudinary["upload"] == []
+
+
+@pytest.mark.asyncio
+async def test_upload_timeout_destroys_the_late_upload(fake_cloudinary, monkeypatch):
+    monkeypatch.setattr(cloudinary_service, "UPLOAD_TIMEOUT_SECONDS", 0.5)
+
+    with pytest.raises(asyncio.TimeoutError):
+        await cloudinary_service.upload_stream(make_file(b"lento"), "lenta")
+
+    # La subida termina igual en su thread: se borra apenas termina, no queda huérfana
+    assert fake_cloudinary["destroy"] == []
+    await asyncio.sleep(1.5)
+    assert fake_cloudinary["upload"] == ["lenta"]
+    assert fake_cloudinary["destroy"] == [f"{cloudinary_service.CLOUDINARY_FOLDER}/lenta"]
+
+
+@pytest.mark.asyncio
+async def test_delete_images_concurrently_and_reports_failures(fake_cloudinary):
+    folder = cloudinary_service.CLOUDINARY_FOLDER
+    urls = [
+        f"https://res.cloudinary.com/demo/image/upload/v1/{folder}/abc.jpg",
+        f"https://res.cloudinary.com/demo/image/upload/v1/{folder}/def.png",
+        "https://otro.cdn.com/imagen.jpg",
+    ]
+
+    start = time.perf_counter()
+    report = await cloudinary_service.delete_images(urls)
+    elapsed = time.perf_counter() - start
+
+    assert sorted(fake_cloudinary["destroy"]) == [f"{folder}/abc", f"{folder}/def"]
+    assert report["eliminadas"] == urls[:2]
+    assert [e["url"] for e in report["errores"]] == [urls[2]]
+    assert elapsed < UPLOAD_DELAY * 2
@@ -0,0 +1,161 @@
+# En tests/test_image_service.py
+import io
+import os
+
+import pytest
+from fastapi import HTTPException, UploadFile
+from httpx import AsyncClient
+from PIL import Image
+
+from database.models import Categoria
+from services import image_service, storage_service
+
+BASE_URL = "http://test/media"
+
+
+def make_image_bytes(width: int, height: int, fmt: str = "JPEG") -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), (200, 30, 30)).save(buffer, format=fmt)
+    return buffer.getvalue()
+
+
+def make_upload(name: str, data: bytes) -> UploadFile:
+    return UploadFile(file=io.BytesIO(data), filename=name)
+
+
+@pytest.fixture
+def local_storage(tmp_path):
+    storage = storage_service.LocalStorage(str(tmp_path), BASE_URL)
+    storage_service.set_storage(storage)
+    yield storage
+    storage_service.set_storage(None)
+
+
+def stored_files(root) -> list:
+    return sorted(os.path.relpath(os.path.join(d, f), root) for d, _, files in os.walk(root) for f in files)
+
+
+def test_render_derivatives_resizes_to_webp():
+    rendered = image_service.render_derivatives(make_image_bytes(2400, 1200))
+    assert rendered["extension"] == "jpg"
+    assert rendered["content_type"] == "image/jpeg"
+
+    sizes = {}
+    for name, data in rendered["derivados"].items():
+        with Image.open(io.BytesIO(data)) as img:
+            assert img.format == "WEBP"
+            sizes[name] = img.size
+    assert sizes == {"grande": (1600, 800), "mediana": (800, 400), "miniatura": (320, 160)}
+
+
+def test_render_derivatives_never_upscales_and_keeps_alpha():
+    buffer = io.BytesIO()
+    Image.new("RGBA", (200, 100), (0, 0, 0, 0)).save(buffer, format="PNG")
+    rendered = image_service.render_derivatives(buffer.getvalue())
+    with Image.open(io.BytesIO(rendered["derivados"]["grande"])) as img:
+        assert img.size == (200, 100)
+        assert img.mode == "RGBA"
+
+
+def test_render_derivatives_rejects_non_images():
+    with pytest.raises(image_service.InvalidImageError):
+        image_service.render_derivatives(b"esto no es una imagen")
+
+
+@pytest.mark.asyncio
+async def test_process_uploads_stores_original_and_derivatives(local_storage, tmp_path):
+    files = [make_upload("a.jpg", make_image_bytes(1000, 1000)), make_upload("b.png", make_image_bytes(500, 500, "PNG"))]
+
+    image_sets = await image_service.process_uploads(files)
+
+    assert [set(s) for s in image_sets] == [{"original", "grande", "mediana", "miniatura"}] * 2
+    assert image_sets[0]["original"].endswith("/original.jpg")
+    assert image_sets[1]["original"].endswith("/original.png")
+    assert image_sets[0]["miniatura"].endswith("/miniatura.webp")
+    assert all(url.startswith(BASE_URL + "/productos/") for s in image_sets for url in s.values())
+    assert len(stored_files(tmp_path)) == 8
+
+    urls, derivadas = image_service.split_image_sets(image_sets)
+    report = await image_service.delete_product_images(urls[:1], derivadas)
+    assert len(report["eliminadas"]) == 4
+    assert len(stored_files(tmp_path)) == 4
+
+
+@pytest.mark.asyncio
+async def test_process_uploads_invalid_file_cleans_up(local_storage, tmp_path):
+    # Firma de JPEG válida (pasa el control de tipo) pero el contenido está roto
+    files = [make_upload("ok.jpg", make_image_bytes(300, 300)), make_upload("roto.jpg", b"\xff\xd8\xff" + b"basura" * 50)]
+
+    with pytest.raises(HTTPException) as exc:
+        await image_service.process_uploads(files)
+    assert exc.value.status_code == 400
+    assert "roto.jpg" in exc.value.detail
+    # Lo que se había guardado de la imagen válida se borra
+    assert stored_files(tmp_path) == []
+
+
+@pytest.mark.asyncio
+async def test_local_storage_rejects_paths_outside_root(local_storage):
+    with pytest.raises(ValueError):
+        await local_storage.save("../fuera.jpg", b"x", "image/jpeg")
+    report = await local_storage.delete([f"{BASE_URL}/../../etc/passwd", "https://otro.cdn.com/a.jpg"])
+    assert report["eliminadas"] == []
+    assert len(report["errores"]) == 2
+
+
+def test_storage_backend_requires_save_and_delete():
+    class OnlySave(storage_service.StorageBackend):
+        async def save(self, key, content, content_type):
+            return key
+
+    with pytest.raises(TypeError):
+        OnlySave()
+    with pytest.raises(TypeError):
+        storage_service.StorageBackend()
+
+
+@pytest.mark.asyncio
+async def test_create_product_returns_sized_images(admin_authenticated_client: AsyncClient, test_category: Categoria, local_storage):
+    form = {
+        "nombre": "Remera con fotos", "precio": "20", "sku": "IMG-1", "stock": "3",
+        "categoria_id": str(test_category.id),
+    }
+    files = [("images", ("frente.jpg", make_image_bytes(1200, 1600), "image/jpeg"))]
+    response = await admin_authenticated_client.post("/api/products/", data=form, files=files)
+    assert response.status_code == 201
+    data = response.json()
+
+    assert len(data["urls_imagenes"]) == 1
+    imagen = data["imagenes"][0]
+    assert imagen["original"] == data["urls_imagenes"][0]
+    assert imagen["miniatura"].endswith("/miniatura.webp")
+    assert data["miniatura"] == imagen["miniatura"]
+    assert "imagenes_derivadas" not in data
+
+    # El listado del catálogo trae la miniatura para la grilla
+    listing = await admin_authenticated_client.get("/api/products/")
+    assert listing.json()[0]["miniatura"] == imagen["miniatura"]
+
+
+@pytest.mark.asyncio
+async def test_process_uploads_from_disk_spool(local_storage, tmp_path, monkeypatch):
+    # Con un umbral chico la imagen pasa a un temporal y el pool la abre por ruta
+    monkeypatch.setattr(image_service.settings, "UPLOAD_SPOOL_THRESHOLD_BYTES", 1024)
+    data = make_image_bytes(900, 600)
+    assert len(data) > 1024
+
+    image_sets = await image_service.process_uploads([make_upload("grande.jpg", data)])
+
+    with open(os.path.join(tmp_path, image_sets[0]["original"][len(BASE_URL) + 1:]), "rb") as f:
+        assert f.read() == data
+    assert len(stored_files(tmp_path)) == 4
+
+
+@pytest.mark.asyncio
+async def test_process_uploads_rejects_oversized_before_storing(local_storage, tmp_path, monkeypatch):
+    monkeypatch.setattr(image_service.settings, "UPLOAD_MAX_REQUEST_BYTES", 10 * 1024)
+    files = [make_upload("a.jpg", make_image_bytes(600, 600)), make_upload("b.jpg", make_image_bytes(600, 600))]
+    with pytest.raises(HTTPException) as exc:
+        await image_service.process_uploads(files)
+    assert exc.value.status_code == 413
+    assert stored_files(tmp_path) == []
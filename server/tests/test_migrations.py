@@ -0,0 +1,71 @@
+import pytest
+from sqlalchemy import inspect, select
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from database import migrations
+from database.models import Categoria, DisponibilidadProducto
+
+
+@pytest.mark.asyncio
+async def test_migrations_build_schema_and_are_idempotent():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    try:
+        assert await migrations.get_current_version(engine) == 0
+
+        applied = await migrations.run_migrations(engine)
+        assert applied == len(migrations.MIGRATIONS)
+        assert await migrations.get_current_version(engine) == migrations.LATEST_VERSION
+
+        async with engine.connect() as conn:
+            categorias = (await conn.execute(select(Categoria.nombre))).scalars().all()
+            indexes = await conn.run_sync(
+                lambda sync_conn: {ix["name"] for ix in inspect(sync_conn).get_indexes("variantes_productos")}
+            )
+        assert sorted(categorias) == sorted(migrations.DEFAULT_CATEGORIES)
+        assert "ix_variantes_producto_talle_color" in indexes
+
+        # El segundo arranque solo compara la versión
+        assert await migrations.run_migrations(engine) == 0
+    finally:
+        await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_migrations_do_not_follow_the_models():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    try:
+        async with engine.begin() as conn:
+            def first_three(sync_conn):
+                for _, _, migration in migrations.MIGRATIONS[:3]:
+                    migration(sync_conn)
+                return {
+                    "tablas": set(inspect(sync_conn).get_table_names()),
+                    "columnas": {c["name"] for c in inspect(sync_conn).get_columns("productos")},
+                }
+            schema = await conn.run_sync(first_three)
+            # Lo que agregan m004 y m005 no aparece antes aunque ya esté en los modelos
+            assert "disponibilidad_productos" not in schema["tablas"]
+            assert "imagenes_derivadas" not in schema["columnas"]
+
+            await conn.execute(migrations.productos_v1.insert().values(
+                id=1, nombre="Remera", precio=10, sku="MIG-1", stock=99, categoria_id=1
+            ))
+            await conn.execute(migrations.productos_v1.insert().values(
+                id=2, nombre="Gorra", precio=5, sku="MIG-2", stock=4, categoria_id=1
+            ))
+            await conn.execute(migrations.variantes_v1.insert(), [
+                {"producto_id": 1, "tamanio": "S", "color": "Negro", "cantidad_en_stock": 2},
+                {"producto_id": 1, "tamanio": "M", "color": "Blanco", "cantidad_en_stock": 0},
+            ])
+            await conn.run_sync(migrations.m004_product_availability)
+
+            rows = (await conn.execute(
+                select(DisponibilidadProducto.producto_id, DisponibilidadProducto.stock_total,
+                       DisponibilidadProducto.talles, DisponibilidadProducto.colores)
+                .order_by(DisponibilidadProducto.producto_id)
+            )).all()
+            assert [tuple(r) for r in rows] == [(1, 2, ["S"], ["Negro"]), (2, 4, [], [])]
+            stock = (await conn.execute(select(migrations.productos_v1.c.stock).where(migrations.productos_v1.c.id == 1))).scalar()
+            assert stock == 2
+    finally:
+        await engine.dispose()
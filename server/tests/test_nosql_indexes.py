@@ -0,0 +1,78 @@
+# En tests/test_nosql_indexes.py
+import pytest
+from pymongo.errors import DuplicateKeyError
+
+from database import database
+
+
+@pytest.mark.asyncio
+async def test_creates_user_and_cart_indexes(db_nosql):
+    report = await database.ensure_nosql_indexes(db_nosql)
+    assert report["errores"] == []
+
+    users = await db_nosql.users.index_information()
+    assert users["ux_users_email"]["unique"] is True
+    assert users["ix_users_reset_token"]["sparse"] is True
+
+    carts = await db_nosql.carts.index_information()
+    assert carts["ux_carts_usuario"]["unique"] and carts["ux_carts_usuario"]["sparse"]
+    assert carts["ux_carts_invitado"]["unique"] and carts["ux_carts_invitado"]["sparse"]
+    ttl = carts[database.GUEST_CART_TTL_INDEX]
+    assert ttl["key"] == [("last_updated", 1)]
+    assert ttl["expireAfterSeconds"] == database.GUEST_CART_TTL_SECONDS
+    # Solo vencen los carritos de invitado
+    assert ttl["partialFilterExpression"] == {"guest_session_id": {"$exists": True}}
+
+    # Correrlo de nuevo no cambia nada
+    assert (await database.ensure_nosql_indexes(db_nosql))["errores"] == []
+
+
+@pytest.mark.asyncio
+async def test_unique_indexes_are_enforced(db_nosql):
+    await database.ensure_nosql_indexes(db_nosql)
+
+    await db_nosql.users.insert_one({"email": "repetido@example.com"})
+    with pytest.raises(DuplicateKeyError):
+        await db_nosql.users.insert_one({"email": "repetido@example.com"})
+
+    # Varios carritos de invitado conviven sin 'user_id' (sparse), pero no dos del mismo usuario
+    await db_nosql.carts.insert_one({"guest_session_id": "a", "items": []})
+    await db_nosql.carts.insert_one({"guest_session_id": "b", "items": []})
+    await db_nosql.carts.insert_one({"user_id": "u1", "items": []})
+    with pytest.raises(DuplicateKeyError):
+        await db_nosql.carts.insert_one({"user_id": "u1", "items": []})
+
+
+@pytest.mark.asyncio
+async def test_index_errors_do_not_stop_startup(db_nosql):
+    await db_nosql.users.insert_one({"email": "doble@example.com"})
+    await db_nosql.users.insert_one({"email": "doble@example.com"})
+
+    report = await database.ensure_nosql_indexes(db_nosql)
+
+    assert [e["indice"] for e in report["errores"]] == ["ux_users_email"]
+    assert "ux_carts_usuario" in report["ok"]
+
+
+@pytest.mark.asyncio
+async def test_changed_ttl_is_updated_with_coll_mod(db_nosql):
+    await db_nosql.carts.create_index(
+        [("last_updated", 1)], name=database.GUEST_CART_TTL_INDEX, expireAfterSeconds=60,
+        partialFilterExpression={"guest_session_id": {"$exists": True}}
+    )
+    commands = []
+
+    class RecordingDatabase:
+        def __getitem__(self, name):
+            return db_nosql[name]
+
+        async def command(self, *args, **kwargs):
+            commands.append((args, kwargs))
+
+    report = await database.ensure_nosql_indexes(RecordingDatabase())
+
+    assert report["errores"] == []
+    assert commands == [(
+        ("collMod", "carts"),
+        {"index": {"name": database.GUEST_CART_TTL_INDEX, "expireAfterSeconds": database.GUEST_CART_TTL_SECONDS}},
+    )]
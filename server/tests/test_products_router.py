@@ -1,9 +1,10 @@
 # En tests/test_products_router.py
+import json
 import pytest
 from httpx import AsyncClient
 from fastapi import status
 from sqlalchemy.ext.asyncio import AsyncSession
-from database.models import Producto, Categoria
+from database.models import Producto, Categoria, VarianteProducto
 
 @pytest.mark.asyncio
 async def test_get_products(client: AsyncClient, test_product_sql: Producto):
@@ -69,4 +70,399 @@ async def test_delete_product_as_admin(admin_authenticated_client: AsyncClient,
 @pytest.mark.asyncio
 async def test_delete_product_not_found(admin_authenticated_client: AsyncClient):
     response = await admin_authenticated_client.delete("/api/products/99999")
-    assert response.status_code == status.HTTP_404_NOT_FOUND
\ No newline at end of file
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.asyncio
+async def test_get_products_cursor_pagination(client: AsyncClient, db_sql: AsyncSession, test_category: Categoria):
+    for i, precio in enumerate([30.0, 10.0, 20.0, 10.0, 50.0]):
+        db_sql.add(Producto(nombre=f"Cursor {i}", precio=precio, sku=f"CUR-{i}", stock=1, categoria_id=test_category.id))
+    await db_sql.commit()
+
+    seen = []
+    response = await client.get("/api/products/", params={"limit": 2, "sort_by": "precio_asc"})
+    while True:
+        assert response.status_code == status.HTTP_200_OK
+        seen.extend(p["precio"] for p in response.json())
+        next_cursor = response.headers.get("X-Next-Cursor")
+        if not next_cursor:
+            break
+        response = await client.get("/api/products/", params={"limit": 2, "sort_by": "precio_asc", "cursor": next_cursor})
+
+    assert seen == [10.0, 10.0, 20.0, 30.0, 50.0]
+
+@pytest.mark.asyncio
+async def test_get_products_cursor_from_other_sort(client: AsyncClient, db_sql: AsyncSession, test_category: Categoria):
+    for i in range(2):
+        db_sql.add(Producto(nombre=f"Cursor {i}", precio=10 + i, sku=f"CUR-{i}", stock=1, categoria_id=test_category.id))
+    await db_sql.commit()
+
+    response = await client.get("/api/products/", params={"limit": 1, "sort_by": "nombre_desc"})
+    next_cursor = response.headers["X-Next-Cursor"]
+    response = await client.get("/api/products/", params={"limit": 1, "sort_by": "precio_asc", "cursor": next_cursor})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    response = await client.get("/api/products/", params={"cursor": "no-es-un-cursor"})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+@pytest.mark.asyncio
+async def test_get_products_limit_counts_products_not_variants(client: AsyncClient, db_sql: AsyncSession, test_category: Categoria):
+    for i in range(3):
+        producto = Producto(nombre=f"Remera {i}", precio=10 + i, sku=f"VAR-{i}", stock=6, categoria_id=test_category.id)
+        producto.variantes = [
+            VarianteProducto(tamanio=talle, color=color, cantidad_en_stock=1)
+            for talle in ("S", "M", "L") for color in ("Negro", "Blanco")
+        ]
+        db_sql.add(producto)
+    await db_sql.commit()
+
+    response = await client.get("/api/products/", params={"limit": 2, "talle": "M,L", "color": "Negro"})
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert [p["nombre"] for p in data] == ["Remera 0", "Remera 1"]
+    assert all(len(p["variantes"]) == 6 for p in data)
+
+@pytest.mark.asyncio
+async def test_get_products_talle_and_color_match_the_same_variant(client: AsyncClient, db_sql: AsyncSession, test_category: Categoria):
+    producto = Producto(nombre="Remera cruzada", precio=10, sku="CRUZ-1", stock=2, categoria_id=test_category.id)
+    producto.variantes = [
+        VarianteProducto(tamanio="S", color="Rojo", cantidad_en_stock=1),
+        VarianteProducto(tamanio="L", color="Azul", cantidad_en_stock=1),
+    ]
+    db_sql.add(producto)
+    await db_sql.commit()
+
+    # Talle S y color Azul existen, pero en variantes distintas: no matchea
+    response = await client.get("/api/products/", params={"talle": "S", "color": "Azul"})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == []
+
+    response = await client.get("/api/products/", params={"talle": "S", "color": "Rojo"})
+    assert [p["nombre"] for p in response.json()] == ["Remera cruzada"]
+
+@pytest.mark.asyncio
+async def test_get_products_search_by_relevance(client: AsyncClient, db_sql: AsyncSession, test_category: Categoria):
+    db_sql.add(Producto(nombre="Pantalón", descripcion="Va con cualquier camisa", precio=10, sku="Q-1", stock=1, categoria_id=test_category.id))
+    db_sql.add(Producto(nombre="Camisá de lino", precio=20, sku="Q-2", stock=1, categoria_id=test_category.id))
+    db_sql.add(Producto(nombre="Buzo", precio=30, sku="Q-3", stock=1, categoria_id=test_category.id))
+    await db_sql.commit()
+
+    response = await client.get("/api/products/", params={"q": "camisa"})
+    assert response.status_code == status.HTTP_200_OK
+    assert [p["sku"] for p in response.json()] == ["Q-2", "Q-1"]
+
+    response = await client.get("/api/products/", params={"q": "camisa", "sort_by": "precio_desc"})
+    assert [p["sku"] for p in response.json()] == ["Q-2", "Q-1"]
+
+@pytest.mark.asyncio
+async def test_search_index_follows_deletes(admin_authenticated_client: AsyncClient, test_product_sql: Producto):
+    response = await admin_authenticated_client.get("/api/products/", params={"q": "test product"})
+    assert [p["id"] for p in response.json()] == [test_product_sql.id]
+
+    await admin_authenticated_client.delete(f"/api/products/{test_product_sql.id}")
+    response = await admin_authenticated_client.get("/api/products/", params={"q": "test product"})
+    assert response.json() == []
+
+@pytest.mark.asyncio
+async def test_get_product_facets(client: AsyncClient, db_sql: AsyncSession, test_category: Categoria):
+    nombre_categoria = test_category.nombre
+    otra = Categoria(nombre="Otra categoría")
+    db_sql.add(otra)
+    await db_sql.flush()
+    remera = Producto(nombre="Remera", precio=15000, sku="F-1", stock=2, categoria_id=test_category.id)
+    remera.variantes = [
+        VarianteProducto(tamanio="S", color="Negro", cantidad_en_stock=1),
+        VarianteProducto(tamanio="M", color="Negro", cantidad_en_stock=1),
+    ]
+    buzo = Producto(nombre="Buzo", precio=60000, sku="F-2", stock=1, categoria_id=otra.id)
+    buzo.variantes = [VarianteProducto(tamanio="M", color="Blanco", cantidad_en_stock=1)]
+    db_sql.add_all([remera, buzo])
+    await db_sql.commit()
+
+    response = await client.get("/api/products/facets")
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert data["talles"] == [{"valor": "M", "total": 2}, {"valor": "S", "total": 1}]
+    assert data["colores"] == [{"valor": "Blanco", "total": 1}, {"valor": "Negro", "total": 1}]
+    assert {c["nombre"]: c["total"] for c in data["categorias"]} == {nombre_categoria: 1, "Otra categoría": 1}
+    assert [b["total"] for b in data["precios"]] == [1, 0, 1, 0, 0]
+
+    response = await client.get("/api/products/facets", params={"talle": "S", "price_edges": "0,50000"})
+    data = response.json()
+    assert data["colores"] == [{"valor": "Negro", "total": 1}]
+    assert data["precios"] == [{"desde": 0, "hasta": 50000, "total": 1}, {"desde": 50000, "hasta": None, "total": 0}]
+
+@pytest.mark.asyncio
+async def test_product_facets_reject_bad_price_edges(client: AsyncClient):
+    for price_edges in ("0,nan", "inf", "-inf,10", "0,a", ",".join(str(i) for i in range(21))):
+        response = await client.get("/api/products/facets", params={"price_edges": price_edges})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST, price_edges
+
+    response = await client.get("/api/products/facets", params={"price_edges": ",".join(str(i) for i in range(20))})
+    assert response.status_code == status.HTTP_200_OK
+    assert len(response.json()["precios"]) == 20
+
+@pytest.mark.asyncio
+async def test_product_reads_are_cached_until_a_write(admin_authenticated_client: AsyncClient, test_product_sql: Producto, db_sql: AsyncSession):
+    product_id = test_product_sql.id
+    first = await admin_authenticated_client.get(f"/api/products/{product_id}")
+    await admin_authenticated_client.get("/api/products/")
+
+    # Un cambio que no pasa por la API no se ve hasta que se invalida el cache
+    test_product_sql.nombre = "Cambiado por fuera"
+    await db_sql.commit()
+    second = await admin_authenticated_client.get(f"/api/products/{product_id}")
+    assert second.json() == first.json()
+
+    response = await admin_authenticated_client.post(
+        f"/api/products/{product_id}/variants",
+        json={"tamanio": "M", "color": "Negro", "cantidad_en_stock": 3}
+    )
+    assert response.status_code == status.HTTP_201_CREATED
+
+    detail = await admin_authenticated_client.get(f"/api/products/{product_id}")
+    assert detail.json()["nombre"] == "Cambiado por fuera"
+    assert len(detail.json()["variantes"]) == 1
+    listing = await admin_authenticated_client.get("/api/products/", params={"talle": "M"})
+    assert [p["id"] for p in listing.json()] == [product_id]
+
+    stats = await admin_authenticated_client.get("/api/admin/metrics/cache")
+    assert stats.status_code == status.HTTP_200_OK
+    assert stats.json()["hits"] == 1
+
+@pytest.mark.asyncio
+async def test_product_etag_returns_304(client: AsyncClient, test_product_sql: Producto):
+    from services.catalog_cache import catalog_cache
+
+    response = await client.get(f"/api/products/{test_product_sql.id}")
+    etag = response.headers["ETag"]
+
+    response = await client.get(f"/api/products/{test_product_sql.id}", headers={"If-None-Match": etag})
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    assert response.content == b""
+
+    # Con el cache vacío, el ETag se recalcula desde la base y sigue validando
+    catalog_cache.clear()
+    response = await client.get(f"/api/products/{test_product_sql.id}", headers={"If-None-Match": etag})
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    listing = await client.get("/api/products/")
+    response = await client.get("/api/products/", headers={"If-None-Match": listing.headers["ETag"]})
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+@pytest.mark.asyncio
+async def test_product_etag_changes_with_variant_stock(admin_authenticated_client: AsyncClient, test_product_sql: Producto):
+    product_id = test_product_sql.id
+    response = await admin_authenticated_client.get(f"/api/products/{product_id}")
+    etag = response.headers["ETag"]
+
+    await admin_authenticated_client.post(
+        f"/api/products/{product_id}/variants",
+        json={"tamanio": "S", "color": "Rojo", "cantidad_en_stock": 1}
+    )
+    response = await admin_authenticated_client.get(f"/api/products/{product_id}", headers={"If-None-Match": etag})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["ETag"] != etag
+
+@pytest.mark.asyncio
+async def test_get_products_and_variants_batch(client: AsyncClient, db_sql: AsyncSession, test_category: Categoria):
+    productos = []
+    for i in range(3):
+        producto = Producto(nombre=f"Batch {i}", precio=10 + i, sku=f"B-{i}", stock=1, categoria_id=test_category.id)
+        producto.variantes = [VarianteProducto(tamanio="M", color="Negro", cantidad_en_stock=1)]
+        productos.append(producto)
+    db_sql.add_all(productos)
+    await db_sql.flush()
+    product_ids = [p.id for p in productos]
+    variant_ids = [p.variantes[0].id for p in productos]
+    await db_sql.commit()
+
+    ids = f"{product_ids[2]},{product_ids[0]},99999"
+    response = await client.get("/api/products/batch", params={"ids": ids})
+    assert response.status_code == status.HTTP_200_OK
+    assert [p["id"] for p in response.json()] == [product_ids[2], product_ids[0]]
+    assert len(response.json()[0]["variantes"]) == 1
+
+    response = await client.get("/api/products/variants/batch", params={"ids": f"{variant_ids[1]},{variant_ids[0]}"})
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert [v["id"] for v in data] == [variant_ids[1], variant_ids[0]]
+    assert data[0]["producto"]["nombre"] == "Batch 1"
+
+    response = await client.get("/api/products/batch", params={"ids": "1,a"})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.asyncio
+async def test_import_products_jsonl(admin_authenticated_client: AsyncClient, test_product_sql: Producto, test_category: Categoria, db_sql: AsyncSession):
+    categoria_id = test_category.id
+    lines = [
+        {"sku": "SQL-SKU-123", "nombre": "Nombre Importado", "precio": 20, "categoria_id": categoria_id,
+         "variantes": [{"tamanio": "M", "color": "Negro", "cantidad_en_stock": 4}]},
+        {"sku": "IMP-1", "nombre": "Nuevo", "precio": 15, "categoria_id": categoria_id,
+         "variantes": [{"tamanio": "S", "color": "Rojo", "cantidad_en_stock": 2}, {"tamanio": "L", "color": "Rojo", "cantidad_en_stock": 3}]},
+        {"sku": "IMP-2", "nombre": "Sin precio", "categoria_id": categoria_id},
+    ]
+    content = "\n".join(json.dumps(line) for line in lines) + "\n{roto\n"
+    files = {"file": ("catalogo.jsonl", content.encode("utf-8"), "application/x-ndjson")}
+    response = await admin_authenticated_client.post("/api/products/import", files=files)
+    assert response.status_code == status.HTTP_200_OK
+    report = response.json()
+    assert report["filas"] == 4
+    assert (report["creados"], report["actualizados"]) == (1, 1)
+    assert report["variantes_creadas"] == 3
+    assert report["total_errores"] == 2
+    assert [e["fila"] for e in report["errores"]] == [3, 4]
+    assert report["errores"][0]["sku"] == "IMP-2"
+
+    # El listado cacheado no puede quedar viejo después de la importación
+    response = await admin_authenticated_client.get("/api/products/", params={"q": "importado"})
+    assert [p["sku"] for p in response.json()] == ["SQL-SKU-123"]
+    nuevo = next(p for p in (await admin_authenticated_client.get("/api/products/")).json() if p["sku"] == "IMP-1")
+    assert nuevo["stock"] == 5
+
+
+@pytest.mark.asyncio
+async def test_import_products_rejects_unknown_format(admin_authenticated_client: AsyncClient):
+    files = {"file": ("catalogo.xlsx", b"algo", "application/octet-stream")}
+    response = await admin_authenticated_client.post("/api/products/import", files=files)
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.asyncio
+async def test_bulk_variants_matrix_and_adjustments(admin_authenticated_client: AsyncClient, test_product_sql: Producto):
+    product_id = test_product_sql.id
+    url = f"/api/products/{product_id}/variants/bulk"
+
+    matriz = {"S": {"Negro": 1, "Blanco": 2}, "M": {"Negro": 3}}
+    response = await admin_authenticated_client.put(url, json={"matriz": matriz})
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert data["matriz"] == matriz
+    assert data["talles"] == ["S", "M"] and data["colores"] == ["Negro", "Blanco"]
+    ids = {(v["tamanio"], v["color"]): v["id"] for v in data["variantes"]}
+
+    # Matriz que pisa una existente y agrega otra, más ajustes absolutos y relativos
+    body = {
+        "matriz": {"M": {"Negro": 10, "Blanco": 4}},
+        "ajustes": [
+            {"variant_id": ids[("S", "Negro")], "delta": 5},
+            {"variant_id": ids[("S", "Blanco")], "cantidad_en_stock": 0},
+        ],
+    }
+    response = await admin_authenticated_client.put(url, json=body)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["matriz"] == {"S": {"Negro": 6, "Blanco": 0}, "M": {"Negro": 10, "Blanco": 4}}
+    assert len(response.json()["variantes"]) == 4
+
+    # El detalle cacheado refleja el stock nuevo
+    detail = (await admin_authenticated_client.get(f"/api/products/{product_id}")).json()
+    assert sorted(v["cantidad_en_stock"] for v in detail["variantes"]) == [0, 4, 6, 10]
+
+
+@pytest.mark.asyncio
+async def test_bulk_variants_is_all_or_nothing(admin_authenticated_client: AsyncClient, test_product_sql: Producto):
+    product_id = test_product_sql.id
+    url = f"/api/products/{product_id}/variants/bulk"
+    response = await admin_authenticated_client.put(url, json={"matriz": {"S": {"Negro": 1}}})
+    variant_id = response.json()["variantes"][0]["id"]
+
+    body = {"matriz": {"L": {"Rojo": 3}}, "ajustes": [{"variant_id": variant_id, "delta": -2}]}
+    response = await admin_authenticated_client.put(url, json=body)
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    body = {"ajustes": [{"variant_id": 99999, "delta": 1}]}
+    response = await admin_authenticated_client.put(url, json=body)
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    body = {"ajustes": [{"variant_id": variant_id, "delta": 1, "cantidad_en_stock": 1}]}
+    response = await admin_authenticated_client.put(url, json=body)
+    assert response.status_code == 422
+
+    # La matriz del request rechazado no se aplicó
+    detail = (await admin_authenticated_client.get(f"/api/products/{product_id}")).json()
+    assert [(v["tamanio"], v["cantidad_en_stock"]) for v in detail["variantes"]] == [("S", 1)]
+
+
+@pytest.mark.asyncio
+async def test_suggest_products(admin_authenticated_client: AsyncClient, test_product_sql: Producto, test_category: Categoria):
+    categoria_id = test_category.id
+    product_id = test_product_sql.id
+    response = await admin_authenticated_client.get("/api/products/suggest", params={"prefix": "test pro"})
+    assert response.status_code == status.HTTP_200_OK
+    assert [p["nombre"] for p in response.json()["productos"]] == ["Test Product SQL"]
+
+    # El índice ya está construido: las escrituras lo mantienen al día
+    body = {"matriz": {"M": {"Turquesa": 2}}}
+    await admin_authenticated_client.put(f"/api/products/{product_id}/variants/bulk", json=body)
+    response = await admin_authenticated_client.get("/api/products/suggest", params={"prefix": "turq"})
+    assert response.json()["colores"] == ["Turquesa"]
+    assert response.json()["productos"][0]["id"] == product_id
+
+    line = {"sku": "SUG-1", "nombre": "Sugerible", "precio": 1, "stock": 1, "categoria_id": categoria_id}
+    files = {"file": ("catalogo.jsonl", json.dumps(line).encode("utf-8"), "application/x-ndjson")}
+    await admin_authenticated_client.post("/api/products/import", files=files)
+    response = await admin_authenticated_client.get("/api/products/suggest", params={"prefix": "suger"})
+    assert [p["nombre"] for p in response.json()["productos"]] == ["Sugerible"]
+
+
+@pytest.mark.asyncio
+async def test_product_availability_grid(admin_authenticated_client: AsyncClient, test_product_sql: Producto):
+    product_id = test_product_sql.id
+    matriz = {"S": {"Negro": 2, "Blanco": 0}, "M": {"Negro": 1}}
+    response = await admin_authenticated_client.put(f"/api/products/{product_id}/variants/bulk", json={"matriz": matriz})
+    ids = {(v["tamanio"], v["color"]): v["id"] for v in response.json()["variantes"]}
+
+    response = await admin_authenticated_client.get(f"/api/products/{product_id}/availability")
+    assert response.status_code == status.HTTP_200_OK
+    grid = response.json()
+    assert (grid["talles"], grid["colores"]) == (["S", "M"], ["Negro", "Blanco"])
+    assert grid["stock"] == [[2, 0], [1, None]]
+    assert grid["ids"] == [[ids[("S", "Negro")], ids[("S", "Blanco")]], [ids[("M", "Negro")], None]]
+
+    etag = response.headers["etag"]
+    response = await admin_authenticated_client.get(f"/api/products/{product_id}/availability", headers={"If-None-Match": etag})
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    # Un cambio de stock invalida la grilla cacheada y cambia el ETag
+    body = {"ajustes": [{"variant_id": ids[("M", "Negro")], "delta": -1}]}
+    await admin_authenticated_client.put(f"/api/products/{product_id}/variants/bulk", json=body)
+    response = await admin_authenticated_client.get(f"/api/products/{product_id}/availability", headers={"If-None-Match": etag})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["stock"][1] == [0, None]
+
+    response = await admin_authenticated_client.get("/api/products/99999/availability")
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.asyncio
+async def test_price_histogram(client: AsyncClient, db_sql: AsyncSession, test_category: Categoria):
+    categoria_id = test_category.id
+    precios = [100, 110, 120, 130, 500, 1000]
+    db_sql.add_all([
+        Producto(nombre=f"Hist {i}", precio=p, sku=f"H-{i}", stock=1, categoria_id=categoria_id)
+        for i, p in enumerate(precios)
+    ])
+    await db_sql.commit()
+
+    response = await client.get("/api/products/price-histogram", params={"buckets": 3})
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert (data["total"], data["precio_min"], data["precio_max"]) == (6, 100, 1000)
+    assert [b["total"] for b in data["buckets"]] == [4, 1, 1]
+    assert [b["desde"] for b in data["buckets"]] == [100, 400, 700]
+
+    response = await client.get("/api/products/price-histogram", params={"buckets": 3, "modo": "adaptativo"})
+    data = response.json()
+    assert [(b["desde"], b["hasta"], b["total"]) for b in data["buckets"]] == [(100, 110, 2), (120, 130, 2), (500, 1000, 2)]
+
+    # Mismos filtros que el listado
+    response = await client.get("/api/products/price-histogram", params={"buckets": 2, "precio_max": 130})
+    data = response.json()
+    assert [b["total"] for b in data["buckets"]] == [2, 2]
+
+    response = await client.get("/api/products/price-histogram", params={"categoria_id": "99999"})
+    assert response.json() == {"modo": "fijo", "total": 0, "precio_min": None, "precio_max": None, "buckets": []}
+
+    response = await client.get("/api/products/price-histogram", params={"modo": "otro"})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
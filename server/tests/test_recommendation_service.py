@@ -0,0 +1,142 @@
+# En tests/test_recommendation_service.py
+import pytest
+from httpx import AsyncClient
+from fastapi import status
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.models import (
+    Categoria, CoocurrenciaProducto, DetalleOrden, EstadoTrabajo, Orden, Producto, VarianteProducto
+)
+from services import recommendation_service
+
+
+async def create_products(db: AsyncSession, categoria_id: int, n: int):
+    productos = []
+    for i in range(n):
+        producto = Producto(nombre=f"Rec {i}", precio=10, sku=f"REC-{i}", stock=10, categoria_id=categoria_id)
+        producto.variantes = [
+            VarianteProducto(tamanio="S", color="Negro", cantidad_en_stock=5),
+            VarianteProducto(tamanio="M", color="Negro", cantidad_en_stock=5),
+        ]
+        productos.append(producto)
+    db.add_all(productos)
+    await db.flush()
+    ids = [p.id for p in productos]
+    variants = {p.id: [v.id for v in p.variantes] for p in productos}
+    await db.commit()
+    return ids, variants
+
+
+async def create_order(db: AsyncSession, variant_ids, **extra):
+    orden = Orden(**{"usuario_id": "u1", "monto_total": 10, "estado": "Completado", "estado_pago": "Aprobado", **extra})
+    db.add(orden)
+    await db.flush()
+    for variant_id in variant_ids:
+        db.add(DetalleOrden(orden_id=orden.id, variante_producto_id=variant_id, cantidad=1, precio_en_momento_compra=10))
+    await db.commit()
+
+
+@pytest.mark.asyncio
+async def test_recommendations_are_incremental(db_sql: AsyncSession, test_category: Categoria):
+    (a, b, c, d), variants = await create_products(db_sql, test_category.id, 4)
+
+    # Dos variantes del mismo producto en una orden cuentan como una sola compra
+    await create_order(db_sql, [variants[a][0], variants[a][1], variants[b][0]])
+    await create_order(db_sql, [variants[a][0], variants[c][0]])
+    await create_order(db_sql, [variants[a][0], variants[c][0]])
+
+    summary = await recommendation_service.update_recommendations(db_sql)
+    assert summary["productos_actualizados"] == 3
+    related = await recommendation_service.get_related_products(db_sql, a, limit=5)
+    assert [p.id for p in related] == [c, b]
+
+    # Sin órdenes nuevas no hay nada que hacer
+    assert (await recommendation_service.update_recommendations(db_sql))["pares"] == 0
+
+    # La corrida siguiente solo suma las órdenes nuevas
+    await create_order(db_sql, [variants[a][0], variants[b][0], variants[d][0]])
+    await create_order(db_sql, [variants[a][0], variants[b][0]])
+    summary = await recommendation_service.update_recommendations(db_sql, top_k=2)
+    assert summary["productos_actualizados"] == 3  # a, b y d
+
+    related = await recommendation_service.get_related_products(db_sql, a, limit=5)
+    assert [p.id for p in related] == [b, c]  # b: 3 órdenes, c: 2; d quedó afuera del top-2
+    veces = (await db_sql.execute(
+        select(CoocurrenciaProducto.veces).where(CoocurrenciaProducto.producto_id == a, CoocurrenciaProducto.relacionado_id == b)
+    )).scalar_one()
+    assert veces == 3
+
+    # Recalcular todo da el mismo resultado
+    await recommendation_service.update_recommendations(db_sql, top_k=2, full=True)
+    related = await recommendation_service.get_related_products(db_sql, a, limit=5)
+    assert [p.id for p in related] == [b, c]
+
+
+@pytest.mark.asyncio
+async def test_recommendations_count_orders_committed_out_of_order(db_sql: AsyncSession, test_category: Categoria):
+    (a, b, c), variants = await create_products(db_sql, test_category.id, 3)
+    viejo = datetime.utcnow() - timedelta(hours=1)
+
+    # Una orden vieja (fuera de la ventana) y otra reciente con un id más alto
+    await create_order(db_sql, [variants[a][0], variants[b][0]], id=1, creado_en=viejo)
+    await create_order(db_sql, [variants[a][0], variants[b][0]], id=5)
+    summary = await recommendation_service.update_recommendations(db_sql)
+    assert (summary["ordenes_nuevas"], summary["ultimo_id"]) == (2, 1)
+
+    # La orden 3 se confirma después de que se leyó la 5: igual se cuenta, y la 5 no se vuelve a contar
+    await create_order(db_sql, [variants[a][0], variants[c][0]], id=3)
+    summary = await recommendation_service.update_recommendations(db_sql)
+    assert summary["ordenes_nuevas"] == 1
+    related = await recommendation_service.get_related_products(db_sql, a, limit=5)
+    assert [p.id for p in related] == [b, c]
+    veces = (await db_sql.execute(
+        select(CoocurrenciaProducto.veces).where(CoocurrenciaProducto.producto_id == a, CoocurrenciaProducto.relacionado_id == b)
+    )).scalar_one()
+    assert veces == 2
+
+    estado = await db_sql.get(EstadoTrabajo, recommendation_service.JOB_NAME)
+    assert (estado.ultimo_id, estado.ids_recientes) == (1, [3, 5])
+    assert (await recommendation_service.update_recommendations(db_sql))["ordenes_nuevas"] == 0
+
+
+@pytest.mark.asyncio
+async def test_related_endpoint(client: AsyncClient, db_sql: AsyncSession, test_category: Categoria):
+    (a, b), variants = await create_products(db_sql, test_category.id, 2)
+
+    response = await client.get(f"/api/products/{a}/related")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == []
+
+    await create_order(db_sql, [variants[a][0], variants[b][0]])
+    await recommendation_service.update_recommendations(db_sql)
+    response = await client.get(f"/api/products/{b}/related", params={"limit": 3})
+    assert [p["id"] for p in response.json()] == [a]
+    assert len(response.json()[0]["variantes"]) == 2
+
+    response = await client.get("/api/products/99999/related")
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.asyncio
+async def test_recommendations_only_count_paid_orders(db_sql: AsyncSession, test_category: Categoria):
+    (a, b, c), variants = await create_products(db_sql, test_category.id, 3)
+    await create_order(db_sql, [variants[a][0], variants[b][0]], estado_pago="Rechazado")
+    await create_order(db_sql, [variants[a][0], variants[b][0]], estado_pago=None)
+    await create_order(db_sql, [variants[a][0], variants[c][0]], estado_pago="pagado")
+
+    summary = await recommendation_service.update_recommendations(db_sql)
+    assert summary["ordenes_nuevas"] == 1
+    related = await recommendation_service.get_related_products(db_sql, a, limit=5)
+    assert [p.id for p in related] == [c]
+
+    # Una orden que se aprueba después, dentro de la ventana, se cuenta en la corrida siguiente
+    pendiente = (await db_sql.execute(select(Orden).where(Orden.estado_pago.is_(None)))).scalar_one()
+    pendiente.estado_pago = "Aprobado"
+    await db_sql.commit()
+    summary = await recommendation_service.update_recommendations(db_sql)
+    assert summary["ordenes_nuevas"] == 1
+    related = await recommendation_service.get_related_products(db_sql, a, limit=5)
+    assert sorted(p.id for p in related) == sorted([b, c])
@@ -0,0 +1,65 @@
+from types import SimpleNamespace
+
+from sqlalchemy.dialects import mysql
+
+from services import search_service
+from services.search_service import InvertedIndex, fold, tokenize
+
+
+def make_product(id, nombre, descripcion=None, material=None, color=None):
+    return SimpleNamespace(id=id, nombre=nombre, descripcion=descripcion, material=material, color=color)
+
+
+def test_fold_removes_accents_and_case():
+    assert fold("Camisá Algodón") == "camisa algodon"
+    assert tokenize("La Camisa de LINO") == ["camisa", "lino"]
+
+
+def test_search_ranks_name_matches_first():
+    index = InvertedIndex()
+    index.add(make_product(1, "Pantalón cargo", descripcion="Ideal para combinar con una camisa"))
+    index.add(make_product(2, "Camisá Oxford", material="Algodón"))
+
+    assert [pid for pid, _ in index.search("camisa")] == [2, 1]
+    assert [pid for pid, _ in index.search("camisa algodon")] == [2]
+
+
+def test_search_matches_prefixes():
+    index = InvertedIndex()
+    index.add(make_product(1, "Remera básica", color="Negro"))
+
+    assert [pid for pid, _ in index.search("rem neg")] == [1]
+    assert index.search("buzo") == []
+
+
+def test_index_updates_incrementally():
+    index = InvertedIndex()
+    index.add(make_product(1, "Buzo canguro"))
+    index.add(make_product(1, "Campera rompeviento"))
+
+    assert index.search("buzo") == []
+    assert [pid for pid, _ in index.search("campera")] == [1]
+
+    index.remove(1)
+    assert index.search("campera") == []
+    assert index.vocabulary == []
+
+
+def test_mysql_boolean_query_skips_terms_fulltext_cannot_match():
+    assert search_service._boolean_query("t shirt negro") == "+shirt* +negro*"
+    assert search_service._boolean_query("remera for men") == "+remera* +men*"
+    assert search_service._boolean_query("xl") is None
+
+    # Si no queda ningún término para FULLTEXT se busca por comienzo de palabra en el nombre
+    clause = search_service._short_terms_clause("xl")
+    sql = str(clause.compile(dialect=mysql.dialect(), compile_kwargs={"literal_binds": True}))
+    assert "productos.nombre LIKE concat('xl', '%%')" in sql
+    assert "productos.nombre LIKE concat('%%', ' xl', '%%')" in sql
+
+
+def test_search_returns_every_candidate():
+    index = InvertedIndex()
+    for i in range(1, 601):
+        index.add(make_product(i, f"Remera {i}"))
+    assert len(index.search("remera")) == 600
+    assert len(index.search("remera", limit=5)) == 5
@@ -0,0 +1,132 @@
+# En tests/test_suggest_service.py
+from contextlib import asynccontextmanager
+
+import pytest
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.models import Categoria, Producto
+from services import suggest_service
+from services.suggest_service import PrefixIndex
+from settings import settings
+
+
+def make_index():
+    index = PrefixIndex()
+    index.set_categories({1: "Remeras", 2: "Camperas"})
+    index.add(1, "Remera Básica", 1, colores_variantes=["Negro", "Blanco"])
+    index.add(2, "Remera Oversize", 1, colores_variantes=["Negro"])
+    index.add(3, "Campera Rompeviento", 2, color="Rojo")
+    return index
+
+
+def test_suggest_ranks_products_by_sales():
+    index = make_index()
+    index.record_sales({2: 5, 1: 1})
+
+    result = index.suggest("rem")
+    assert [p["id"] for p in result["productos"]] == [2, 1]
+    assert result["productos"][0]["vendidos"] == 5
+    assert result["categorias"] == [{"id": 1, "nombre": "Remeras"}]
+
+
+def test_suggest_matches_categories_colors_and_several_words():
+    index = make_index()
+
+    assert [p["id"] for p in index.suggest("camperas")["productos"]] == [3]
+    assert [p["id"] for p in index.suggest("remera neg")["productos"]] == [1, 2]
+    assert [p["id"] for p in index.suggest("remera bla")["productos"]] == [1]
+    assert index.suggest("n")["colores"] == ["Negro"]
+    assert index.suggest("   ")["productos"] == []
+
+
+def test_suggest_follows_updates_and_deletes():
+    index = make_index()
+    index.add(3, "Buzo Rompeviento", 2, color="Rojo")
+    assert index.suggest("campera rom")["productos"] == [{"id": 3, "nombre": "Buzo Rompeviento", "vendidos": 0}]
+    assert index.suggest("buz")["productos"][0]["id"] == 3
+
+    index.add_colors(2, ["Verde"])
+    assert [p["id"] for p in index.suggest("verde")["productos"]] == [2]
+
+    index.remove(1)
+    index.remove(2)
+    assert index.suggest("remera")["productos"] == []
+    assert index.suggest("neg")["colores"] == []
+
+
+def use_session(monkeypatch, db):
+    """La reconstrucción en segundo plano abre su propia sesión: en los tests usa la de prueba."""
+    @asynccontextmanager
+    async def session():
+        yield db
+    monkeypatch.setattr(suggest_service, "AsyncSessionLocal", session)
+
+
+async def refreshed():
+    if suggest_service._refresh_task is not None:
+        await suggest_service._refresh_task
+
+
+def names(prefix):
+    return [p["nombre"] for p in suggest_service.prefix_index.suggest(prefix)["productos"]]
+
+
+@pytest.mark.asyncio
+async def test_ensure_index_picks_up_changes_from_other_processes(db_sql: AsyncSession, test_category: Categoria, monkeypatch):
+    use_session(monkeypatch, db_sql)
+    categoria_id = test_category.id
+    db_sql.add(Producto(nombre="Remera Lisa", precio=10, sku="SUG-A", stock=1, categoria_id=categoria_id))
+    await db_sql.commit()
+    await suggest_service.ensure_index(db_sql)
+
+    # Otro proceso agrega un producto: hasta el próximo chequeo no se consulta la base
+    db_sql.add(Producto(nombre="Remera Rayada", precio=10, sku="SUG-B", stock=1, categoria_id=categoria_id))
+    await db_sql.commit()
+    await suggest_service.ensure_index(db_sql)
+    assert suggest_service._refresh_task is None
+    assert names("remera") == ["Remera Lisa"]
+
+    # Al chequear, la consulta no espera: responde con el índice viejo hasta que el nuevo está listo
+    monkeypatch.setattr(settings, "SUGGEST_INDEX_CHECK_SECONDS", 0)
+    old_index = suggest_service.prefix_index
+    await suggest_service.ensure_index(db_sql)
+    assert names("remera") == ["Remera Lisa"]
+    await refreshed()
+    assert suggest_service.prefix_index is not old_index
+    assert names("remera") == ["Remera Lisa", "Remera Rayada"]
+
+    # Un cambio que la versión no ve (mismo actualizado_en) se recupera por antigüedad
+    await db_sql.execute(
+        update(Producto).where(Producto.sku == "SUG-A")
+        .values(nombre="Musculosa", actualizado_en=Producto.actualizado_en)
+    )
+    await db_sql.commit()
+    await suggest_service.ensure_index(db_sql)
+    await refreshed()
+    assert names("musc") == []
+    monkeypatch.setattr(settings, "SUGGEST_INDEX_MAX_AGE_SECONDS", 0)
+    await suggest_service.ensure_index(db_sql)
+    await refreshed()
+    assert names("musc") == ["Musculosa"]
+
+
+@pytest.mark.asyncio
+async def test_local_writes_do_not_trigger_a_rebuild(db_sql: AsyncSession, test_category: Categoria, monkeypatch):
+    use_session(monkeypatch, db_sql)
+    categoria_id = test_category.id
+    await suggest_service.ensure_index(db_sql)
+    index = suggest_service.prefix_index
+
+    product = Producto(nombre="Buzo Canguro", precio=10, sku="SUG-C", stock=1, categoria_id=categoria_id)
+    db_sql.add(product)
+    await db_sql.commit()
+    await db_sql.refresh(product)
+    await suggest_service.index_product(db_sql, product, ["Gris"])
+    assert names("buzo") == ["Buzo Canguro"]
+
+    # La versión ya incluye la escritura: el chequeo no arma otro índice
+    monkeypatch.setattr(settings, "SUGGEST_INDEX_CHECK_SECONDS", 0)
+    await suggest_service.ensure_index(db_sql)
+    await refreshed()
+    assert suggest_service.prefix_index is index
@@ -0,0 +1,180 @@
+# En tests/test_upload_service.py
+import io
+import os
+
+import pytest
+from fastapi import FastAPI, File, HTTPException, UploadFile
+from httpx import ASGITransport, AsyncClient
+
+from services import upload_service
+from settings import settings
+from utils.request_limits import FORM_OVERHEAD_BYTES, MultipartSizeLimitMiddleware
+
+JPEG_HEAD = b"\xff\xd8\xff\xe0" + b"\x00" * 12
+
+
+class CountingFile(io.BytesIO):
+    """BytesIO que registra cuántos bytes se leyeron."""
+
+    def __init__(self, data: bytes):
+        super().__init__(data)
+        self.bytes_read = 0
+
+    def read(self, size=-1):
+        chunk = super().read(size)
+        self.bytes_read += len(chunk)
+        return chunk
+
+
+def make_upload(data: bytes, name: str = "foto.jpg", size=None) -> UploadFile:
+    return UploadFile(file=CountingFile(data), filename=name, size=size)
+
+
+def test_sniff_content_type():
+    assert upload_service.sniff_content_type(JPEG_HEAD) == "image/jpeg"
+    assert upload_service.sniff_content_type(b"\x89PNG\r\n\x1a\n\x00\x00") == "image/png"
+    assert upload_service.sniff_content_type(b"GIF89a\x00\x00") == "image/gif"
+    assert upload_service.sniff_content_type(b"RIFF\x10\x00\x00\x00WEBPVP8 ") == "image/webp"
+    assert upload_service.sniff_content_type(b"<html><script>") is None
+
+
+@pytest.mark.asyncio
+async def test_small_upload_stays_in_memory():
+    budget = upload_service.UploadBudget(1000)
+    spooled = await upload_service.spool_upload(make_upload(JPEG_HEAD + b"x" * 100), budget, 1000, 500)
+
+    assert spooled.in_memory
+    assert spooled.content_type == "image/jpeg"
+    assert spooled.size == 116
+    assert spooled.source() == JPEG_HEAD + b"x" * 100
+    spooled.close()
+
+
+@pytest.mark.asyncio
+async def test_large_upload_spools_to_disk_and_is_removed():
+    data = JPEG_HEAD + b"x" * (300 * 1024)
+    budget = upload_service.UploadBudget(10 * 1024 * 1024)
+    spooled = await upload_service.spool_upload(make_upload(data), budget, 1024 * 1024, 64 * 1024)
+
+    assert not spooled.in_memory
+    path = spooled.source()
+    assert os.path.getsize(path) == len(data)
+    with spooled.open() as reader:
+        assert reader.read() == data
+    spooled.close()
+    assert not os.path.exists(path)
+
+
+@pytest.mark.asyncio
+async def test_file_over_limit_stops_reading_early():
+    upload = make_upload(JPEG_HEAD + b"x" * (5 * 1024 * 1024))
+    with pytest.raises(HTTPException) as exc:
+        await upload_service.spool_upload(upload, upload_service.UploadBudget(10 ** 9), 256 * 1024, 64 * 1024)
+    assert exc.value.status_code == 413
+    # Cortó apenas pasó el tope, sin leer los 5 MB
+    assert upload.file.bytes_read <= 256 * 1024 + upload_service.CHUNK_SIZE
+
+
+@pytest.mark.asyncio
+async def test_known_size_is_rejected_without_reading():
+    upload = make_upload(JPEG_HEAD, size=50 * 1024 * 1024)
+    with pytest.raises(HTTPException) as exc:
+        await upload_service.spool_upload(upload, upload_service.UploadBudget(10 ** 9), 1024 * 1024)
+    assert exc.value.status_code == 413
+    assert upload.file.bytes_read == 0
+
+
+@pytest.mark.asyncio
+async def test_request_budget_is_shared_between_files():
+    budget = upload_service.UploadBudget(150 * 1024)
+    first = await upload_service.spool_upload(make_upload(JPEG_HEAD + b"x" * (100 * 1024)), budget, 1024 * 1024)
+    with pytest.raises(HTTPException) as exc:
+        await upload_service.spool_upload(make_upload(JPEG_HEAD + b"x" * (100 * 1024), "segunda.jpg"), budget, 1024 * 1024)
+    assert exc.value.status_code == 413
+    assert "segunda.jpg" in exc.value.detail
+    first.close()
+
+
+@pytest.mark.asyncio
+async def test_non_image_is_rejected_by_signature():
+    upload = make_upload(b"#!/bin/sh\necho hola\n", name="truco.jpg")
+    with pytest.raises(HTTPException) as exc:
+        await upload_service.spool_upload(upload, upload_service.UploadBudget(10 ** 6))
+    assert exc.value.status_code == 415
+
+
+# --- Middleware del tope del formulario ---
+def make_limited_app(max_bytes: int) -> FastAPI:
+    inner = FastAPI()
+
+    @inner.post("/api/products/")
+    async def upload(images: UploadFile = File(...)):
+        return {"size": len(await images.read())}
+
+    @inner.post("/api/products/import")
+    async def import_file(file: UploadFile = File(...)):
+        return {"size": len(await file.read())}
+
+    inner.add_middleware(
+        MultipartSizeLimitMiddleware, max_bytes=max_bytes, path_prefix="/api/products",
+        exclude_paths=["/api/products/import"]
+    )
+    return inner
+
+
+@pytest.mark.asyncio
+async def test_multipart_limit_middleware():
+    app = make_limited_app(1024)
+    big = b"x" * (FORM_OVERHEAD_BYTES + 10 * 1024)
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        ok = await ac.post("/api/products/", files={"images": ("a.jpg", b"x" * 100, "image/jpeg")})
+        assert ok.status_code == 200
+
+        # Con Content-Length se rechaza sin leer el body
+        response = await ac.post("/api/products/", files={"images": ("a.jpg", big, "image/jpeg")})
+        assert response.status_code == 413
+
+        # La importación de catálogo no tiene este tope
+        imported = await ac.post("/api/products/import", files={"file": ("c.csv", big, "text/csv")})
+        assert imported.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_multipart_limit_middleware_without_content_length():
+    app = make_limited_app(1024)
+    boundary = "limite"
+    parts = [
+        f"--{boundary}\r\nContent-Disposition: form-data; name=\"images\"; filename=\"a.jpg\"\r\n"
+        "Content-Type: image/jpeg\r\n\r\n".encode(),
+        *[b"x" * 8192 for _ in range(20)],
+        f"\r\n--{boundary}--\r\n".encode(),
+    ]
+
+    async def body():
+        for part in parts:
+            yield part
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        response = await ac.post(
+            "/api/products/", content=body(),
+            headers={"Content-Type": f"multipart/form-data; boundary={boundary}"}
+        )
+    assert response.status_code == 413
+
+
+@pytest.mark.asyncio
+async def test_multipart_limit_response_has_cors_headers(client: AsyncClient):
+    # En la app real el tope queda adentro de CORS: el front tiene que poder leer el 413
+    async def body():
+        yield b"--limite\r\n"
+
+    response = await client.post(
+        "/api/products/", content=body(),
+        headers={
+            "Origin": "http://localhost:5173",
+            "Content-Type": "multipart/form-data; boundary=limite",
+            "Content-Length": str(settings.UPLOAD_MAX_REQUEST_BYTES + FORM_OVERHEAD_BYTES + 1),
+        }
+    )
+    assert response.status_code == 413
+    assert response.headers["access-control-allow-origin"] == "http://localhost:5173"
@@ -0,0 +1,44 @@
+from typing import Any, List, Optional
+
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+from pydantic_core import to_json
+
+from schemas import admin_schemas, product_schemas, user_schemas
+
+# --- Serialización rápida para endpoints de listas grandes ---
+# El camino normal de FastAPI con 'response_model' valida la respuesta, la pasa
+# a tipos JSON en Python y recién ahí la convierte a texto. Acá validamos una
+# sola vez con un TypeAdapter ya compilado y pydantic-core escribe los bytes
+# directamente (ver benchmarks/bench_serialization.py).
+
+# Adaptadores compilados una sola vez al importar el módulo
+ProductListAdapter = TypeAdapter(List[product_schemas.Product])
+VariantListAdapter = TypeAdapter(List[product_schemas.VarianteConProducto])
+CategoryListAdapter = TypeAdapter(List[product_schemas.Categoria])
+CategoryStatsListAdapter = TypeAdapter(List[product_schemas.CategoriaConEstadisticas])
+OrderListAdapter = TypeAdapter(List[admin_schemas.Orden])
+ExpenseListAdapter = TypeAdapter(List[admin_schemas.Gasto])
+UserListAdapter = TypeAdapter(List[user_schemas.UserOut])
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSONResponse que acepta bytes ya serializados tal cual, y si recibe objetos
+    Python los serializa con pydantic-core en vez del json de la stdlib.
+    """
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return to_json(content)
+
+
+def dump_json(adapter: TypeAdapter, data: Any) -> bytes:
+    """Valida (también desde objetos ORM) y serializa a bytes en un solo paso."""
+    # by_alias=True igual que FastAPI, así '_id' sigue saliendo como '_id'
+    return adapter.dump_json(adapter.validate_python(data, from_attributes=True), by_alias=True)
+
+
+def fast_response(adapter: TypeAdapter, data: Any, headers: Optional[dict] = None) -> FastJSONResponse:
+    return FastJSONResponse(content=dump_json(adapter, data), headers=headers)
@@ -0,0 +1,43 @@
+import hashlib
+from typing import Optional
+
+from fastapi import Request, Response, status
+
+# --- Validación condicional (ETag / If-None-Match) ---
+# Los ETags son fuertes: se calculan a partir de las versiones de los datos
+# (fechas de actualización, stock de variantes, contenido de categorías) y no
+# del JSON, así se pueden comparar ANTES de serializar la respuesta.
+
+
+def make_etag(*parts) -> str:
+    digest = hashlib.sha1(repr(parts).encode("utf-8")).hexdigest()
+    return f'"{digest}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """True si el cliente ya tiene esta versión (header If-None-Match)."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # If-None-Match usa comparación débil: ignoramos el prefijo W/
+    candidates = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return etag in candidates
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag, "Cache-Control": "no-cache"})
+
+
+def json_response(request: Request, body: bytes, etag: str, headers: Optional[dict] = None) -> Response:
+    """
+    Devuelve JSON ya serializado con su ETag, o un 304 vacío si el cliente ya
+    tiene esa versión. 'no-cache' obliga al navegador a revalidar cada vez.
+    """
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    response_headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if headers:
+        response_headers.update(headers)
+    return Response(content=body, media_type="application/json", headers=response_headers)
@@ -0,0 +1,81 @@
+from typing import Iterable
+
+from fastapi import HTTPException, status
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from services import upload_service
+
+# --- Tope del body de los formularios con imágenes ---
+# FastAPI parsea el multipart completo (y lo guarda en temporales) antes de
+# llamar al endpoint, así que el tope por pedido de upload_service llega tarde
+# para un body gigante. Este middleware lo corta antes: por Content-Length si
+# viene, y si no contando los bytes a medida que llegan.
+
+# Margen para los campos de texto del formulario y los separadores del multipart
+FORM_OVERHEAD_BYTES = 64 * 1024
+
+
+class _BodyTooLarge(HTTPException):
+    # Es un HTTPException para que FastAPI lo deje pasar tal cual si salta mientras parsea el form
+    def __init__(self, max_bytes: int):
+        super().__init__(
+            status_code=upload_service.PAYLOAD_TOO_LARGE,
+            detail=f"El formulario supera el máximo de {max_bytes // (1024 * 1024)} MB."
+        )
+
+
+class MultipartSizeLimitMiddleware:
+    def __init__(self, app: ASGIApp, max_bytes: int, path_prefix: str, exclude_paths: Iterable[str] = ()):
+        self.app = app
+        self.max_bytes = max_bytes + FORM_OVERHEAD_BYTES
+        self.path_prefix = path_prefix
+        self.exclude_paths = set(exclude_paths)
+
+    def _applies(self, scope: Scope) -> bool:
+        if scope["type"] != "http" or scope["method"] not in ("POST", "PUT", "PATCH"):
+            return False
+        path = scope["path"]
+        if not path.startswith(self.path_prefix) or path in self.exclude_paths:
+            return False
+        headers = dict(scope["headers"])
+        return headers.get(b"content-type", b"").startswith(b"multipart/form-data")
+
+    def _too_large(self) -> JSONResponse:
+        error = _BodyTooLarge(self.max_bytes)
+        return JSONResponse(status_code=error.status_code, content={"detail": error.detail})
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if not self._applies(scope):
+            await self.app(scope, receive, send)
+            return
+
+        content_length = dict(scope["headers"]).get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > self.max_bytes:
+            await self._too_large()(scope, receive, send)
+            return
+
+        received = 0
+        response_started = False
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    raise _BodyTooLarge(self.max_bytes)
+            return message
+
+        async def tracking_send(message: Message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, tracking_send)
+        except _BodyTooLarge:
+            if response_started:
+                raise
+            await self._too_large()(scope, receive, send)
@@ -0,0 +1,63 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+from dotenv import load_dotenv
+
+# --- Agrego la carpeta server/ al path para importar módulos ---
+server_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if server_root not in sys.path:
+    sys.path.insert(0, server_root)
+
+load_dotenv()
+
+from services import catalog_import
+from database.database import AsyncSessionLocal, engine
+
+# --- Configuración y logging ---
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Uso (desde la carpeta server/):
+#     python workers/import_catalog.py catalogo.csv
+#     python workers/import_catalog.py productos.jsonl --batch-size 2000
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Importa productos en masa (alta o actualización por SKU).")
+    parser.add_argument("archivo", help="Ruta al archivo .csv o .jsonl")
+    parser.add_argument("--formato", choices=["csv", "jsonl"], help="Si no se pasa, se deduce de la extensión")
+    parser.add_argument("--batch-size", type=int, default=catalog_import.BATCH_SIZE, help="Filas por transacción")
+    return parser.parse_args()
+
+
+async def main():
+    args = parse_args()
+    file_format = args.formato or catalog_import.detect_format(args.archivo)
+    if file_format is None:
+        logger.critical("No se pudo deducir el formato del archivo. Usá --formato csv o --formato jsonl.")
+        sys.exit(1)
+
+    logger.info(f"Importando {args.archivo} ({file_format}) en lotes de {args.batch_size} filas...")
+    try:
+        with open(args.archivo, "rb") as f:
+            async with AsyncSessionLocal() as db:
+                report = await catalog_import.import_catalog(db, f, file_format, batch_size=args.batch_size)
+    finally:
+        await engine.dispose()
+
+    logger.info(
+        f"Filas: {report['filas']} | creados: {report['creados']} | actualizados: {report['actualizados']} | "
+        f"variantes nuevas: {report['variantes_creadas']} | variantes actualizadas: {report['variantes_actualizadas']} | "
+        f"errores: {report['total_errores']}"
+    )
+    for error in report["errores"]:
+        print(json.dumps(error, ensure_ascii=False))
+    if report["total_errores"]:
+        sys.exit(2)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,59 @@
+import argparse
+import asyncio
+import logging
+import os
+import sys
+from dotenv import load_dotenv
+
+# --- Agrego la carpeta server/ al path para importar módulos ---
+server_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if server_root not in sys.path:
+    sys.path.insert(0, server_root)
+
+load_dotenv()
+
+from services import recommendation_service
+from database.database import AsyncSessionLocal, engine
+
+# --- Configuración y logging ---
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Uso (desde la carpeta server/):
+#     python workers/update_recommendations.py                 # procesa las órdenes nuevas y termina (cron)
+#     python workers/update_recommendations.py --intervalo 600 # queda corriendo cada 10 minutos
+#     python workers/update_recommendations.py --full          # recalcula todo el historial
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Actualiza los productos relacionados a partir de las órdenes.")
+    parser.add_argument("--top-k", type=int, default=recommendation_service.TOP_K, help="Vecinos guardados por producto")
+    parser.add_argument("--full", action="store_true", help="Descarta la matriz y recalcula desde la primera orden")
+    parser.add_argument("--intervalo", type=int, help="Segundos entre corridas. Sin esto corre una sola vez")
+    return parser.parse_args()
+
+
+async def run_once(top_k: int, full: bool):
+    async with AsyncSessionLocal() as db:
+        await recommendation_service.update_recommendations(db, top_k=top_k, full=full)
+
+
+async def main():
+    args = parse_args()
+    try:
+        await run_once(args.top_k, args.full)
+        while args.intervalo:
+            logger.info(f"Esperando {args.intervalo} segundos para la próxima corrida...")
+            await asyncio.sleep(args.intervalo)
+            try:
+                await run_once(args.top_k, full=False)
+            except Exception as e:
+                logger.error(f"Error actualizando recomendaciones: {e}")
+    except KeyboardInterrupt:
+        logger.info("Deteniendo el worker de recomendaciones.")
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())